@@ -0,0 +1,207 @@
+"""
+Materialized per-user agenda for the local data service.
+The agenda is the time-sorted merge of scheduled calls and (expanded) calendar events.
+It is cached in agenda_items so a warm read is a single indexed range scan; call and
+event writes invalidate the user's cache and the next read rebuilds it with a k-way
+heap merge that streams items out while it fills the cache.
+"""
+
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+
+from .local_recurrence import parse_timestamp, parse_rule, iter_occurrences
+
+AGENDA_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS agenda_items (
+        user_id TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        source_id TEXT NOT NULL,
+        end_time TEXT NOT NULL,
+        title TEXT NOT NULL,
+        status TEXT,
+        color TEXT,
+        is_all_day INTEGER DEFAULT 0,
+        PRIMARY KEY (user_id, start_time, kind, source_id)
+    ) WITHOUT ROWID
+    ''',
+    # The time range agenda_items currently holds for each user
+    '''
+    CREATE TABLE IF NOT EXISTS agenda_windows (
+        user_id TEXT PRIMARY KEY,
+        window_start TEXT NOT NULL,
+        window_end TEXT NOT NULL,
+        built_at TEXT NOT NULL
+    )
+    ''',
+]
+
+AGENDA_COLUMNS = ['start_time', 'kind', 'source_id', 'end_time', 'title', 'status', 'color', 'is_all_day']
+
+
+class AgendaCache:
+    """Serves and maintains the materialized agenda of each user."""
+
+    def __init__(self, service, horizon_days: int = 14):
+        """horizon_days is how far ahead a rebuild materializes, so short views stay warm."""
+        self.service = service
+        self.horizon_days = horizon_days
+        # Bumped on every invalidation so a rebuild racing a write never stores stale items
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def on_change(self, user_id: str, table: str, op: str, row: tuple):
+        """Change listener: call and event writes invalidate the user's agenda."""
+        if table in ('calls', 'calendar_events'):
+            self.invalidate(user_id)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        with self.service.data_connection(user_id) as conn:
+            conn.execute('DELETE FROM agenda_windows WHERE user_id = ?', (user_id,))
+            conn.execute('DELETE FROM agenda_items WHERE user_id = ?', (user_id,))
+            conn.commit()
+
+    def agenda(self, user_id: str, days: int = 1, now: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the user's agenda items from the start of today for `days` days, in time order."""
+        now = now or datetime.utcnow()
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        end = start + timedelta(days=days)
+
+        with self.service.data_connection(user_id) as conn:
+            window = conn.execute(
+                'SELECT window_start, window_end FROM agenda_windows WHERE user_id = ?', (user_id,)
+            ).fetchone()
+            if window and window[0] <= start.isoformat() and window[1] >= end.isoformat():
+                # Overlap, like the rebuild: an item that began earlier but is still running counts
+                rows = conn.execute(f'''
+                    SELECT {', '.join(AGENDA_COLUMNS)} FROM agenda_items
+                    WHERE user_id = ? AND start_time < ? AND end_time > ?
+                    ORDER BY start_time
+                ''', (user_id, end.isoformat(), start.isoformat())).fetchall()
+                warm = True
+            else:
+                warm = False
+
+        if warm:
+            for row in rows:
+                yield self._to_item(row)
+            return
+
+        yield from self._rebuild(user_id, start, max(end, start + timedelta(days=self.horizon_days)), end)
+
+    def _rebuild(self, user_id: str, window_start: datetime, window_end: datetime,
+                 visible_end: datetime) -> Iterator[Dict[str, Any]]:
+        """Merge calls and events for the window, streaming items before visible_end as they come."""
+        with self._lock:
+            generation = self._generations.get(user_id, 0)
+
+        collected: List[tuple] = []
+        conn = self.service.open_reader(user_id)
+        try:
+            streams = self._source_streams(conn, user_id, window_start, window_end)
+            for _, row in heapq.merge(*streams, key=lambda item: item[0]):
+                collected.append(row)
+                if row[0] < visible_end.isoformat():
+                    yield self._to_item(row)
+        finally:
+            conn.close()
+
+        self._store(user_id, generation, window_start, window_end, collected)
+
+    def _source_streams(self, conn, user_id: str, window_start: datetime,
+                        window_end: datetime) -> List[Iterator[Tuple[datetime, tuple]]]:
+        """Time-sorted (start, row) streams: calls, one-off events and one per recurring event."""
+        lower, upper = window_start.isoformat(), window_end.isoformat()
+        streams = []
+
+        # Same overlap as the warm read; a call ends duration_minutes after it is scheduled
+        calls = conn.execute('''
+            SELECT id, title, scheduled_at, duration_minutes, status FROM calls
+            WHERE user_id = ? AND scheduled_at < ?
+              AND strftime('%Y-%m-%dT%H:%M:%S', scheduled_at,
+                           '+' || COALESCE(duration_minutes, 0) || ' minutes') > ?
+            ORDER BY scheduled_at
+        ''', (user_id, upper, lower))
+        streams.append(self._call_stream(calls))
+
+        events = conn.execute('''
+            SELECT id, title, start_time, end_time, color, is_all_day, recurrence_rule FROM calendar_events
+            WHERE user_id = ? AND recurrence_rule IS NULL AND start_time < ? AND end_time > ?
+            ORDER BY start_time
+        ''', (user_id, upper, lower))
+        streams.append(self._event_stream(events, window_start, window_end))
+
+        recurring = conn.execute('''
+            SELECT id, title, start_time, end_time, color, is_all_day, recurrence_rule FROM calendar_events
+            WHERE user_id = ? AND recurrence_rule IS NOT NULL AND start_time < ?
+        ''', (user_id, upper)).fetchall()
+        for event in recurring:
+            streams.append(self._event_stream([event], window_start, window_end))
+
+        return streams
+
+    @staticmethod
+    def _call_stream(rows) -> Iterator[Tuple[datetime, tuple]]:
+        for call_id, title, scheduled_at, duration, status in rows:
+            begins = parse_timestamp(scheduled_at)
+            ends = begins + timedelta(minutes=duration or 0)
+            yield begins, (begins.isoformat(), 'call', call_id, ends.isoformat(), title, status, None, 0)
+
+    @staticmethod
+    def _event_stream(rows, window_start: datetime, window_end: datetime) -> Iterator[Tuple[datetime, tuple]]:
+        for event_id, title, start_time, end_time, color, is_all_day, rule in rows:
+            occurrences = iter_occurrences(parse_timestamp(start_time), parse_timestamp(end_time),
+                                           parse_rule(rule), window_start, window_end)
+            for begins, ends in occurrences:
+                yield begins, (begins.isoformat(), 'event', event_id, ends.isoformat(), title, None, color, is_all_day)
+
+    def _store(self, user_id: str, generation: int, window_start: datetime, window_end: datetime,
+               rows: List[tuple]):
+        """Write a rebuilt window to the cache unless the user's data changed meanwhile.
+
+        The lock only guards the generation checks. An invalidation that lands before the
+        second check rolls the write back; one after it bumps the generation first and its
+        DELETE then waits for this commit, so stale items never outlive it.
+        """
+        if not self._is_current(user_id, generation):
+            return
+        with self.service.data_connection(user_id) as conn:
+            conn.execute('DELETE FROM agenda_items WHERE user_id = ?', (user_id,))
+            conn.executemany(f'''
+                INSERT OR REPLACE INTO agenda_items (user_id, {', '.join(AGENDA_COLUMNS)})
+                VALUES (?, {', '.join('?' for _ in AGENDA_COLUMNS)})
+            ''', [(user_id, *row) for row in rows])
+            conn.execute('''
+                INSERT OR REPLACE INTO agenda_windows (user_id, window_start, window_end, built_at)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, window_start.isoformat(), window_end.isoformat(), datetime.utcnow().isoformat()))
+            if self._is_current(user_id, generation):
+                conn.commit()
+            else:
+                conn.rollback()
+
+    def _is_current(self, user_id: str, generation: int) -> bool:
+        with self._lock:
+            return self._generations.get(user_id, 0) == generation
+
+    @staticmethod
+    def _to_item(row: tuple) -> Dict[str, Any]:
+        start_time, kind, source_id, end_time, title, status, color, is_all_day = row
+        item = {
+            'kind': kind,
+            'id': source_id,
+            'title': title,
+            'start_time': start_time,
+            'end_time': end_time,
+        }
+        if kind == 'call':
+            item['status'] = status
+        else:
+            item['color'] = color
+            item['is_all_day'] = bool(is_all_day)
+        return item
@@ -0,0 +1,365 @@
+"""
+Agent profiles and the compiled prompts built from them.
+A user's assistant settings are stored once per user. Before a call, the profile, the
+call's ai_instructions and what we know about the contact are compiled into a ready
+system prompt. Compiled prompts are cached under a hash of exactly those inputs, so a
+conversation turn only assembles messages around an existing prompt; profile, contact
+and call writes drop the affected bindings through the service's change listeners.
+"""
+
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional, Dict, Any, List, Tuple
+
+from .local_records import ServiceError, NotFoundError, AgentProfile, Contact, select
+
+AGENT_PROFILE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS agent_profiles (
+        id TEXT PRIMARY KEY,
+        user_id TEXT UNIQUE NOT NULL,
+        assistant_name TEXT NOT NULL DEFAULT 'Receptionist',
+        business_name TEXT,
+        greeting TEXT,
+        tone TEXT NOT NULL DEFAULT 'friendly',
+        language TEXT NOT NULL DEFAULT 'en',
+        voice TEXT,
+        instructions TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+    ''',
+]
+
+TONES = {
+    'friendly': 'Be warm and conversational.',
+    'formal': 'Be courteous and formal.',
+    'concise': 'Keep every answer short and to the point.',
+}
+
+EDITABLE_FIELDS = ('assistant_name', 'business_name', 'greeting', 'tone', 'language', 'voice', 'instructions')
+
+# Bump when compile_prompt changes so old cache keys stop matching
+COMPILER_VERSION = 1
+
+# Conversation turns kept in front of the caller's latest utterance
+HISTORY_TURNS = 12
+
+# Distinct compiled prompts kept in memory
+MAX_TEMPLATES = 1024
+
+# Calls whose prompt binding is kept in memory, least recently used dropped first
+MAX_BINDINGS = 16384
+
+
+def default_profile(user_id: str) -> AgentProfile:
+    """The profile a user has before saving any settings."""
+    return AgentProfile(None, user_id, 'Receptionist', None, None, 'friendly', 'en', None, None, None, None)
+
+
+class CompiledPrompt(NamedTuple):
+    """A ready system prompt plus the voice settings, keyed by the hash of its inputs."""
+    key: str
+    system_prompt: str
+    greeting: str
+    language: str
+    voice: Optional[str]
+
+    def messages(self, history: List[Tuple[str, str]], utterance: str) -> List[Dict[str, str]]:
+        """Chat messages for one turn: the prompt, recent (role, text) history and the utterance."""
+        messages = [{'role': 'system', 'content': self.system_prompt}]
+        for role, text in history[-HISTORY_TURNS:]:
+            messages.append({'role': role, 'content': text})
+        messages.append({'role': 'user', 'content': utterance})
+        return messages
+
+
+def prompt_key(profile: AgentProfile, contact: Optional[Contact], call: Optional[tuple]) -> str:
+    """Content hash of everything compile_prompt reads; timestamps and ids are left out."""
+    material = [
+        COMPILER_VERSION,
+        [getattr(profile, field) for field in EDITABLE_FIELDS],
+        [contact.name, contact.role, contact.company, contact.notes, contact.tags] if contact else None,
+        list(call) if call else None,
+    ]
+    return hashlib.sha256(json.dumps(material, separators=(',', ':')).encode()).hexdigest()
+
+
+def compile_prompt(profile: AgentProfile, contact: Optional[Contact] = None,
+                   call: Optional[tuple] = None, key: str = None) -> CompiledPrompt:
+    """Turn a profile, the caller's contact and a (title, description, ai_instructions) call into a prompt."""
+    business = profile.business_name or 'the business'
+    greeting = profile.greeting or f"Thanks for calling {business}, this is {profile.assistant_name}"
+
+    sections = [
+        f"You are {profile.assistant_name}, the phone receptionist for {business}.",
+        TONES.get(profile.tone, TONES['friendly']),
+        f"Reply in the language with code '{profile.language}'.",
+        f"Open the call with: \"{greeting}\".",
+    ]
+    if profile.instructions:
+        sections.append(f"General instructions:\n{profile.instructions.strip()}")
+
+    if contact is not None:
+        known = [f"Name: {contact.name}"]
+        for label, value in (('Role', contact.role), ('Company', contact.company),
+                             ('Tags', contact.tags), ('Notes', contact.notes)):
+            if value:
+                known.append(f"{label}: {value}")
+        sections.append("About the caller:\n" + '\n'.join(known))
+
+    if call is not None:
+        title, description, ai_instructions = call
+        details = [f"Call: {title}"]
+        if description:
+            details.append(f"Details: {description}")
+        if ai_instructions:
+            details.append(f"Instructions for this call:\n{ai_instructions.strip()}")
+        sections.append('\n'.join(details))
+
+    return CompiledPrompt(
+        key or prompt_key(profile, contact, call),
+        '\n\n'.join(sections),
+        greeting,
+        profile.language,
+        profile.voice,
+    )
+
+
+class AgentProfileStore:
+    """Reads and saves the per-user agent profile."""
+
+    def __init__(self, service):
+        self.service = service
+
+    def _load(self, conn, user_id: str) -> AgentProfile:
+        profile = select(
+            conn, AgentProfile,
+            f"SELECT {', '.join(AgentProfile._fields)} FROM agent_profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return profile or default_profile(user_id)
+
+    def get(self, user_id: str) -> AgentProfile:
+        with self.service.data_connection(user_id) as conn:
+            return self._load(conn, user_id)
+
+    def update(self, user_id: str, updates: Dict[str, Any]) -> AgentProfile:
+        """Save the given settings, creating the profile on first save."""
+        values = {field: value for field, value in updates.items() if field in EDITABLE_FIELDS}
+        if not values:
+            raise ServiceError('No valid fields to update')
+        for field in ('assistant_name', 'tone', 'language'):
+            if field in values and not values[field]:
+                raise ServiceError(f'{field} cannot be empty')
+        if 'tone' in values and values['tone'] not in TONES:
+            raise ServiceError(f"Unknown tone: {values['tone']}")
+
+        current_time = datetime.utcnow().isoformat()
+        with self.service.data_connection(user_id) as conn:
+            profile = self._load(conn, user_id)._replace(**values, updated_at=current_time)
+            if profile.id is None:
+                profile = profile._replace(id=str(uuid.uuid4()), created_at=current_time)
+            conn.execute(f'''
+                INSERT INTO agent_profiles ({', '.join(AgentProfile._fields)})
+                VALUES ({', '.join('?' for _ in AgentProfile._fields)})
+                ON CONFLICT(user_id) DO UPDATE SET
+                    {', '.join(f'{field} = excluded.{field}' for field in (*EDITABLE_FIELDS, 'updated_at'))}
+            ''', profile)
+            conn.commit()
+
+        self.service._notify_change(user_id, 'agent_profiles', 'update', profile)
+        return profile
+
+    def delete(self, user_id: str) -> AgentProfile:
+        """Drop the saved settings, returning the user to the defaults; returns the defaults."""
+        with self.service.data_connection(user_id) as conn:
+            profile = self._load(conn, user_id)
+            if profile.id is None:
+                raise NotFoundError('Agent profile not found')
+            conn.execute('DELETE FROM agent_profiles WHERE user_id = ?', (user_id,))
+            conn.commit()
+
+        self.service._notify_change(user_id, 'agent_profiles', 'delete', profile)
+        return default_profile(user_id)
+
+
+class AgentPromptCache:
+    """Compiled prompts per call, shared between calls whose inputs hash the same."""
+
+    def __init__(self, service, profiles: AgentProfileStore = None, max_templates: int = MAX_TEMPLATES,
+                 max_bindings: int = MAX_BINDINGS):
+        self.service = service
+        self.profiles = profiles or AgentProfileStore(service)
+        self.max_templates = max_templates
+        self.max_bindings = max_bindings
+        # (user_id, call_id) -> (prompt key, contact_id) of the call's current prompt,
+        # least recently used first
+        self._bindings: 'OrderedDict[Tuple[str, str], Tuple[str, Optional[str]]]' = OrderedDict()
+        # prompt key -> compiled prompt, least recently used first
+        self._templates: 'OrderedDict[str, CompiledPrompt]' = OrderedDict()
+        # Bumped on every invalidation so a compile racing a write never binds stale inputs
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compiles = 0
+
+    def prompt(self, user_id: str, call_id: str) -> CompiledPrompt:
+        """The compiled prompt of a call; compiled on first use or after an invalidation."""
+        with self._lock:
+            binding = self._bindings.get((user_id, call_id))
+            if binding is not None:
+                template = self._templates.get(binding[0])
+                if template is not None:
+                    self._bindings.move_to_end((user_id, call_id))
+                    self._templates.move_to_end(binding[0])
+                    self.hits += 1
+                    return template
+            self.misses += 1
+            generation = self._generations.get(user_id, 0)
+
+        profile, contact, call, contact_id = self._load_inputs(user_id, call_id)
+        key = prompt_key(profile, contact, call)
+
+        with self._lock:
+            template = self._templates.get(key)
+            if template is None:
+                template = compile_prompt(profile, contact, call, key)
+                self.compiles += 1
+                self._templates[key] = template
+                while len(self._templates) > self.max_templates:
+                    self._templates.popitem(last=False)
+            else:
+                self._templates.move_to_end(key)
+            if self._generations.get(user_id, 0) == generation:
+                self._bindings[(user_id, call_id)] = (key, contact_id)
+                self._bindings.move_to_end((user_id, call_id))
+                while len(self._bindings) > self.max_bindings:
+                    self._bindings.popitem(last=False)
+        return template
+
+    def _load_inputs(self, user_id: str, call_id: str):
+        with self.service.data_connection(user_id) as conn:
+            row = conn.execute(
+                'SELECT title, description, ai_instructions, contact_id FROM calls WHERE id = ? AND user_id = ?',
+                (call_id, user_id)
+            ).fetchone()
+            if row is None:
+                raise NotFoundError('Call not found')
+            contact = None
+            if row[3]:
+                contact = select(
+                    conn, Contact,
+                    f"SELECT {', '.join(Contact._fields)} FROM contacts WHERE id = ? AND user_id = ?",
+                    (row[3], user_id)
+                ).fetchone()
+            profile = self.profiles._load(conn, user_id)
+        return profile, contact, row[:3], row[3]
+
+    def invalidate(self, user_id: str, call_id: str = None, contact_id: str = None):
+        """Drop a user's bindings: all of them, one call's, or those of calls with one contact."""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            if call_id is not None:
+                self._bindings.pop((user_id, call_id), None)
+                return
+            # Profile and contact writes are rare next to turns; a scan of the bounded map is fine
+            for bound in [bound for bound, (_, bound_contact) in self._bindings.items()
+                          if bound[0] == user_id and (contact_id is None or bound_contact == contact_id)]:
+                del self._bindings[bound]
+
+    def on_change(self, user_id: str, table: str, op: str, row: tuple):
+        """Change listener: profile, contact and call writes (and deletes) drop the prompts built from them."""
+        if table == 'agent_profiles':
+            self.invalidate(user_id)
+        elif table == 'contacts' and op in ('update', 'delete'):
+            self.invalidate(user_id, contact_id=row.id)
+        elif table == 'calls' and op in ('update', 'delete', 'archive'):
+            self.invalidate(user_id, call_id=row.id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'compiles': self.compiles,
+                'templates': len(self._templates),
+                'bindings': len(self._bindings),
+            }
+
+
+def main():
+    """Benchmark per-turn prompt assembly with and without the cache (python -m app.local_agent_profiles)."""
+    import os
+    import random
+    import tempfile
+    import time
+    from .local_service import LocalAuthService
+
+    service = LocalAuthService(os.path.join(tempfile.mkdtemp(), 'profiles_bench.db'))
+    user_id = service.register_user('bench@example.com', 'benchmark', 'Bench').id
+    profiles = AgentProfileStore(service)
+    cache = AgentPromptCache(service, profiles)
+    service.add_change_listener(cache.on_change)
+
+    profiles.update(user_id, {
+        'assistant_name': 'Ava',
+        'business_name': 'Harbor Dental',
+        'tone': 'friendly',
+        'instructions': 'Book cleanings on weekdays only. Never quote prices over the phone. '
+                        'Offer a callback from the hygienist for clinical questions.',
+    })
+    contacts = [service.create_contact(user_id, {
+        'name': f'Patient {i}', 'phone_number': f'555{i:07d}', 'company': 'Acme' if i % 3 else None,
+        'notes': 'Prefers mornings; anxious about drilling.', 'tags': 'patient,recall',
+    }).id for i in range(100)]
+    calls = [service.create_call(user_id, {
+        'title': f'Recall {i}', 'scheduled_at': f'2026-11-{1 + i % 28:02d}T09:00:00',
+        'contact_id': contacts[i % len(contacts)],
+        'ai_instructions': 'Confirm the six-month cleaning and ask about insurance changes.',
+    }).id for i in range(1000)]
+
+    rng = random.Random(7)
+    history = [('user', 'Hi, I got a message about my appointment.'), ('assistant', 'Sure, let me check.')] * 4
+    utterance = 'Can I move it to Thursday?'
+    turns_per_call = 10
+
+    started = time.perf_counter()
+    for call_id in calls[:200]:
+        profile, contact, call, _ = cache._load_inputs(user_id, call_id)
+        compile_prompt(profile, contact, call).messages(history, utterance)
+    uncached = (time.perf_counter() - started) / 200
+
+    # Conversations of ten turns each; the user edits the assistant and a contact now and then
+    turns = 0
+    started = time.perf_counter()
+    for index, call_id in enumerate(calls):
+        if index % 250 == 249:
+            profiles.update(user_id, {'greeting': f'Harbor Dental, Ava speaking ({index})'})
+            service.update_contact(user_id, rng.choice(contacts), {'notes': f'Updated after call {index}'})
+        for _ in range(turns_per_call):
+            cache.prompt(user_id, call_id).messages(history, utterance)
+            turns += 1
+    cached = (time.perf_counter() - started) / turns
+
+    started = time.perf_counter()
+    for _ in range(10_000):
+        cache.prompt(user_id, calls[-1]).messages(history, utterance)
+    hit = (time.perf_counter() - started) / 10_000
+
+    stats = cache.stats()
+    print(f"Per-turn assembly: {uncached * 1e6:.0f} us rebuilding from the database, "
+          f"{cached * 1e6:.1f} us with the cache, {hit * 1e6:.1f} us on a hit")
+    print(f"Cache over {turns} turns on {len(calls)} calls: hit rate {stats['hit_rate']:.1%}, "
+          f"{stats['compiles']} compiles, {stats['templates']} distinct prompts")
+
+
+if __name__ == "__main__":
+    main()
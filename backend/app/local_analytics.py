@@ -0,0 +1,211 @@
+"""
+Incrementally maintained call analytics for the local data service.
+Triggers on the calls tables keep per-user hourly buckets in call_rollups up to date
+on every insert, update and delete, so dashboard statistics are read from a handful
+of buckets instead of a GROUP BY over every call.
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from .local_records import ServiceError, CallStats
+
+# Expressions deriving the bucket key of a call row (prefix is NEW or OLD)
+_BUCKET_KEY = '''{row}.user_id, date({row}.scheduled_at), CAST(strftime('%H', {row}.scheduled_at) AS INTEGER),
+            COALESCE({row}.status, ''), COALESCE({row}.priority, ''), COALESCE({row}.call_type, '')'''
+
+_ADD_TO_BUCKET = '''
+        INSERT INTO call_rollups (user_id, day, hour, status, priority, call_type, call_count, total_minutes)
+        VALUES (''' + _BUCKET_KEY + ''', 1, COALESCE({row}.duration_minutes, 0))
+        ON CONFLICT (user_id, day, hour, status, priority, call_type) DO UPDATE SET
+            call_count = call_count + 1,
+            total_minutes = total_minutes + excluded.total_minutes;'''
+
+_REMOVE_FROM_BUCKET = '''
+        UPDATE call_rollups SET
+            call_count = call_count - 1,
+            total_minutes = total_minutes - COALESCE({row}.duration_minutes, 0)
+        WHERE (user_id, day, hour, status, priority, call_type) = (''' + _BUCKET_KEY + ''');
+        DELETE FROM call_rollups
+        WHERE (user_id, day, hour, status, priority, call_type) = (''' + _BUCKET_KEY + ''') AND call_count <= 0;'''
+
+# Bumped when the trigger bodies change; databases keep the old triggers otherwise
+# (CREATE TRIGGER IF NOT EXISTS), so the previous versions are dropped by name
+ROLLUP_TRIGGER_VERSION = 2
+
+
+def _rollup_triggers(table: str) -> List[str]:
+    """Triggers keeping call_rollups in step with one calls table.
+
+    INSERT OR REPLACE removes the old row without firing the delete trigger (recursive
+    triggers are off), so writers replacing call rows must upsert instead.
+    """
+    add_new = _ADD_TO_BUCKET.format(row='NEW')
+    remove_old = _REMOVE_FROM_BUCKET.format(row='OLD')
+    suffix = f'_v{ROLLUP_TRIGGER_VERSION}'
+    return [
+        *(f'DROP TRIGGER IF EXISTS rollup_{table}_{op}' for op in ('insert', 'update', 'delete')),
+        f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_{table}_insert{suffix} AFTER INSERT ON {table}
+    BEGIN{add_new}
+    END
+    ''',
+        f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_{table}_update{suffix}
+    AFTER UPDATE OF user_id, scheduled_at, duration_minutes, status, priority, call_type ON {table}
+    BEGIN{remove_old}{add_new}
+    END
+    ''',
+        f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_{table}_delete{suffix} AFTER DELETE ON {table}
+    BEGIN{remove_old}
+    END
+    ''',
+    ]
+
+
+
+# Archived calls still count, so archiving a call (delete from calls, insert into
+# calls_archive) leaves the rollups unchanged
+ROLLUP_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS call_rollups (
+        user_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        priority TEXT NOT NULL,
+        call_type TEXT NOT NULL,
+        call_count INTEGER NOT NULL DEFAULT 0,
+        total_minutes INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day, hour, status, priority, call_type)
+    ) WITHOUT ROWID
+    ''',
+    *_rollup_triggers('calls'),
+    *_rollup_triggers('calls_archive'),
+]
+
+GRANULARITIES = ('day', 'week')
+
+
+class CallAnalytics:
+    """Answers call statistics from the call_rollups buckets."""
+
+    def __init__(self, service):
+        self.service = service
+
+    def rebuild(self, user_id: str = None) -> int:
+        """Recompute rollups from the calls tables, for one user or everyone.
+
+        Needed once for databases that had calls before the rollups existed.
+        Returns the number of buckets written.
+        """
+        where = 'WHERE user_id = ?' if user_id else ''
+        params = (user_id,) * 2 if user_id else ()
+        buckets = 0
+
+        if user_id:
+            connections = [self.service.data_connection(user_id)]
+        else:
+            connections = self.service.each_data_connection()
+
+        for context in connections:
+            with context as conn:
+                conn.execute(f'DELETE FROM call_rollups {where}', params[:1])
+                cursor = conn.execute(f'''
+                    INSERT INTO call_rollups (user_id, day, hour, status, priority, call_type, call_count, total_minutes)
+                    SELECT user_id, date(scheduled_at), CAST(strftime('%H', scheduled_at) AS INTEGER),
+                           COALESCE(status, ''), COALESCE(priority, ''), COALESCE(call_type, ''),
+                           COUNT(*), SUM(COALESCE(duration_minutes, 0))
+                    FROM (
+                        SELECT user_id, scheduled_at, status, priority, call_type, duration_minutes FROM calls {where}
+                        UNION ALL
+                        SELECT user_id, scheduled_at, status, priority, call_type, duration_minutes FROM calls_archive {where}
+                    )
+                    GROUP BY 1, 2, 3, 4, 5, 6
+                ''', params)
+                buckets += cursor.rowcount
+                conn.commit()
+
+        return buckets
+
+    def call_stats(self, user_id: str, start: str = None, end: str = None,
+                   granularity: str = 'day') -> CallStats:
+        """Summarize a user's calls between two dates (inclusive start, exclusive end)."""
+        if granularity not in GRANULARITIES:
+            raise ServiceError(f'Unknown granularity: {granularity}')
+
+        where = 'user_id = ?'
+        params = [user_id]
+        if start:
+            where += ' AND day >= ?'
+            params.append(start[:10])
+        if end:
+            where += ' AND day < ?'
+            params.append(end[:10])
+
+        try:
+            with self.service.data_connection(user_id) as conn:
+                buckets = conn.execute(f'''
+                    SELECT day, hour, status, priority, call_type, call_count, total_minutes
+                    FROM call_rollups WHERE {where}
+                ''', params).fetchall()
+        except sqlite3.Error as e:
+            raise ServiceError(f'Call analytics failed: {str(e)}') from e
+
+        by_status: Dict[str, int] = {}
+        by_priority: Dict[str, int] = {}
+        by_call_type: Dict[str, int] = {}
+        by_hour = [0] * 24
+        periods: Dict[str, Dict[str, int]] = {}
+        total_calls = 0
+        total_minutes = 0
+
+        for day, hour, status, priority, call_type, count, minutes in buckets:
+            by_status[status] = by_status.get(status, 0) + count
+            by_priority[priority] = by_priority.get(priority, 0) + count
+            by_call_type[call_type] = by_call_type.get(call_type, 0) + count
+            if hour is not None:
+                by_hour[hour] += count
+
+            period = day if granularity == 'day' else self._week_start(day)
+            bucket = periods.setdefault(period, {'calls': 0, 'duration_minutes': 0})
+            bucket['calls'] += count
+            bucket['duration_minutes'] += minutes
+
+            total_calls += count
+            total_minutes += minutes
+
+        busiest_hours = sorted(
+            ({'hour': hour, 'calls': count} for hour, count in enumerate(by_hour) if count),
+            key=lambda item: (-item['calls'], item['hour'])
+        )
+
+        return CallStats(
+            total_calls=total_calls,
+            total_duration_minutes=total_minutes,
+            by_status=by_status,
+            by_priority=by_priority,
+            by_call_type=by_call_type,
+            busiest_hours=busiest_hours,
+            periods=[{'period': period, **values} for period, values in sorted(periods.items())],
+        )
+
+    @staticmethod
+    def _week_start(day: str) -> str:
+        """Monday of the ISO week a YYYY-MM-DD day falls in."""
+        date = datetime.strptime(day, '%Y-%m-%d')
+        return (date - timedelta(days=date.weekday())).strftime('%Y-%m-%d')
+
+
+def main():
+    """Rebuild call rollups for every user (python -m app.local_analytics)."""
+    from .local_service import local_auth_service
+
+    buckets = CallAnalytics(local_auth_service).rebuild()
+    print(f"Rebuilt call rollups: {buckets} buckets")
+
+
+if __name__ == "__main__":
+    main()
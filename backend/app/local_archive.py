@@ -0,0 +1,132 @@
+"""
+Hot/cold archival for the local data service.
+Completed calls and past one-off calendar events older than a horizon are moved into
+the *_archive tables in small batches, keeping the hot tables (and their user_id
+indexes) small enough to stay in the page cache.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+
+from .local_deadlines import connect_within_deadline
+from .local_records import Call, CalendarEvent, ServiceError, NotFoundError, select
+
+# table -> (record type, condition a row must meet to be archived)
+ARCHIVE_RULES = {
+    'calls': (Call, "status = 'completed' AND scheduled_at < ?"),
+    # Recurring events keep producing occurrences, so only one-off events are archived
+    'calendar_events': (CalendarEvent, "end_time < ? AND recurrence_rule IS NULL"),
+}
+
+
+def _assignments(columns: List[str]) -> str:
+    """SET list of an upsert taking every non-key column from the incoming row."""
+    return ', '.join(f'{column} = excluded.{column}' for column in columns if column != 'id')
+
+
+class Archiver:
+    """Moves old rows from the hot data tables into their archive tables.
+
+    Every moved row is reported to the service's change listeners with op 'archive' or
+    'restore', so caches and subscribers drop or pick it up; listeners that clean up
+    after deleted calls (recordings, transcripts) only react to 'delete' and keep them.
+    """
+
+    def __init__(self, service, horizon_days: int = 180, batch_size: int = 500):
+        self.service = service
+        self.horizon_days = horizon_days
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+
+    def _user_ids(self) -> List[str]:
+        conn = connect_within_deadline(self.service.db_path)
+        try:
+            return [row[0] for row in conn.execute('SELECT id FROM users')]
+        finally:
+            conn.close()
+
+    def _archive_batch(self, table: str, user_id: str, cutoff: str, archived_at: str) -> int:
+        """Move one batch of rows; each batch is its own short write transaction."""
+        record, condition = ARCHIVE_RULES[table]
+        columns = list(record._fields)
+        column_list = ', '.join(columns)
+
+        with self.service.data_connection(user_id) as conn:
+            rows = select(conn, record,
+                f'SELECT {column_list} FROM {table} WHERE user_id = ? AND {condition} LIMIT ?',
+                (user_id, cutoff, self.batch_size)
+            ).fetchall()
+            if not rows:
+                return 0
+
+            ids = [row.id for row in rows]
+            placeholders = ', '.join('?' for _ in ids)
+            # Upsert rather than REPLACE: the call rollup triggers only see an update
+            conn.execute(f'''
+                INSERT INTO {table}_archive ({column_list}, archived_at)
+                SELECT {column_list}, ? FROM {table} WHERE id IN ({placeholders})
+                ON CONFLICT (id) DO UPDATE SET {_assignments(columns + ['archived_at'])}
+            ''', (archived_at, *ids))
+            conn.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', ids)
+            conn.commit()
+
+        for row in rows:
+            self.service._notify_change(user_id, table, 'archive', row)
+        return len(rows)
+
+    def archive_user(self, user_id: str, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Archive a user's rows older than the horizon. Returns rows moved per table."""
+        now = now or datetime.utcnow()
+        cutoff = (now - timedelta(days=self.horizon_days)).isoformat()
+        archived_at = now.isoformat()
+        moved = {}
+
+        for table in ARCHIVE_RULES:
+            total = 0
+            while True:
+                count = self._archive_batch(table, user_id, cutoff, archived_at)
+                total += count
+                if count < self.batch_size:
+                    break
+            moved[table] = total
+
+        return moved
+
+    def archive_all(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Archive old rows for every user."""
+        with self._lock:
+            totals = {table: 0 for table in ARCHIVE_RULES}
+            users = 0
+            for user_id in self._user_ids():
+                moved = self.archive_user(user_id, now)
+                for table, count in moved.items():
+                    totals[table] += count
+                users += 1
+            return {'users': users, 'archived': totals}
+
+    def restore(self, table: str, user_id: str, row_id: str):
+        """Move a single archived row back into its hot table and return it."""
+        if table not in ARCHIVE_RULES:
+            raise ServiceError(f'Unknown archive table: {table}')
+        record, _ = ARCHIVE_RULES[table]
+        columns = list(record._fields)
+        column_list = ', '.join(columns)
+
+        with self.service.data_connection(user_id) as conn:
+            row = select(conn, record,
+                f'SELECT {column_list} FROM {table}_archive WHERE id = ? AND user_id = ?',
+                (row_id, user_id)
+            ).fetchone()
+            if row is None:
+                raise NotFoundError('Archived row not found')
+            conn.execute(f'''
+                INSERT INTO {table} ({column_list})
+                SELECT {column_list} FROM {table}_archive WHERE id = ?
+                ON CONFLICT (id) DO UPDATE SET {_assignments(columns)}
+            ''', (row_id,))
+            conn.execute(f'DELETE FROM {table}_archive WHERE id = ?', (row_id,))
+            conn.commit()
+
+        self.service._notify_change(user_id, table, 'restore', row)
+        return row
@@ -0,0 +1,481 @@
+"""
+Online backups for the local data service.
+Full snapshots use SQLite's online backup API, copying a few pages at a time and
+sleeping between steps so writers are never locked out for long. A write from another
+connection restarts a stepped copy; after a few restarts the copy is finished in one
+step instead, so a busy database is still backed up. Between full snapshots, triggers
+record changed rows so incremental snapshots only carry the rows that changed. restore() rebuilds the databases from a full snapshot and the
+incrementals taken after it.
+"""
+
+import base64
+import gzip
+import json
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+# Tables whose changes are captured for incremental snapshots, with the columns that identify a row
+CAPTURED_TABLES: Dict[str, Tuple[str, ...]] = {
+    'users': ('id',),
+    'contacts': ('id',),
+    'calls': ('id',),
+    'calendar_events': ('id',),
+    'calls_archive': ('id',),
+    'calendar_events_archive': ('id',),
+    'agent_profiles': ('id',),
+    'call_routing_rules': ('id',),
+    'call_routing_settings': ('user_id',),
+    'call_recordings': ('id',),
+    'transcript_owners': ('owner',),
+    'transcript_docs': ('doc',),
+    'transcript_segments': ('doc', 'seq'),
+    'transcript_postings': ('owner', 'term', 'doc'),
+}
+
+CHANGE_LOG_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS backup_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id TEXT NOT NULL,
+        op TEXT NOT NULL,
+        changed_at TEXT NOT NULL
+    )
+'''
+
+CHANGE_TRIGGERS = [
+    ('insert', "AFTER INSERT", "NEW", "upsert"),
+    ('update', "AFTER UPDATE", "NEW", "upsert"),
+    ('delete', "AFTER DELETE", "OLD", "delete"),
+]
+
+
+def _row_ref(table: str, alias: str) -> str:
+    """Trigger expression for a row's key: the column itself, or a JSON array of a composite key."""
+    columns = [f'{alias}.{column}' for column in CAPTURED_TABLES[table]]
+    return columns[0] if len(columns) == 1 else f"json_array({', '.join(columns)})"
+
+
+def _key_clause(table: str, row_id: str) -> Tuple[str, tuple]:
+    """WHERE clause and parameters selecting the row a change log entry refers to."""
+    columns = CAPTURED_TABLES[table]
+    values = (row_id,) if len(columns) == 1 else tuple(json.loads(row_id))
+    return ' AND '.join(f'{column} = ?' for column in columns), values
+
+
+def _encode_value(value: Any) -> Any:
+    # Transcript bodies and postings are blobs, which JSON cannot carry as they are
+    if isinstance(value, bytes):
+        return {'base64': base64.b64encode(value).decode('ascii')}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return base64.b64decode(value['base64'])
+    return value
+
+
+def apply_changes(conn: sqlite3.Connection, path: Path) -> int:
+    """Replay an incremental snapshot's changes (.ndjson.gz) into a database; returns rows applied."""
+    applied = 0
+    with gzip.open(path, 'rt') as changes:
+        for line in changes:
+            record = json.loads(line)
+            table = record['table']
+            if record['op'] == 'delete':
+                where, values = _key_clause(table, record['id'])
+                conn.execute(f'DELETE FROM {table} WHERE {where}', values)
+            else:
+                # Upsert rather than REPLACE, which would delete the old row without firing
+                # delete triggers (the call rollups would count a replayed call twice)
+                row = record['row']
+                key = CAPTURED_TABLES[table]
+                updates = [f'{column} = excluded.{column}' for column in row if column not in key]
+                conn.execute(
+                    f"INSERT INTO {table} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))}) "
+                    f"ON CONFLICT ({', '.join(key)}) "
+                    + (f"DO UPDATE SET {', '.join(updates)}" if updates else 'DO NOTHING'),
+                    [_decode_value(value) for value in row.values()]
+                )
+            applied += 1
+    conn.commit()
+    return applied
+
+
+class _CopyRestarting(Exception):
+    """Raised from the backup progress callback to give up on a stepped copy."""
+
+
+class BackupManager:
+    """Takes full and incremental snapshots of the local databases and rotates them."""
+
+    def __init__(self, service, backup_dir: str = None, keep: int = 7, pages_per_step: int = 64,
+                 step_sleep: float = 0.005, capture_changes: bool = True, max_restarts: int = 3):
+        """Create a backup manager for a LocalAuthService.
+
+        Snapshots go to backup_dir (default: a 'backups' directory next to the database).
+        keep is the number of full snapshots retained; incrementals older than the oldest
+        kept full snapshot are removed with it. A stepped copy restarted by writes more
+        than max_restarts times is redone as a single step.
+        """
+        self.service = service
+        if backup_dir is None:
+            backup_dir = Path(service.db_path).parent / "backups"
+        self.backup_dir = Path(backup_dir)
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self.keep = max(1, keep)
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+        self.capture_changes = capture_changes
+        self.state_path = self.backup_dir / "state.json"
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _databases(self) -> List[Tuple[str, Path]]:
+        """List (name, path) of every database file that makes up the service's data."""
+        databases = [(Path(self.service.db_path).stem, Path(self.service.db_path))]
+        if self.service.shards is not None:
+            for key in self.service.shards.existing_shards():
+                databases.append((key, self.service.shards.shard_path(key)))
+        return databases
+
+    def _load_state(self) -> Dict[str, Any]:
+        if self.state_path.exists():
+            return json.loads(self.state_path.read_text())
+        return {'last_seq': {}}
+
+    def _save_state(self, state: Dict[str, Any]):
+        tmp_path = self.state_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(state))
+        tmp_path.replace(self.state_path)
+
+    def _snapshot_dir(self, kind: str) -> Path:
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        path = self.backup_dir / f"{stamp}-{kind}"
+        path.mkdir()
+        return path
+
+    def install_change_capture(self, conn: sqlite3.Connection):
+        """Create the change log table and capture triggers in one database."""
+        conn.execute(CHANGE_LOG_SCHEMA)
+        present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in CAPTURED_TABLES:
+            if table not in present:
+                continue
+            for suffix, timing, alias, op in CHANGE_TRIGGERS:
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS backup_capture_{table}_{suffix} {timing} ON {table}
+                    BEGIN
+                        INSERT INTO backup_changes (table_name, row_id, op, changed_at)
+                        VALUES ('{table}', {_row_ref(table, alias)}, '{op}', strftime('%Y-%m-%dT%H:%M:%f', 'now'));
+                    END
+                ''')
+        conn.commit()
+
+    def _has_change_capture(self, conn: sqlite3.Connection) -> bool:
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'backup_changes'"
+        ).fetchone()
+        return row is not None
+
+    def _copy_database(self, path: Path, target: Path) -> Dict[str, Any]:
+        """Copy one live database page-step by page-step and gzip the result."""
+        source = sqlite3.connect(str(path), timeout=30)
+        raw_target = target.with_suffix('')
+        dest = sqlite3.connect(str(raw_target))
+
+        step_times: List[float] = []
+        last_tick = [time.perf_counter()]
+        last_remaining = [None]
+        restarts = 0
+
+        def progress(status, remaining, total):
+            nonlocal restarts
+            step_times.append(time.perf_counter() - last_tick[0])
+            # A write from another connection sends the copy back to the first page
+            if last_remaining[0] is not None and remaining > last_remaining[0]:
+                restarts += 1
+                if restarts > self.max_restarts:
+                    raise _CopyRestarting()
+            last_remaining[0] = remaining
+            # sqlite3 only sleeps between steps when the source is busy; yield
+            # explicitly so writers get the database between every step
+            if remaining:
+                time.sleep(self.step_sleep)
+            last_tick[0] = time.perf_counter()
+
+        started = time.perf_counter()
+        single_step = False
+        try:
+            try:
+                source.backup(dest, pages=self.pages_per_step, progress=progress, sleep=self.step_sleep)
+            except _CopyRestarting:
+                # Writes keep outrunning the stepped copy: copy everything under one read lock
+                single_step = True
+                step_started = time.perf_counter()
+                source.backup(dest, pages=-1)
+                step_times.append(time.perf_counter() - step_started)
+        finally:
+            dest.close()
+            source.close()
+        duration = time.perf_counter() - started
+
+        with open(raw_target, 'rb') as src_file, gzip.open(target, 'wb', compresslevel=6) as gz_file:
+            shutil.copyfileobj(src_file, gz_file, 1024 * 1024)
+        raw_size = raw_target.stat().st_size
+        raw_target.unlink()
+
+        return {
+            'file': target.name,
+            'duration_seconds': round(duration, 4),
+            'steps': len(step_times),
+            'max_step_seconds': round(max(step_times, default=0.0), 4),
+            'restarts': restarts,
+            'single_step': single_step,
+            'size_bytes': raw_size,
+            'compressed_bytes': target.stat().st_size,
+        }
+
+    def full_backup(self) -> Dict[str, Any]:
+        """Take a compressed full snapshot of every database, then rotate old snapshots."""
+        with self._lock:
+            started = time.perf_counter()
+            snapshot = self._snapshot_dir('full')
+            state = self._load_state()
+            databases = []
+
+            for name, path in self._databases():
+                if self.capture_changes:
+                    conn = sqlite3.connect(str(path), timeout=30)
+                    try:
+                        self.install_change_capture(conn)
+                        # Everything up to here is in the full copy
+                        seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM backup_changes').fetchone()[0]
+                    finally:
+                        conn.close()
+                else:
+                    seq = 0
+
+                entry = self._copy_database(path, snapshot / f"{name}.db.gz")
+                entry['name'] = name
+                databases.append(entry)
+
+                if self.capture_changes:
+                    self._discard_changes(path, seq)
+                    state['last_seq'][name] = seq
+
+            report = self._finish(snapshot, 'full', databases, started)
+            state['last_full'] = snapshot.name
+            self._save_state(state)
+            self.rotate()
+            return report
+
+    def incremental_backup(self) -> Dict[str, Any]:
+        """Write the rows changed since the last snapshot as compressed NDJSON.
+
+        Databases without change capture yet (e.g. shards created after the last full
+        snapshot) are copied in full instead.
+        """
+        with self._lock:
+            state = self._load_state()
+            if 'last_full' not in state:
+                raise RuntimeError("No full backup to build an incremental backup on")
+
+            started = time.perf_counter()
+            snapshot = self._snapshot_dir('incr')
+            databases = []
+
+            for name, path in self._databases():
+                conn = sqlite3.connect(str(path), timeout=30)
+                try:
+                    captured = self._has_change_capture(conn)
+                    if not captured:
+                        self.install_change_capture(conn)
+                        seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM backup_changes').fetchone()[0]
+                finally:
+                    conn.close()
+
+                if not captured:
+                    entry = self._copy_database(path, snapshot / f"{name}.db.gz")
+                    self._discard_changes(path, seq)
+                else:
+                    seq, entry = self._write_changes(path, snapshot / f"{name}.ndjson.gz",
+                                                     state['last_seq'].get(name, 0))
+                    self._discard_changes(path, seq)
+
+                entry['name'] = name
+                databases.append(entry)
+                state['last_seq'][name] = seq
+
+            report = self._finish(snapshot, 'incremental', databases, started, base=state['last_full'])
+            self._save_state(state)
+            return report
+
+    def _write_changes(self, path: Path, target: Path, after_seq: int) -> Tuple[int, Dict[str, Any]]:
+        """Dump the latest version of every row changed after after_seq."""
+        conn = sqlite3.connect(str(path), timeout=30)
+        started = time.perf_counter()
+        rows_written = 0
+        try:
+            # One read transaction so the change list and row contents agree
+            conn.execute('BEGIN')
+            last_seq = conn.execute(
+                'SELECT COALESCE(MAX(seq), ?) FROM backup_changes WHERE seq > ?', (after_seq, after_seq)
+            ).fetchone()[0]
+            changes = conn.execute('''
+                SELECT table_name, row_id, op FROM backup_changes
+                WHERE seq IN (
+                    SELECT MAX(seq) FROM backup_changes
+                    WHERE seq > ? AND seq <= ?
+                    GROUP BY table_name, row_id
+                )
+                ORDER BY seq
+            ''', (after_seq, last_seq))
+
+            with gzip.open(target, 'wt', compresslevel=6) as out:
+                for table, row_id, op in changes:
+                    record = {'table': table, 'id': row_id, 'op': op}
+                    if op != 'delete':
+                        where, values = _key_clause(table, row_id)
+                        cursor = conn.execute(f'SELECT * FROM {table} WHERE {where}', values)
+                        row = cursor.fetchone()
+                        if row is None:
+                            record['op'] = 'delete'
+                        else:
+                            record['row'] = {col[0]: _encode_value(value)
+                                             for col, value in zip(cursor.description, row)}
+                    out.write(json.dumps(record, separators=(',', ':')) + '\n')
+                    rows_written += 1
+            conn.rollback()
+        finally:
+            conn.close()
+
+        return last_seq, {
+            'file': target.name,
+            'duration_seconds': round(time.perf_counter() - started, 4),
+            'rows': rows_written,
+            'compressed_bytes': target.stat().st_size,
+        }
+
+    def _discard_changes(self, path: Path, up_to_seq: int):
+        """Drop change log entries already covered by a snapshot."""
+        conn = sqlite3.connect(str(path), timeout=30)
+        try:
+            conn.execute('DELETE FROM backup_changes WHERE seq <= ?', (up_to_seq,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _finish(self, snapshot: Path, kind: str, databases: List[Dict[str, Any]], started: float,
+                base: str = None) -> Dict[str, Any]:
+        report = {
+            'snapshot': snapshot.name,
+            'kind': kind,
+            'created_at': datetime.utcnow().isoformat(),
+            'duration_seconds': round(time.perf_counter() - started, 4),
+            'databases': databases,
+        }
+        if base:
+            report['base'] = base
+        (snapshot / 'manifest.json').write_text(json.dumps(report, indent=2))
+        self.last_report = report
+        return report
+
+    def list_snapshots(self) -> List[str]:
+        """Snapshot directory names, oldest first."""
+        return sorted(path.name for path in self.backup_dir.iterdir() if path.is_dir())
+
+    def restore(self, snapshot: str, target_dir: str) -> Dict[str, Path]:
+        """Rebuild every database as of a snapshot into target_dir; returns name -> restored path.
+
+        An incremental snapshot is restored from its full base plus every incremental
+        built on that base up to and including it.
+        """
+        manifest = json.loads((self.backup_dir / snapshot / 'manifest.json').read_text())
+        base = snapshot if manifest['kind'] == 'full' else manifest['base']
+        chain = [base] + [
+            name for name in self.list_snapshots()
+            if name.endswith('-incr') and base < name <= snapshot
+            and json.loads((self.backup_dir / name / 'manifest.json').read_text()).get('base') == base
+        ]
+
+        target = Path(target_dir)
+        target.mkdir(parents=True, exist_ok=True)
+        restored: Dict[str, Path] = {}
+        for name in chain:
+            for entry in json.loads((self.backup_dir / name / 'manifest.json').read_text())['databases']:
+                source = self.backup_dir / name / entry['file']
+                path = restored.setdefault(entry['name'], target / f"{entry['name']}.db")
+                if entry['file'].endswith('.db.gz'):
+                    with gzip.open(source, 'rb') as gz_file, open(path, 'wb') as out:
+                        shutil.copyfileobj(gz_file, out, 1024 * 1024)
+                else:
+                    conn = sqlite3.connect(str(path))
+                    try:
+                        apply_changes(conn, source)
+                    finally:
+                        conn.close()
+        return restored
+
+    def rotate(self):
+        """Keep the newest `keep` full snapshots and the incrementals built on them."""
+        snapshots = self.list_snapshots()
+        fulls = [name for name in snapshots if name.endswith('-full')]
+        if len(fulls) <= self.keep:
+            return
+        oldest_kept = fulls[-self.keep]
+        for name in snapshots:
+            if name < oldest_kept:
+                shutil.rmtree(self.backup_dir / name, ignore_errors=True)
+
+
+class BackupScheduler:
+    """Background thread running periodic full and incremental backups."""
+
+    def __init__(self, manager: BackupManager, full_interval: float = 24 * 3600,
+                 incremental_interval: float = 3600):
+        self.manager = manager
+        self.full_interval = full_interval
+        self.incremental_interval = incremental_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        next_full = time.monotonic()
+        next_incremental = next_full + self.incremental_interval
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+            try:
+                if now >= next_full:
+                    self.manager.full_backup()
+                    next_full = now + self.full_interval
+                    next_incremental = now + self.incremental_interval
+                elif now >= next_incremental:
+                    self.manager.incremental_backup()
+                    next_incremental = now + self.incremental_interval
+            except Exception as e:
+                self.last_error = f'Backup failed: {str(e)}'
+                print(f"⚠️  {self.last_error}")
+                next_incremental = now + self.incremental_interval
+
+            self._stop.wait(max(0.0, min(next_full, next_incremental) - time.monotonic()))
@@ -0,0 +1,666 @@
+"""
+Inbound call routing rules.
+A user's rules say what the assistant does with a ring (forward it, take a message, book
+an appointment or block it) depending on who calls, when, and whether the user is busy
+in their calendar. The first enabled rule in position order whose conditions all hold
+decides. Day and time conditions are read in the user's timezone (call_routing_settings),
+while calendar busy time is compared in UTC like everything else stored. Rules are
+compiled per user into bitmask tables: rule i is bit i, every
+condition maps its possible values (caller number, role, tag, minute of the week, busy
+or free) to the mask of rules admitting that value, and a ring ANDs a handful of masks
+and takes the lowest set bit. Compiled tables are cached and dropped on rule, contact
+and calendar writes through the service's change listeners.
+"""
+
+import bisect
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import NamedTuple, Optional, Dict, Any, List, Tuple, Iterable
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .local_records import ServiceError, NotFoundError, RoutingRule, RoutingSettings, RoutingDecision, select
+from .local_dedupe import normalize_phone
+from .local_recurrence import parse_timestamp, parse_rule, iter_occurrences
+
+CALL_ROUTING_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS call_routing_rules (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        action TEXT NOT NULL,
+        target TEXT,
+        conditions TEXT NOT NULL DEFAULT '{}',
+        enabled INTEGER NOT NULL DEFAULT 1,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_call_routing_rules_user ON call_routing_rules(user_id, position)',
+    # Users without a row read their rules in DEFAULT_TIMEZONE
+    '''
+    CREATE TABLE IF NOT EXISTS call_routing_settings (
+        user_id TEXT PRIMARY KEY,
+        timezone TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    ''',
+]
+
+ACTIONS = ('forward', 'message', 'book', 'block')
+# What happens to a ring no rule matches
+DEFAULT_ACTION = 'message'
+CONDITIONS = ('callers', 'numbers', 'roles', 'tags', 'favorite', 'days', 'start', 'end', 'busy')
+EDITABLE_FIELDS = ('name', 'position', 'action', 'target', 'conditions', 'enabled')
+MAX_RULES = 10000
+DEFAULT_TIMEZONE = 'UTC'
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Calendar time expanded into busy intervals per compile, from the start of the ring's day
+BUSY_WINDOW = timedelta(days=1)
+
+# Users whose compiled rules are kept, least recently used dropped first
+MAX_COMPILED_USERS = 256
+
+
+class Caller(NamedTuple):
+    """What the rules can see of a caller found in contacts."""
+    contact_id: str
+    role: Optional[str]
+    tags: frozenset
+    favorite: bool
+
+
+def _minutes(value: Any, field: str) -> int:
+    """'HH:MM' -> minutes after midnight; '24:00' is the end of the day."""
+    try:
+        hours, minutes = (int(part) for part in value.split(':'))
+    except (AttributeError, ValueError):
+        raise ServiceError(f'{field} must be HH:MM')
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > MINUTES_PER_DAY:
+        raise ServiceError(f'{field} must be HH:MM')
+    return hours * 60 + minutes
+
+
+def _strings(values: Any, field: str) -> List[str]:
+    if not isinstance(values, list) or not values or not all(isinstance(value, str) and value.strip()
+                                                             for value in values):
+        raise ServiceError(f'{field} must be a non-empty list of strings')
+    return sorted({value.strip().lower() for value in values})
+
+
+def normalize_conditions(conditions: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validate a rule's conditions and return them in canonical form.
+
+    callers: 'known' or 'unknown'; numbers, roles, tags: lists (tags match if the caller
+    has any of them); favorite, busy: booleans; days: weekdays 0 (Monday) to 6; start and
+    end: 'HH:MM' on those days, where start after end runs overnight into the next day.
+    """
+    if conditions is None:
+        return {}
+    if not isinstance(conditions, dict):
+        raise ServiceError('conditions must be an object')
+    unknown = set(conditions) - set(CONDITIONS)
+    if unknown:
+        raise ServiceError(f"Unknown condition: {', '.join(sorted(unknown))}")
+
+    normalized: Dict[str, Any] = {}
+    if conditions.get('callers') is not None:
+        if conditions['callers'] not in ('known', 'unknown'):
+            raise ServiceError("callers must be 'known' or 'unknown'")
+        normalized['callers'] = conditions['callers']
+    if conditions.get('numbers') is not None:
+        numbers = {normalize_phone(number) for number in _strings(conditions['numbers'], 'numbers')}
+        if '' in numbers:
+            raise ServiceError('numbers must be phone numbers')
+        normalized['numbers'] = sorted(numbers)
+    for field in ('roles', 'tags'):
+        if conditions.get(field) is not None:
+            normalized[field] = _strings(conditions[field], field)
+    for field in ('favorite', 'busy'):
+        if conditions.get(field) is not None:
+            if not isinstance(conditions[field], bool):
+                raise ServiceError(f'{field} must be true or false')
+            normalized[field] = conditions[field]
+    if conditions.get('days') is not None:
+        days = conditions['days']
+        if not isinstance(days, list) or not days or not all(
+                type(day) is int and 0 <= day <= 6 for day in days):
+            raise ServiceError('days must be a non-empty list of weekdays 0 (Monday) to 6')
+        normalized['days'] = sorted(set(days))
+    if (conditions.get('start') is None) != (conditions.get('end') is None):
+        raise ServiceError('start and end must be given together')
+    if conditions.get('start') is not None:
+        start, end = _minutes(conditions['start'], 'start'), _minutes(conditions['end'], 'end')
+        if start == end:
+            raise ServiceError('start and end must differ')
+        normalized['start'] = f'{start // 60:02d}:{start % 60:02d}'
+        normalized['end'] = f'{end // 60:02d}:{end % 60:02d}'
+    return normalized
+
+
+def load_timezone(name: Any) -> tzinfo:
+    """The zone for an IANA name such as 'America/New_York'."""
+    if not isinstance(name, str) or not name.strip():
+        raise ServiceError('timezone must be an IANA name such as America/New_York')
+    try:
+        return ZoneInfo(name.strip())
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ServiceError(f'Unknown timezone: {name}')
+
+
+def local_time(at: datetime, zone: tzinfo) -> datetime:
+    """Wall-clock time in zone of a naive UTC datetime."""
+    return at.replace(tzinfo=timezone.utc).astimezone(zone).replace(tzinfo=None)
+
+
+def minute_of_week(at: datetime) -> int:
+    return at.weekday() * MINUTES_PER_DAY + at.hour * 60 + at.minute
+
+
+def _windows(conditions: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """Disjoint, non-adjacent [start, end) minute-of-week ranges where the day and time conditions hold."""
+    start, end = 0, MINUTES_PER_DAY
+    if 'start' in conditions:
+        start, end = _minutes(conditions['start'], 'start'), _minutes(conditions['end'], 'end')
+    ranges = []
+    for day in conditions.get('days', range(7)):
+        base = day * MINUTES_PER_DAY
+        if start < end:
+            ranges.append((base + start, base + end))
+            continue
+        # Overnight: from start on the day until end on the next (Sunday runs into Monday)
+        ranges.append((base + start, base + MINUTES_PER_DAY))
+        following = (base + MINUTES_PER_DAY) % MINUTES_PER_WEEK
+        if end:
+            ranges.append((following, following + end))
+
+    merged: List[Tuple[int, int]] = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def interpret_rules(rules: Iterable[RoutingRule], number: str, caller: Optional[Caller],
+                    at: datetime, busy: bool) -> Optional[RoutingRule]:
+    """The first rule matching a ring, checked rule by rule; at is the user's local time.
+
+    This is the reference meaning of the rules; CompiledRules gives the same answers.
+    """
+    minute = minute_of_week(at)
+    for rule in rules:
+        conditions = rule.conditions
+        if 'callers' in conditions and (conditions['callers'] == 'known') != (caller is not None):
+            continue
+        if 'numbers' in conditions and number not in conditions['numbers']:
+            continue
+        if 'roles' in conditions and (caller is None or caller.role not in conditions['roles']):
+            continue
+        if 'tags' in conditions and (caller is None or caller.tags.isdisjoint(conditions['tags'])):
+            continue
+        if 'favorite' in conditions and conditions['favorite'] != (caller is not None and caller.favorite):
+            continue
+        if 'busy' in conditions and conditions['busy'] != busy:
+            continue
+        if ('days' in conditions or 'start' in conditions) and not any(
+                low <= minute < high for low, high in _windows(conditions)):
+            continue
+        return rule
+    return None
+
+
+class CompiledRules:
+    """A user's enabled rules as bitmask tables, with their contacts and busy time."""
+
+    def __init__(self, rules: List[RoutingRule], callers: Dict[str, Caller],
+                 busy: List[Tuple[datetime, datetime]], window_start: datetime, window_end: datetime,
+                 zone: tzinfo = timezone.utc):
+        self.rules = rules
+        self.callers = callers
+        self.zone = zone
+        self.window_start = window_start
+        self.window_end = window_end
+
+        every = (1 << len(rules)) - 1
+        self.known = self.unknown = every
+        self.favorite = self.not_favorite = every
+        self.when_busy = self.when_free = every
+        self.any_role = self.any_tag = self.any_number = every
+        # value -> rules listing it; rules without the condition are in any_*
+        self.roles: Dict[str, int] = {}
+        self.tags: Dict[str, int] = {}
+        self.numbers: Dict[str, int] = {}
+        always = every
+        toggles: Dict[int, int] = {0: 0}
+
+        for index, rule in enumerate(rules):
+            bit = 1 << index
+            conditions = rule.conditions
+            if conditions.get('callers') == 'known':
+                self.unknown &= ~bit
+            elif conditions.get('callers') == 'unknown':
+                self.known &= ~bit
+            if 'favorite' in conditions:
+                if conditions['favorite']:
+                    self.not_favorite &= ~bit
+                else:
+                    self.favorite &= ~bit
+            if 'busy' in conditions:
+                if conditions['busy']:
+                    self.when_free &= ~bit
+                else:
+                    self.when_busy &= ~bit
+            for field, table, anything in (('roles', self.roles, 'any_role'), ('tags', self.tags, 'any_tag'),
+                                           ('numbers', self.numbers, 'any_number')):
+                if field in conditions:
+                    setattr(self, anything, getattr(self, anything) & ~bit)
+                    for value in conditions[field]:
+                        table[value] = table.get(value, 0) | bit
+            if 'days' in conditions or 'start' in conditions:
+                always &= ~bit
+                # A rule's ranges are disjoint and non-adjacent, so toggling at their edges
+                # while sweeping the week switches it on and off exactly once each
+                for low, high in _windows(conditions):
+                    toggles[low] = toggles.get(low, 0) ^ bit
+                    if high < MINUTES_PER_WEEK:
+                        toggles[high] = toggles.get(high, 0) ^ bit
+
+        # Minute of the week -> rules whose day and time allow it, as a step function
+        self.breakpoints = sorted(toggles)
+        self.time_masks = []
+        active = 0
+        for point in self.breakpoints:
+            active ^= toggles[point]
+            self.time_masks.append(always | active)
+
+        self.unknown_caller = self.unknown & self.not_favorite & self.any_role & self.any_tag
+        self.busy_starts = [start for start, _ in busy]
+        self.busy_ends = [end for _, end in busy]
+
+    def is_busy(self, at: datetime) -> bool:
+        index = bisect.bisect_right(self.busy_starts, at) - 1
+        return index >= 0 and at < self.busy_ends[index]
+
+    def caller_mask(self, number: str, caller: Optional[Caller]) -> int:
+        """Rules whose caller conditions admit this caller."""
+        if caller is None:
+            return self.unknown_caller & (self.any_number | self.numbers.get(number, 0))
+        mask = self.known & (self.favorite if caller.favorite else self.not_favorite)
+        mask &= self.any_number | self.numbers.get(number, 0)
+        mask &= self.any_role | self.roles.get(caller.role, 0)
+        tags = self.any_tag
+        for tag in caller.tags:
+            tags |= self.tags.get(tag, 0)
+        return mask & tags
+
+    def decide(self, number: str, at: datetime) -> RoutingDecision:
+        """Decide a ring at naive UTC time at; day and time conditions see it in self.zone."""
+        caller = self.callers.get(number)
+        busy = self.is_busy(at)
+        minute = minute_of_week(local_time(at, self.zone))
+        mask = (self.caller_mask(number, caller)
+                & self.time_masks[bisect.bisect_right(self.breakpoints, minute) - 1]
+                & (self.when_busy if busy else self.when_free))
+        contact_id = caller.contact_id if caller is not None else None
+        if not mask:
+            return RoutingDecision(DEFAULT_ACTION, None, None, None, contact_id, busy)
+        # Lowest set bit: the matching rule with the smallest position
+        rule = self.rules[(mask & -mask).bit_length() - 1]
+        return RoutingDecision(rule.action, rule.target, rule.id, rule.name, contact_id, busy)
+
+
+class RoutingRuleStore:
+    """Reads and writes a user's routing rules."""
+
+    def __init__(self, service):
+        self.service = service
+
+    @staticmethod
+    def _load(conn, user_id: str, enabled_only: bool = False) -> List[RoutingRule]:
+        rows = select(conn, RoutingRule, f'''
+            SELECT {', '.join(RoutingRule._fields)} FROM call_routing_rules
+            WHERE user_id = ?{' AND enabled = 1' if enabled_only else ''}
+            ORDER BY position, created_at, id
+        ''', (user_id,))
+        return [rule._replace(conditions=json.loads(rule.conditions)) for rule in rows]
+
+    @staticmethod
+    def _validate(rule: RoutingRule) -> RoutingRule:
+        if not rule.name or not rule.name.strip():
+            raise ServiceError('name cannot be empty')
+        if rule.action not in ACTIONS:
+            raise ServiceError(f"action must be one of {', '.join(ACTIONS)}")
+        if rule.action == 'forward' and not rule.target:
+            raise ServiceError('forward rules need a target number')
+        if type(rule.position) is not int:
+            raise ServiceError('position must be an integer')
+        return rule._replace(conditions=normalize_conditions(rule.conditions), enabled=int(bool(rule.enabled)))
+
+    @staticmethod
+    def _row(rule: RoutingRule) -> tuple:
+        return rule._replace(conditions=json.dumps(rule.conditions, sort_keys=True))
+
+    def list(self, user_id: str) -> List[RoutingRule]:
+        with self.service.data_connection(user_id) as conn:
+            return self._load(conn, user_id)
+
+    def create(self, user_id: str, data: Dict[str, Any]) -> RoutingRule:
+        """Add a rule; without a position it goes after the existing ones."""
+        current_time = datetime.utcnow().isoformat()
+        with self.service.data_connection(user_id) as conn:
+            count, next_position = conn.execute(
+                'SELECT COUNT(*), COALESCE(MAX(position) + 1, 0) FROM call_routing_rules WHERE user_id = ?',
+                (user_id,)
+            ).fetchone()
+            if count >= MAX_RULES:
+                raise ServiceError(f'At most {MAX_RULES} routing rules')
+            rule = self._validate(RoutingRule(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                name=data.get('name'),
+                position=next_position if data.get('position') is None else data['position'],
+                action=data.get('action'),
+                target=data.get('target'),
+                conditions=data.get('conditions'),
+                enabled=data.get('enabled', True),
+                created_at=current_time,
+                updated_at=current_time,
+            ))
+            conn.execute(f'''
+                INSERT INTO call_routing_rules ({', '.join(RoutingRule._fields)})
+                VALUES ({', '.join('?' for _ in RoutingRule._fields)})
+            ''', self._row(rule))
+            conn.commit()
+
+        self.service._notify_change(user_id, 'call_routing_rules', 'insert', rule)
+        return rule
+
+    def update(self, user_id: str, rule_id: str, updates: Dict[str, Any]) -> RoutingRule:
+        values = {field: value for field, value in updates.items() if field in EDITABLE_FIELDS}
+        if not values:
+            raise ServiceError('No valid fields to update')
+
+        with self.service.data_connection(user_id) as conn:
+            rule = next((rule for rule in self._load(conn, user_id) if rule.id == rule_id), None)
+            if rule is None:
+                raise NotFoundError('Routing rule not found')
+            rule = self._validate(rule._replace(**values, updated_at=datetime.utcnow().isoformat()))
+            conn.execute(f'''
+                UPDATE call_routing_rules SET {', '.join(f'{field} = ?' for field in (*EDITABLE_FIELDS, 'updated_at'))}
+                WHERE id = ? AND user_id = ?
+            ''', (*(getattr(self._row(rule), field) for field in (*EDITABLE_FIELDS, 'updated_at')), rule_id, user_id))
+            conn.commit()
+
+        self.service._notify_change(user_id, 'call_routing_rules', 'update', rule)
+        return rule
+
+    def delete(self, user_id: str, rule_id: str) -> RoutingRule:
+        with self.service.data_connection(user_id) as conn:
+            rule = next((rule for rule in self._load(conn, user_id) if rule.id == rule_id), None)
+            if rule is None:
+                raise NotFoundError('Routing rule not found')
+            conn.execute('DELETE FROM call_routing_rules WHERE id = ? AND user_id = ?', (rule_id, user_id))
+            conn.commit()
+
+        self.service._notify_change(user_id, 'call_routing_rules', 'delete', rule)
+        return rule
+
+    @staticmethod
+    def _load_settings(conn, user_id: str) -> RoutingSettings:
+        settings = select(conn, RoutingSettings, f'''
+            SELECT {', '.join(RoutingSettings._fields)} FROM call_routing_settings WHERE user_id = ?
+        ''', (user_id,)).fetchone()
+        return settings or RoutingSettings(user_id, DEFAULT_TIMEZONE, None)
+
+    def settings(self, user_id: str) -> RoutingSettings:
+        with self.service.data_connection(user_id) as conn:
+            return self._load_settings(conn, user_id)
+
+    def set_timezone(self, user_id: str, name: str) -> RoutingSettings:
+        """Read the user's day and time conditions in the IANA zone `name` from now on."""
+        load_timezone(name)
+        settings = RoutingSettings(user_id, name.strip(), datetime.utcnow().isoformat())
+        with self.service.data_connection(user_id) as conn:
+            conn.execute(f'''
+                INSERT OR REPLACE INTO call_routing_settings ({', '.join(RoutingSettings._fields)})
+                VALUES ({', '.join('?' for _ in RoutingSettings._fields)})
+            ''', settings)
+            conn.commit()
+
+        self.service._notify_change(user_id, 'call_routing_settings', 'update', settings)
+        return settings
+
+
+class CallRouter:
+    """Routing decisions from per-user compiled rules, compiled on first ring after a change."""
+
+    def __init__(self, service, rules: RoutingRuleStore = None, max_users: int = MAX_COMPILED_USERS):
+        self.service = service
+        self.rules = rules or RoutingRuleStore(service)
+        self.max_users = max_users
+        # user_id -> compiled rules, least recently used first
+        self._compiled: 'OrderedDict[str, CompiledRules]' = OrderedDict()
+        # Bumped on every invalidation so a compile racing a write is never cached
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compiles = 0
+        self.compile_seconds = 0.0
+
+    def decide(self, user_id: str, caller_number: Optional[str], at: Optional[datetime] = None) -> RoutingDecision:
+        """What to do with a ring from caller_number (None or unparseable for withheld numbers).
+
+        at is the ring time as a naive UTC datetime, like stored timestamps; default now.
+        """
+        at = at or datetime.utcnow()
+        return self.compiled(user_id, at).decide(normalize_phone(caller_number), at)
+
+    def compiled(self, user_id: str, at: datetime) -> CompiledRules:
+        with self._lock:
+            compiled = self._compiled.get(user_id)
+            if compiled is not None and compiled.window_start <= at < compiled.window_end:
+                self._compiled.move_to_end(user_id)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+            generation = self._generations.get(user_id, 0)
+
+        started = time.perf_counter()
+        compiled = self._compile(user_id, at)
+        with self._lock:
+            self.compiles += 1
+            self.compile_seconds += time.perf_counter() - started
+            if self._generations.get(user_id, 0) == generation:
+                self._compiled[user_id] = compiled
+                self._compiled.move_to_end(user_id)
+                while len(self._compiled) > self.max_users:
+                    self._compiled.popitem(last=False)
+        return compiled
+
+    def _compile(self, user_id: str, at: datetime) -> CompiledRules:
+        window_start = at.replace(hour=0, minute=0, second=0, microsecond=0)
+        window_end = window_start + BUSY_WINDOW
+        lower, upper = window_start.isoformat(), window_end.isoformat()
+
+        with self.service.data_connection(user_id) as conn:
+            rules = RoutingRuleStore._load(conn, user_id, enabled_only=True)
+            # A zone that stopped resolving falls back to the default rather than failing rings
+            try:
+                zone = load_timezone(RoutingRuleStore._load_settings(conn, user_id).timezone)
+            except ServiceError:
+                zone = load_timezone(DEFAULT_TIMEZONE)
+            callers: Dict[str, Caller] = {}
+            for contact_id, phone_number, role, tags, favorite in conn.execute(
+                    'SELECT id, phone_number, role, tags, is_favorite FROM contacts WHERE user_id = ? '
+                    'ORDER BY created_at', (user_id,)):
+                number = normalize_phone(phone_number)
+                if number and number not in callers:
+                    callers[number] = Caller(
+                        contact_id,
+                        role.strip().lower() if role and role.strip() else None,
+                        frozenset(tag.strip().lower() for tag in (tags or '').split(',') if tag.strip()),
+                        bool(favorite),
+                    )
+            events = conn.execute('''
+                SELECT start_time, end_time, recurrence_rule FROM calendar_events
+                WHERE user_id = ? AND start_time < ? AND (recurrence_rule IS NOT NULL OR end_time > ?)
+            ''', (user_id, upper, lower)).fetchall()
+
+        busy = []
+        for start_time, end_time, rule in events:
+            busy.extend(iter_occurrences(parse_timestamp(start_time), parse_timestamp(end_time),
+                                         parse_rule(rule), window_start, window_end))
+        merged: List[Tuple[datetime, datetime]] = []
+        for start, end in sorted(busy):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+
+        return CompiledRules(rules, callers, merged, window_start, window_end, zone)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._compiled.pop(user_id, None)
+
+    def on_change(self, user_id: str, table: str, op: str, row: tuple):
+        """Change listener: rule, timezone, contact (including imports) and calendar writes recompile."""
+        if table in ('call_routing_rules', 'call_routing_settings', 'contacts', 'calendar_events'):
+            self.invalidate(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'compiles': self.compiles,
+                'avg_compile_ms': round(self.compile_seconds / self.compiles * 1000, 2) if self.compiles else None,
+                'users': len(self._compiled),
+            }
+
+
+def main():
+    """Benchmark ring decisions with thousands of rules (python -m app.local_call_routing)."""
+    import os
+    import random
+    import tempfile
+    from .local_service import LocalAuthService
+
+    rng = random.Random(11)
+    service = LocalAuthService(os.path.join(tempfile.mkdtemp(), 'routing_bench.db'))
+    user_id = service.register_user('bench@example.com', 'benchmark', 'Bench').id
+    store = RoutingRuleStore(service)
+    router = CallRouter(service, store)
+    service.add_change_listener(router.on_change)
+
+    roles = ['client', 'supplier', 'lead', 'partner', 'family']
+    tags = ['vip', 'billing', 'support', 'referral', 'spam-risk', 'new']
+    contacts = [{
+        'name': f'Contact {i}',
+        'phone_number': f'+1 555 {i:07d}',
+        'role': rng.choice(roles),
+        'tags': ','.join(rng.sample(tags, rng.randrange(3))),
+        'is_favorite': rng.random() < 0.05,
+    } for i in range(10000)]
+    service.import_contacts(user_id, contacts)
+    for day in range(7):
+        service.create_calendar_event(user_id, {
+            'title': 'Standup', 'start_time': f'2026-11-{2 + day:02d}T09:00:00',
+            'end_time': f'2026-11-{2 + day:02d}T09:30:00', 'recurrence_rule': 'FREQ=WEEKLY',
+        })
+    service.create_calendar_event(user_id, {'title': 'Lunch', 'start_time': '2026-11-02T12:00:00',
+                                            'end_time': '2026-11-02T13:00:00', 'recurrence_rule': 'FREQ=DAILY'})
+
+    def random_rule(index: int) -> Dict[str, Any]:
+        kind = rng.random()
+        if kind < 0.5:
+            # Per-number rules: blocked spammers, forwarded VIPs
+            numbers = [f'+1 555 {rng.randrange(20000):07d}' for _ in range(rng.randrange(1, 4))]
+            action = rng.choice(['block', 'forward'])
+            conditions = {'numbers': numbers}
+        elif kind < 0.8:
+            conditions = {rng.choice(['roles', 'tags']): [rng.choice(roles + tags)]}
+            if rng.random() < 0.5:
+                conditions['favorite'] = rng.random() < 0.5
+            action = rng.choice(ACTIONS)
+        else:
+            # Broad fallbacks, ordered last below
+            conditions = {'callers': rng.choice(['known', 'unknown']), 'busy': True}
+            action = rng.choice(['message', 'book', 'block'])
+        if rng.random() < 0.4:
+            start = rng.randrange(0, 24 * 4) * 15
+            conditions.update(days=sorted(rng.sample(range(7), rng.randrange(1, 6))),
+                              start=f'{start // 60:02d}:{start % 60:02d}',
+                              end=f'{(start + rng.choice([60, 240, 600])) // 60 % 24:02d}:{start % 60:02d}')
+        if rng.random() < 0.2:
+            conditions['busy'] = rng.random() < 0.5
+        return {'name': f'Rule {index}', 'action': action, 'conditions': conditions,
+                'target': '+15550000000' if action == 'forward' else None}
+
+    rule_count = 5000
+    current_time = datetime.utcnow().isoformat()
+    with service.data_connection(user_id) as conn:
+        conn.executemany(f'''
+            INSERT INTO call_routing_rules ({', '.join(RoutingRule._fields)})
+            VALUES ({', '.join('?' for _ in RoutingRule._fields)})
+        ''', [RoutingRuleStore._row(RoutingRuleStore._validate(RoutingRule(
+            str(uuid.uuid4()), user_id, data['name'], index, data['action'], data['target'],
+            data['conditions'], 1, current_time, current_time))) for index, data in enumerate(
+            sorted((random_rule(index) for index in range(rule_count)), key=lambda data: 'callers' in data['conditions']))])
+        conn.commit()
+    router.invalidate(user_id)
+
+    rings = [(f'+1 555 {rng.randrange(20000):07d}',
+              datetime(2026, 11, 2) + timedelta(minutes=rng.randrange(7 * MINUTES_PER_DAY))) for _ in range(20000)]
+    window = [(number, at.replace(year=2026, month=11, day=4)) for number, at in rings]
+
+    started = time.perf_counter()
+    router.compiled(user_id, window[0][1])
+    print(f"Compiled {rule_count} rules over {len(contacts)} contacts in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # Reference: interpret the rule list on every ring, contacts and busy time preloaded
+    compiled = router.compiled(user_id, window[0][1])
+    started = time.perf_counter()
+    expected = []
+    for number, at in window[:2000]:
+        normalized = normalize_phone(number)
+        rule = interpret_rules(compiled.rules, normalized, compiled.callers.get(normalized),
+                               local_time(at, compiled.zone), compiled.is_busy(at))
+        expected.append(rule.id if rule else None)
+    interpreted = (time.perf_counter() - started) / 2000
+
+    started = time.perf_counter()
+    decisions = [router.decide(user_id, number, at) for number, at in window]
+    decided = (time.perf_counter() - started) / len(window)
+    agree = all(decision.rule_id == rule_id for decision, rule_id in zip(decisions, expected))
+    print(f"Interpreted: {interpreted * 1e6:.0f} us per ring; compiled: {decided * 1e6:.1f} us per ring "
+          f"({interpreted / decided:.0f}x), decisions agree: {agree}")
+    actions: Dict[str, int] = {}
+    for decision in decisions:
+        actions[decision.action] = actions.get(decision.action, 0) + 1
+    print(f"Actions over {len(window)} rings: {actions}")
+
+    # A contact edit drops the compiled table; the next ring recompiles
+    service.update_contact(user_id, service.import_contacts(user_id, [{
+        'name': 'Late addition', 'phone_number': '+1 555 9999999'}]).ids[0], {'role': 'family'})
+    router.decide(user_id, '+1 555 9999999', window[0][1])
+    print(f"Cache: {router.stats()}")
+
+
+if __name__ == "__main__":
+    main()
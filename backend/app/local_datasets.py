@@ -0,0 +1,258 @@
+"""
+Deterministic synthetic datasets for LocalAuthService.
+A DatasetSpec (users x contacts x calls x events per user, plus a seed) always produces
+the same rows: ids, timestamps and values all come from one seeded generator and a
+fixed anchor time. Rows are bulk-inserted straight into the tables (per user, one
+transaction per table), so change listeners are not notified; triggers still run.
+"""
+
+import math
+import random
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import NamedTuple, Dict, List, Tuple
+
+from .local_records import Contact, Call, CalendarEvent
+
+# Every generated timestamp is relative to this, never to the wall clock
+ANCHOR = datetime(2026, 1, 5, 9, 0)
+
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William',
+               'Elizabeth', 'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+               'Charles', 'Karen', 'Daniel', 'Nancy', 'Matthew', 'Lisa', 'Anthony', 'Betty', 'Mark', 'Sandra']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor',
+              'Moore', 'Jackson', 'Martin', 'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Clark']
+ROLES = ['Client', 'Supplier', 'Lead', 'Partner', 'Contractor', None]
+COMPANY_WORDS = ['Acme', 'Blue', 'River', 'Summit', 'North', 'Pine', 'Harbor', 'Atlas', 'Cedar', 'Union']
+COMPANY_SUFFIXES = ['Plumbing', 'Dental', 'Realty', 'Logistics', 'Consulting', 'Bakery', 'Law', 'Motors']
+TAGS = ['vip', 'new', 'billing', 'support', 'referral', 'follow-up']
+CALL_TITLES = ['Follow-up', 'Quote', 'Appointment confirmation', 'Billing question', 'Intro call',
+               'Support callback', 'Renewal', 'Delivery update']
+EVENT_TITLES = ['Team sync', 'Site visit', 'Lunch', 'Dentist', 'Planning', 'Review', 'Workshop', 'Focus time']
+COLORS = ['#3B82F6', '#10B981', '#F59E0B', '#EF4444', '#8B5CF6']
+RECURRENCE_RULES = ['FREQ=WEEKLY', 'FREQ=DAILY;COUNT=10', 'FREQ=MONTHLY', 'FREQ=WEEKLY;INTERVAL=2']
+
+# Working hours get most of the traffic
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 0, 1, 6, 10, 10, 9, 6, 8, 10, 10, 8, 5, 2, 1, 1, 0, 0, 0]
+
+# How far back and ahead calls and events are spread around the anchor
+CALL_HISTORY_DAYS = 180
+CALL_FUTURE_DAYS = 30
+EVENT_HISTORY_DAYS = 90
+EVENT_FUTURE_DAYS = 60
+
+# Password every generated user can log in with
+PASSWORD = 'benchmark'
+
+
+class DatasetSpec(NamedTuple):
+    users: int = 100
+    contacts: int = 200
+    calls: int = 500
+    events: int = 150
+    seed: int = 42
+
+
+class Dataset(NamedTuple):
+    """What was generated, plus samples benchmarks can use as realistic query parameters."""
+    spec: DatasetSpec
+    user_ids: List[str]
+    session_tokens: List[str]
+    # A few (user_id, phone_number) pairs of existing contacts per user
+    caller_phones: List[Tuple[str, str]]
+    counts: Dict[str, int]
+    seconds: float
+
+
+def _per_user(rng: random.Random, mean: int, sigma: float = 0.8) -> int:
+    """Heavy-tailed count around mean: most users are small, a few are power users."""
+    if mean <= 0:
+        return 0
+    return max(1, round(rng.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma)))
+
+
+def _id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _phone(rng: random.Random) -> str:
+    return f"+1{rng.randrange(201, 990)}{rng.randrange(200, 1000)}{rng.randrange(10000):04d}"
+
+
+def _moment(rng: random.Random, day: int) -> datetime:
+    """A business-hours time on the day `day` days from the anchor, weekends mostly avoided."""
+    date = ANCHOR + timedelta(days=day)
+    if date.weekday() >= 5 and rng.random() < 0.8:
+        date += timedelta(days=7 - date.weekday())
+    hour = rng.choices(range(24), HOUR_WEIGHTS)[0]
+    return date.replace(hour=hour, minute=rng.choice((0, 15, 30, 45)))
+
+
+def _contact(rng: random.Random, user_id: str, stamp: str) -> Contact:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    company = (f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+               if rng.random() < 0.6 else None)
+    return Contact(
+        id=_id(rng),
+        user_id=user_id,
+        name=f"{first} {last}",
+        role=rng.choice(ROLES),
+        phone_number=_phone(rng),
+        email=f"{first.lower()}.{last.lower()}{rng.randrange(1000)}@example.com" if rng.random() < 0.7 else None,
+        company=company,
+        notes='Prefers morning calls' if rng.random() < 0.1 else None,
+        tags=','.join(rng.sample(TAGS, rng.randrange(3))) or None,
+        is_favorite=int(rng.random() < 0.1),
+        created_at=stamp,
+        updated_at=stamp,
+    )
+
+
+def _call(rng: random.Random, user_id: str, contacts: List[Contact], stamp: str) -> Call:
+    if rng.random() < 0.2:
+        day = rng.randrange(CALL_FUTURE_DAYS)
+    else:
+        # Recent history is denser than old history
+        day = -min(int(rng.expovariate(1 / 45)), CALL_HISTORY_DAYS)
+    scheduled = _moment(rng, day)
+    if scheduled >= ANCHOR:
+        status = 'scheduled' if rng.random() < 0.95 else 'cancelled'
+    else:
+        status = rng.choices(('completed', 'missed', 'cancelled', 'scheduled'), (75, 12, 8, 5))[0]
+    # A handful of contacts account for most calls
+    contact = contacts[int(len(contacts) * rng.random() ** 3)] if contacts and rng.random() < 0.85 else None
+    return Call(
+        id=_id(rng),
+        user_id=user_id,
+        contact_id=contact.id if contact else None,
+        title=rng.choice(CALL_TITLES) + (f" with {contact.name}" if contact else ''),
+        description='Discuss the open quote' if rng.random() < 0.3 else None,
+        scheduled_at=scheduled.isoformat(),
+        duration_minutes=max(1, round(rng.lognormvariate(2.3, 0.6))),
+        status=status,
+        ai_instructions='Confirm the appointment and keep it brief.' if rng.random() < 0.4 else None,
+        call_type='inbound' if rng.random() < 0.6 else 'outbound',
+        priority=rng.choices(('low', 'medium', 'high'), (25, 60, 15))[0],
+        created_at=stamp,
+        updated_at=stamp,
+    )
+
+
+def _event(rng: random.Random, user_id: str, stamp: str) -> CalendarEvent:
+    start = _moment(rng, rng.randrange(-EVENT_HISTORY_DAYS, EVENT_FUTURE_DAYS))
+    all_day = rng.random() < 0.05
+    if all_day:
+        start = start.replace(hour=0, minute=0)
+        end = start + timedelta(days=1)
+    else:
+        end = start + timedelta(minutes=rng.choice((30, 30, 60, 60, 90, 120)))
+    return CalendarEvent(
+        id=_id(rng),
+        user_id=user_id,
+        title=rng.choice(EVENT_TITLES),
+        description=None,
+        start_time=start.isoformat(),
+        end_time=end.isoformat(),
+        color=rng.choice(COLORS),
+        is_all_day=int(all_day),
+        recurrence_rule=rng.choice(RECURRENCE_RULES) if rng.random() < 0.08 else None,
+        reminder_minutes=rng.choice((5, 10, 15, 30, 60)) if rng.random() < 0.6 else None,
+        created_at=stamp,
+        updated_at=stamp,
+    )
+
+
+def _insert(conn, table: str, record: type, rows: list):
+    columns = record._fields
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})", rows
+    )
+
+
+def generate_dataset(service, spec: DatasetSpec = DatasetSpec(), samples_per_user: int = 3) -> Dataset:
+    """Bulk-load a reproducible dataset into a (normally fresh) service database."""
+    started = time.perf_counter()
+    rng = random.Random(spec.seed)
+    # Hashing is salted, so hash once and share it; every user logs in with PASSWORD
+    hashed_password = service._hash_password(PASSWORD)
+    stamp = ANCHOR.isoformat()
+    expires_at = (ANCHOR + timedelta(days=3650)).isoformat()
+
+    users, sessions = [], []
+    for index in range(spec.users):
+        user_id = _id(rng)
+        users.append((user_id, f"user{index}@bench.example", hashed_password,
+                      f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", _phone(rng), stamp, stamp))
+        sessions.append((_id(rng), user_id, f"{rng.getrandbits(256):064x}", expires_at, stamp))
+
+    conn = sqlite3.connect(service.db_path)
+    try:
+        conn.executemany('''
+            INSERT INTO users (id, email, hashed_password, full_name, phone_number, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', users)
+        conn.executemany('''
+            INSERT INTO user_sessions (id, user_id, session_token, expires_at, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', sessions)
+        conn.commit()
+    finally:
+        conn.close()
+
+    counts = {'users': len(users), 'contacts': 0, 'calls': 0, 'calendar_events': 0}
+    caller_phones = []
+    for user_id, *_ in users:
+        contacts = [_contact(rng, user_id, stamp) for _ in range(_per_user(rng, spec.contacts))]
+        calls = [_call(rng, user_id, contacts, stamp) for _ in range(_per_user(rng, spec.calls))]
+        events = [_event(rng, user_id, stamp) for _ in range(_per_user(rng, spec.events))]
+        caller_phones.extend((user_id, contact.phone_number)
+                             for contact in rng.sample(contacts, min(samples_per_user, len(contacts))))
+
+        with service.data_connection(user_id) as data:
+            # Durability is pointless for a throwaway dataset; restore it for shared shard connections
+            synchronous = data.execute('PRAGMA synchronous').fetchone()[0]
+            data.execute('PRAGMA synchronous = OFF')
+            try:
+                _insert(data, 'contacts', Contact, contacts)
+                _insert(data, 'calls', Call, calls)
+                _insert(data, 'calendar_events', CalendarEvent, events)
+                data.commit()
+            finally:
+                data.execute(f'PRAGMA synchronous = {synchronous}')
+        counts['contacts'] += len(contacts)
+        counts['calls'] += len(calls)
+        counts['calendar_events'] += len(events)
+
+    return Dataset(
+        spec=spec,
+        user_ids=[user[0] for user in users],
+        session_tokens=[session[2] for session in sessions],
+        caller_phones=caller_phones,
+        counts=counts,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def main():
+    """Generate a dataset and show its size and load rate (python -m app.local_datasets)."""
+    import os
+    import tempfile
+    from .local_service import LocalAuthService
+
+    spec = DatasetSpec(users=1000, contacts=200, calls=500, events=150)
+    service = LocalAuthService(os.path.join(tempfile.mkdtemp(), 'dataset.db'))
+    dataset = generate_dataset(service, spec)
+    rows = sum(dataset.counts.values())
+    print(f"{spec}: {dataset.counts}")
+    print(f"Loaded {rows} rows in {dataset.seconds:.1f}s ({rows / dataset.seconds:,.0f} rows/s) "
+          f"into {os.path.getsize(service.db_path) / 2**20:.0f} MiB")
+
+    again = generate_dataset(LocalAuthService(os.path.join(tempfile.mkdtemp(), 'dataset.db')), spec)
+    print(f"Same seed, same data: {again.user_ids == dataset.user_ids and again.counts == dataset.counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Per-request deadlines for the local server.
+Every HTTP route has a time budget (DEFAULT_DEADLINES, overridable through
+AI_RECEPTIONIST_DEADLINES). While a request runs its deadline sits in a context
+variable, and every SQLite connection the data layer opens or borrows for it gets a
+progress handler that interrupts the running statement once the deadline passes, plus
+a busy timeout no longer than the time left. Lock waits and runaway queries therefore
+end with the deadline instead of holding a worker; the request answers 503.
+"""
+
+import contextvars
+import math
+import os
+import sqlite3
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator, Tuple
+
+from .local_records import DeadlineExceeded
+
+# Budget of routes not listed in DEFAULT_DEADLINES (AI_RECEPTIONIST_DEADLINE_MS)
+DEFAULT_DEADLINE_MS = 2000
+
+# Budgets in milliseconds by "METHOD /route" or "/route"; None means no deadline.
+# Streams, uploads over slow links and admin jobs are not bounded.
+DEFAULT_DEADLINES: Dict[str, Optional[int]] = {
+    'GET /health': 250,
+    'POST /auth/login': 1000,
+    'GET /auth/me': 500,
+    'POST /contacts/import': 30000,
+    'GET /contacts/duplicates': 5000,
+    'POST /contacts/merge': 5000,
+    'GET /transcripts/search': 3000,
+    'GET /analytics/calls': 5000,
+    'PUT /recordings/{recording_id}/chunks/{index}': None,
+    'GET /recordings/{recording_id}/content': None,
+    'GET /events': None,
+    'GET /export': None,
+    'POST /archive/run': None,
+}
+
+# sqlite3.connect's busy timeout, restored on shared connections after a request
+BUSY_TIMEOUT_SECONDS = 5.0
+
+# SQLite virtual machine instructions between deadline checks
+PROGRESS_INTERVAL = 1000
+
+# A busy timeout cut to the deadline fires just short of it; a request failing this
+# close to its deadline counts as having run out of time
+DEADLINE_MARGIN_SECONDS = 0.05
+
+_current: contextvars.ContextVar = contextvars.ContextVar('request_deadline', default=None)
+
+
+class Deadline:
+    """The time budget of one request; blown is set once anything noticed it passing."""
+
+    __slots__ = ('route', 'expires', 'blown')
+
+    def __init__(self, route: str, seconds: float):
+        self.route = route
+        self.expires = time.monotonic() + seconds
+        self.blown = False
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    def expired(self, margin: float = 0.0) -> bool:
+        if time.monotonic() + margin >= self.expires:
+            self.blown = True
+        return self.blown
+
+    def finish(self):
+        """The response is ready; streaming its body is not bounded."""
+        self.expires = math.inf
+
+
+@contextmanager
+def deadline_scope(route: str, seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Run the enclosed work (and threads it starts with copied context) under a deadline.
+
+    With seconds None the work is unbounded and None is yielded.
+    """
+    if seconds is None:
+        yield None
+        return
+    deadline = Deadline(route, seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def deadline_exceeded(message: str = 'Request deadline exceeded') -> DeadlineExceeded:
+    """Mark the current deadline blown and return the error to raise."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.blown = True
+    return DeadlineExceeded(message)
+
+
+def check_deadline():
+    """Raise DeadlineExceeded if the current request is out of time."""
+    deadline = _current.get()
+    if deadline is not None and deadline.expired():
+        raise deadline_exceeded()
+
+
+def is_lock_timeout(error: Optional[BaseException]) -> bool:
+    """Whether an error (or what it was raised from) is SQLite giving up on a lock."""
+    while error is not None:
+        if isinstance(error, sqlite3.OperationalError) and 'locked' in str(error):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def busy_timeout(default: float = BUSY_TIMEOUT_SECONDS) -> float:
+    """Seconds SQLite may wait on a lock: the default, cut to what the deadline leaves."""
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    return max(0.0, min(default, deadline.remaining()))
+
+
+def lock_timeout() -> float:
+    """Timeout for threading lock acquire(): -1 (wait forever) without a deadline."""
+    deadline = _current.get()
+    if deadline is None or deadline.expires == math.inf:
+        return -1
+    return max(0.0, deadline.remaining())
+
+
+def _interrupt_after(conn: sqlite3.Connection, deadline: Deadline):
+    # Returning true from the handler makes SQLite abort the statement ("interrupted")
+    conn.set_progress_handler(deadline.expired, PROGRESS_INTERVAL)
+
+
+def connect_within_deadline(path: str, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect for a private connection, bounded by the current deadline if any."""
+    check_deadline()
+    conn = sqlite3.connect(path, timeout=busy_timeout(kwargs.pop('timeout', BUSY_TIMEOUT_SECONDS)), **kwargs)
+    deadline = _current.get()
+    if deadline is not None:
+        _interrupt_after(conn, deadline)
+    return conn
+
+
+@contextmanager
+def within_deadline(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Bound a borrowed (shared) connection by the current deadline while it is held."""
+    deadline = _current.get()
+    if deadline is None:
+        yield conn
+        return
+
+    check_deadline()
+    previous = conn.execute('PRAGMA busy_timeout').fetchone()[0]
+    conn.execute(f'PRAGMA busy_timeout = {int(busy_timeout(previous / 1000) * 1000)}')
+    _interrupt_after(conn, deadline)
+    try:
+        yield conn
+    finally:
+        conn.set_progress_handler(None, PROGRESS_INTERVAL)
+        conn.execute(f'PRAGMA busy_timeout = {previous}')
+
+
+def parse_deadlines(spec: str) -> Dict[str, Optional[int]]:
+    """'GET /calls=500,/export=0' -> {'GET /calls': 500, '/export': None}; 0 or 'none' disables."""
+    deadlines = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        route, _, value = item.rpartition('=')
+        if not route:
+            raise ValueError(f'Bad deadline entry {item!r}; expected ROUTE=MILLISECONDS')
+        milliseconds = None if value.strip().lower() in ('0', 'none', '') else int(value)
+        deadlines[route.strip()] = milliseconds
+    return deadlines
+
+
+class RequestDeadlines:
+    """Per-route budgets and how often they were blown."""
+
+    def __init__(self, default_ms: Optional[int] = DEFAULT_DEADLINE_MS,
+                 routes: Optional[Dict[str, Optional[int]]] = None):
+        self.default_ms = default_ms
+        self.routes = dict(DEFAULT_DEADLINES if routes is None else routes)
+        self.requests: Counter = Counter()
+        self.exceeded: Counter = Counter()
+        self.lock_timeouts: Counter = Counter()
+
+    @classmethod
+    def from_env(cls) -> 'RequestDeadlines':
+        default = int(os.environ.get('AI_RECEPTIONIST_DEADLINE_MS', DEFAULT_DEADLINE_MS)) or None
+        routes = dict(DEFAULT_DEADLINES)
+        routes.update(parse_deadlines(os.environ.get('AI_RECEPTIONIST_DEADLINES', '')))
+        return cls(default, routes)
+
+    def budget(self, method: str, route: str) -> Optional[float]:
+        """Seconds allowed for a route, or None for no deadline."""
+        for key in (f'{method} {route}', route):
+            if key in self.routes:
+                milliseconds = self.routes[key]
+                break
+        else:
+            milliseconds = self.default_ms
+        return None if milliseconds is None else milliseconds / 1000
+
+    def for_scope(self, routes, scope: Dict[str, Any]) -> Tuple[str, Optional[float]]:
+        """("METHOD /route", seconds) for an ASGI HTTP scope, matched against the app's routes."""
+        from starlette.routing import Match
+
+        for candidate in routes:
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                return f"{scope['method']} {candidate.path}", self.budget(scope['method'], candidate.path)
+        # Unknown paths end in a 404 without touching the database
+        return f"{scope['method']} {scope['path']}", None
+
+    def settle(self, route: str, deadline: Optional[Deadline], error: Optional[BaseException] = None,
+               status: int = 200) -> Optional[str]:
+        """Count a finished request; 'exceeded' or 'locked' when it has to answer 503 instead.
+
+        Only failed requests are checked against the deadline margin, so a response that
+        completed (and maybe committed) is never turned into a retryable error.
+        """
+        failed = error is not None or status >= 400
+        if deadline is not None:
+            if failed:
+                deadline.expired(DEADLINE_MARGIN_SECONDS)
+            deadline.finish()
+
+        self.requests[route] += 1
+        if deadline is not None and deadline.blown:
+            self.exceeded[route] += 1
+            return 'exceeded'
+        if failed and is_lock_timeout(error):
+            self.lock_timeouts[route] += 1
+            return 'locked'
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'default_ms': self.default_ms,
+            'routes': self.routes,
+            'requests': sum(self.requests.values()),
+            'exceeded': sum(self.exceeded.values()),
+            'exceeded_by_route': dict(self.exceeded.most_common()),
+            'lock_timeouts': sum(self.lock_timeouts.values()),
+            'lock_timeouts_by_route': dict(self.lock_timeouts.most_common()),
+        }
+
+
+def main():
+    """Show runaway queries and lock waits ending at the deadline (python -m app.local_deadlines)."""
+    import tempfile
+    import threading
+    from .local_service import LocalAuthService
+    from .local_records import ServiceError
+    # Under python -m this file is __main__; the service reads the package module's deadline
+    from .local_deadlines import deadline_scope, RequestDeadlines
+
+    service = LocalAuthService(os.path.join(tempfile.mkdtemp(), 'deadlines.db'))
+    user_id = service.register_user('bench@example.com', 'benchmark', 'Bench').id
+    for i in range(2000):
+        service.create_call(user_id, {'title': f'Call {i}', 'scheduled_at': f'2026-01-{i % 28 + 1:02d}T09:00:00'})
+
+    runaway = 'WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n'
+    with deadline_scope('bench', 0.2) as deadline:
+        started = time.perf_counter()
+        try:
+            with service.data_connection(user_id) as conn:
+                conn.execute(runaway).fetchone()
+        except sqlite3.OperationalError as e:
+            print(f"Runaway query under a 200 ms deadline: {e} after "
+                  f"{(time.perf_counter() - started) * 1000:.0f} ms (blown={deadline.blown})")
+
+    # A writer holding the lock: without a deadline the next writer waits the full 5 s
+    holder = sqlite3.connect(service.db_path, check_same_thread=False)
+    holder.execute('BEGIN IMMEDIATE')
+    timer = threading.Timer(3.0, holder.rollback)
+    timer.start()
+    deadlines = RequestDeadlines()
+    with deadline_scope('bench', 0.3) as deadline:
+        started = time.perf_counter()
+        try:
+            service.create_call(user_id, {'title': 'Blocked', 'scheduled_at': '2026-02-01T09:00:00'})
+        except ServiceError as e:
+            # Settled the way the server's middleware settles a request
+            outcome = deadlines.settle('bench', deadline, e, e.status)
+            print(f"Write behind a held lock under a 300 ms deadline: {e} after "
+                  f"{(time.perf_counter() - started) * 1000:.0f} ms, answered as {outcome or e.status}")
+    timer.join()
+    holder.close()
+
+    # Cost of the progress handler on an ordinary list, rounds interleaved
+    rounds = 200
+    spent = {'without deadline': 0.0, 'with deadline': 0.0}
+    for _ in range(rounds):
+        started = time.perf_counter()
+        service.list_calls(user_id)
+        spent['without deadline'] += time.perf_counter() - started
+        started = time.perf_counter()
+        with deadline_scope('bench', 60.0):
+            service.list_calls(user_id)
+        spent['with deadline'] += time.perf_counter() - started
+    for label, seconds in spent.items():
+        print(f"list_calls of 2000 calls {label}: {seconds / rounds * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+"""
+Contact de-duplication using blocking keys.
+Every contact gets a few cheap blocking keys (normalized phone, lowercased email,
+phonetic name). Only contacts sharing a key are compared, so the work grows with the
+number of real look-alikes rather than with n². Keys are stored, which lets new
+imports be checked against existing contacts without rescanning everyone.
+"""
+
+import re
+import time
+from difflib import SequenceMatcher
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple
+
+from .local_records import ServiceError, NotFoundError, Contact, select
+
+DEDUPE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS contact_block_keys (
+        user_id TEXT NOT NULL,
+        block_key TEXT NOT NULL,
+        contact_id TEXT NOT NULL,
+        PRIMARY KEY (user_id, block_key, contact_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_contact_block_keys_contact ON contact_block_keys(contact_id)',
+    '''
+    CREATE TABLE IF NOT EXISTS contact_duplicates (
+        user_id TEXT NOT NULL,
+        contact_a TEXT NOT NULL,
+        contact_b TEXT NOT NULL,
+        score REAL NOT NULL,
+        reasons TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        PRIMARY KEY (user_id, contact_a, contact_b)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_contact_duplicates_b ON contact_duplicates(contact_b)',
+]
+
+# Score at which a pair is suggested as a duplicate
+SUGGEST_THRESHOLD = 0.6
+
+# Blocks bigger than this (a shared office number, a placeholder email) carry no signal
+# and would bring back quadratic comparisons, so they are skipped
+MAX_BLOCK_SIZE = 50
+
+# Page cache used while rebuilding a user's keys, in KiB
+REBUILD_CACHE_KIB = 256 * 1024
+
+_SOUNDEX_CODES = {}
+for _letters, _digit in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'), ('l', '4'), ('mn', '5'), ('r', '6')):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _digit
+
+_NON_DIGITS = re.compile(r'\D')
+_NAME_TOKENS = re.compile(r'[a-z]+')
+
+
+def soundex(word: str) -> str:
+    """Classic four-character Soundex code of a lowercase word."""
+    if not word:
+        return ''
+    code = word[0].upper()
+    previous = _SOUNDEX_CODES.get(word[0], '')
+    for letter in word[1:]:
+        digit = _SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if letter not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """Digits only, keeping the last ten so country prefixes do not split matches."""
+    digits = _NON_DIGITS.sub('', phone or '')
+    return digits[-10:] if len(digits) >= 7 else ''
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lowercase name tokens in sorted order, so "Smith, John" equals "John Smith"."""
+    return ' '.join(sorted(_NAME_TOKENS.findall((name or '').lower())))
+
+
+def block_keys(name: Optional[str], phone: Optional[str], email: Optional[str]) -> List[str]:
+    """The blocking keys of one contact."""
+    keys = []
+    phone_key = normalize_phone(phone)
+    if phone_key:
+        keys.append('p:' + phone_key)
+    email_key = (email or '').strip().lower()
+    if '@' in email_key:
+        keys.append('e:' + email_key)
+    tokens = _NAME_TOKENS.findall((name or '').lower())
+    if tokens:
+        # First and last name, order-insensitive ("Smith, John" matches "John Smith")
+        keys.append('n:' + '-'.join(sorted({soundex(tokens[0]), soundex(tokens[-1])})))
+    return keys
+
+
+def score_pair(a: tuple, b: tuple) -> Tuple[float, List[str]]:
+    """Score two (id, name, phone, email, company) rows; higher is more likely the same person."""
+    score = 0.0
+    reasons = []
+
+    phone_a = normalize_phone(a[2])
+    if phone_a and phone_a == normalize_phone(b[2]):
+        score += 0.5
+        reasons.append('phone')
+    email_a = (a[3] or '').strip().lower()
+    if email_a and email_a == (b[3] or '').strip().lower():
+        score += 0.4
+        reasons.append('email')
+
+    name_a, name_b = normalize_name(a[1]), normalize_name(b[1])
+    if name_a and name_b:
+        similarity = 1.0 if name_a == name_b else SequenceMatcher(None, name_a, name_b).ratio()
+        score += 0.3 * similarity
+        if similarity >= 0.8:
+            reasons.append('name')
+
+    company_a = (a[4] or '').strip().lower()
+    if company_a and company_a == (b[4] or '').strip().lower():
+        score += 0.1
+        reasons.append('company')
+
+    return min(score, 1.0), reasons
+
+
+class ContactDeduplicator:
+    """Finds likely duplicate contacts per user and merges them on request."""
+
+    def __init__(self, service, threshold: float = SUGGEST_THRESHOLD, max_block_size: int = MAX_BLOCK_SIZE):
+        self.service = service
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+
+    def on_change(self, user_id: str, table: str, op: str, row: tuple):
+        """Change listener: check new and edited contacts incrementally."""
+        if table != 'contacts':
+            return
+        if op == 'import':
+            self.process_contacts(user_id, row.ids)
+        elif op in ('insert', 'update'):
+            self.process_contacts(user_id, [row.id])
+        elif op == 'delete':
+            self._forget(user_id, [row.id])
+
+    def _forget(self, user_id: str, contact_ids: List[str]):
+        with self.service.data_connection(user_id) as conn:
+            for contact_id in contact_ids:
+                conn.execute('DELETE FROM contact_block_keys WHERE contact_id = ?', (contact_id,))
+                conn.execute('DELETE FROM contact_duplicates WHERE user_id = ? AND (contact_a = ? OR contact_b = ?)',
+                             (user_id, contact_id, contact_id))
+            conn.commit()
+
+    @staticmethod
+    def _key_rows(user_id: str, rows: Iterable[tuple]) -> Iterator[tuple]:
+        for contact_id, name, phone, email, _ in rows:
+            for key in block_keys(name, phone, email):
+                yield user_id, key, contact_id
+
+    def _store_pairs(self, conn, user_id: str, pairs: List[Tuple[str, str, float, List[str]]]) -> int:
+        now = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime())
+        conn.executemany('''
+            INSERT OR REPLACE INTO contact_duplicates (user_id, contact_a, contact_b, score, reasons, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(user_id, a, b, round(score, 3), ','.join(reasons), now) for a, b, score, reasons in pairs])
+        return len(pairs)
+
+    def _score_block(self, members: List[tuple], only_ids: Optional[set], seen: set,
+                     pairs: List[Tuple[str, str, float, List[str]]]):
+        """Compare members of one block; with only_ids, only pairs touching those contacts."""
+        if len(members) < 2 or len(members) > self.max_block_size:
+            return
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                a, b = members[i], members[j]
+                if only_ids is not None and a[0] not in only_ids and b[0] not in only_ids:
+                    continue
+                pair = (a[0], b[0]) if a[0] < b[0] else (b[0], a[0])
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                score, reasons = score_pair(a, b)
+                if score >= self.threshold:
+                    pairs.append((pair[0], pair[1], score, reasons))
+
+    def rebuild(self, user_id: str, batch_size: int = 5000) -> Dict[str, Any]:
+        """Recompute every blocking key and duplicate suggestion of a user."""
+        started = time.perf_counter()
+        with self.service.data_connection(user_id) as conn:
+            # The key index is built in random key order; a bigger page cache keeps it
+            # from thrashing on large contact lists
+            cache_size = conn.execute('PRAGMA cache_size').fetchone()[0]
+            conn.execute(f'PRAGMA cache_size = {-REBUILD_CACHE_KIB}')
+            conn.execute('DELETE FROM contact_block_keys WHERE user_id = ?', (user_id,))
+            conn.execute('DELETE FROM contact_duplicates WHERE user_id = ?', (user_id,))
+
+            cursor = conn.execute(
+                'SELECT id, name, phone_number, email, company FROM contacts WHERE user_id = ?', (user_id,)
+            )
+            contacts = 0
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                contacts += len(rows)
+                conn.executemany(
+                    'INSERT OR IGNORE INTO contact_block_keys (user_id, block_key, contact_id) VALUES (?, ?, ?)',
+                    list(self._key_rows(user_id, rows))
+                )
+
+            # Walk the keys in order; each run of equal keys is one block. Singleton and
+            # oversized blocks are filtered out before touching the contacts table.
+            blocks = conn.execute('''
+                WITH candidate_blocks AS (
+                    SELECT block_key FROM contact_block_keys WHERE user_id = ?
+                    GROUP BY block_key HAVING COUNT(*) BETWEEN 2 AND ?
+                )
+                SELECT k.block_key, c.id, c.name, c.phone_number, c.email, c.company
+                FROM candidate_blocks b
+                JOIN contact_block_keys k ON k.user_id = ? AND k.block_key = b.block_key
+                JOIN contacts c ON c.id = k.contact_id
+                ORDER BY k.block_key
+            ''', (user_id, self.max_block_size, user_id))
+            seen: set = set()
+            pairs: List[Tuple[str, str, float, List[str]]] = []
+            current_key = None
+            members: List[tuple] = []
+            for row in blocks:
+                if row[0] != current_key:
+                    self._score_block(members, None, seen, pairs)
+                    current_key, members = row[0], []
+                members.append(row[1:])
+            self._score_block(members, None, seen, pairs)
+
+            suggestions = self._store_pairs(conn, user_id, pairs)
+            conn.commit()
+            skipped_blocks = conn.execute('''
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM contact_block_keys WHERE user_id = ?
+                    GROUP BY block_key HAVING COUNT(*) > ?
+                )
+            ''', (user_id, self.max_block_size)).fetchone()[0]
+            conn.execute(f'PRAGMA cache_size = {cache_size}')
+
+        return {
+            'contacts': contacts,
+            'comparisons': len(seen),
+            'suggestions': suggestions,
+            # Blocks over max_block_size, whose members were not compared
+            'skipped_blocks': skipped_blocks,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+
+    def process_contacts(self, user_id: str, contact_ids: List[str]) -> int:
+        """Key new or changed contacts and compare them with their blocks only."""
+        if not contact_ids:
+            return 0
+        wanted = set(contact_ids)
+
+        with self.service.data_connection(user_id) as conn:
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS dedupe_batch (contact_id TEXT PRIMARY KEY)')
+            conn.execute('DELETE FROM dedupe_batch')
+            conn.executemany('INSERT OR IGNORE INTO dedupe_batch (contact_id) VALUES (?)',
+                             [(contact_id,) for contact_id in wanted])
+
+            # Drop stale keys and suggestions of edited contacts before re-keying them
+            conn.execute('DELETE FROM contact_block_keys WHERE contact_id IN (SELECT contact_id FROM dedupe_batch)')
+            conn.execute('''
+                DELETE FROM contact_duplicates WHERE user_id = ? AND (
+                    contact_a IN (SELECT contact_id FROM dedupe_batch) OR
+                    contact_b IN (SELECT contact_id FROM dedupe_batch))
+            ''', (user_id,))
+            rows = conn.execute('''
+                SELECT id, name, phone_number, email, company FROM contacts
+                WHERE user_id = ? AND id IN (SELECT contact_id FROM dedupe_batch)
+            ''', (user_id,)).fetchall()
+            conn.executemany(
+                'INSERT OR IGNORE INTO contact_block_keys (user_id, block_key, contact_id) VALUES (?, ?, ?)',
+                list(self._key_rows(user_id, rows))
+            )
+
+            blocks = conn.execute('''
+                SELECT k.block_key, c.id, c.name, c.phone_number, c.email, c.company
+                FROM contact_block_keys k JOIN contacts c ON c.id = k.contact_id
+                WHERE k.user_id = ? AND k.block_key IN (
+                    SELECT block_key FROM contact_block_keys
+                    WHERE user_id = ? AND block_key IN (
+                        SELECT block_key FROM contact_block_keys
+                        WHERE contact_id IN (SELECT contact_id FROM dedupe_batch)
+                    )
+                    GROUP BY block_key HAVING COUNT(*) BETWEEN 2 AND ?
+                )
+                ORDER BY k.block_key
+            ''', (user_id, user_id, self.max_block_size))
+            seen: set = set()
+            pairs: List[Tuple[str, str, float, List[str]]] = []
+            current_key = None
+            members: List[tuple] = []
+            for row in blocks:
+                if row[0] != current_key:
+                    self._score_block(members, wanted, seen, pairs)
+                    current_key, members = row[0], []
+                members.append(row[1:])
+            self._score_block(members, wanted, seen, pairs)
+
+            suggestions = self._store_pairs(conn, user_id, pairs)
+            conn.execute('DELETE FROM dedupe_batch')
+            conn.commit()
+
+        return suggestions
+
+    def suggestions(self, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Highest-scoring duplicate pairs with both contacts' key fields."""
+        with self.service.data_connection(user_id) as conn:
+            rows = conn.execute('''
+                SELECT d.score, d.reasons,
+                       a.id, a.name, a.phone_number, a.email, a.company,
+                       b.id, b.name, b.phone_number, b.email, b.company
+                FROM contact_duplicates d
+                JOIN contacts a ON a.id = d.contact_a
+                JOIN contacts b ON b.id = d.contact_b
+                WHERE d.user_id = ?
+                ORDER BY d.score DESC
+                LIMIT ?
+            ''', (user_id, limit)).fetchall()
+
+        fields = ['id', 'name', 'phone_number', 'email', 'company']
+        return [{
+            'score': row[0],
+            'reasons': row[1].split(',') if row[1] else [],
+            'contacts': [dict(zip(fields, row[2:7])), dict(zip(fields, row[7:12]))],
+        } for row in rows]
+
+    def merge(self, user_id: str, keep_id: str, merge_ids: List[str]) -> Dict[str, Any]:
+        """Fold contacts into keep_id: fill its empty fields, re-point their calls, delete them."""
+        merge_ids = [contact_id for contact_id in dict.fromkeys(merge_ids) if contact_id != keep_id]
+        if not merge_ids:
+            raise ServiceError('Nothing to merge')
+
+        ids = [keep_id, *merge_ids]
+        placeholders = ', '.join('?' for _ in ids)
+
+        with self.service.data_connection(user_id) as conn:
+            contacts = {contact.id: contact for contact in select(
+                conn, Contact,
+                f"SELECT {', '.join(Contact._fields)} FROM contacts WHERE user_id = ? AND id IN ({placeholders})",
+                (user_id, *ids)
+            )}
+            if len(contacts) != len(ids):
+                raise NotFoundError('Contact not found')
+
+            keep = contacts[keep_id]
+            merged = {field: getattr(keep, field) for field in ('role', 'email', 'company')}
+            notes = [keep.notes] if keep.notes else []
+            tags = [tag.strip() for tag in (keep.tags or '').split(',') if tag.strip()]
+            is_favorite = keep.is_favorite
+            for contact_id in merge_ids:
+                other = contacts[contact_id]
+                for field in merged:
+                    if not merged[field] and getattr(other, field):
+                        merged[field] = getattr(other, field)
+                if other.notes and other.notes not in notes:
+                    notes.append(other.notes)
+                for tag in (other.tags or '').split(','):
+                    if tag.strip() and tag.strip() not in tags:
+                        tags.append(tag.strip())
+                is_favorite = is_favorite or other.is_favorite
+            keep = keep._replace(
+                **merged,
+                notes='\n'.join(notes) or None,
+                tags=','.join(tags) or None,
+                is_favorite=int(bool(is_favorite)),
+                updated_at=datetime.utcnow().isoformat(),
+            )
+
+            merge_placeholders = ', '.join('?' for _ in merge_ids)
+            repointed = 0
+            for table in ('calls', 'calls_archive'):
+                cursor = conn.execute(
+                    f'UPDATE {table} SET contact_id = ? WHERE user_id = ? AND contact_id IN ({merge_placeholders})',
+                    (keep_id, user_id, *merge_ids)
+                )
+                repointed += cursor.rowcount
+            fields = [field for field in Contact._fields if field not in ('id', 'user_id', 'created_at')]
+            conn.execute(
+                f"UPDATE contacts SET {', '.join(f'{field} = ?' for field in fields)} WHERE id = ?",
+                (*[getattr(keep, field) for field in fields], keep_id)
+            )
+            conn.execute(f'DELETE FROM contacts WHERE id IN ({merge_placeholders})', merge_ids)
+            conn.commit()
+
+        self._forget(user_id, merge_ids)
+        for contact_id in merge_ids:
+            self.service._notify_change(user_id, 'contacts', 'delete', contacts[contact_id])
+        self.service._notify_change(user_id, 'contacts', 'update', keep)
+
+        return {
+            'contact': keep,
+            'merged': merge_ids,
+            'calls_repointed': repointed,
+        }
+
+
+def main():
+    """Benchmark a full de-duplication run on synthetic contacts (python -m app.local_dedupe)."""
+    import random
+    import tempfile
+    import os
+    from .local_service import LocalAuthService
+
+    count = 1_000_000
+    rng = random.Random(42)
+
+    # Name frequencies follow a power law: a few common names, a long tail of rare ones.
+    # Names are built from syllables so their Soundex codes spread like real ones; a
+    # handful of fixed lists would put every contact in a few oversized name blocks.
+    syllables = ['al', 'an', 'ar', 'ba', 'be', 'bo', 'ca', 'ce', 'da', 'de', 'di', 'el', 'en', 'er', 'fa',
+                 'ga', 'ha', 'in', 'ka', 'la', 'le', 'li', 'lo', 'ma', 'me', 'mi', 'mo', 'na', 'ne', 'ni',
+                 'no', 'ra', 're', 'ri', 'ro', 'sa', 'se', 'so', 'ta', 'te', 'ti', 'to', 'va', 'vi', 'wa',
+                 'ya', 'za', 'ch', 'sh', 'th', 'mp', 'nd', 'st', 'gr', 'br', 'kl', 'pr', 'tr', 'ck', 'gh']
+
+    def name_pool(size: int, min_syllables: int, max_syllables: int) -> List[str]:
+        names = set()
+        while len(names) < size:
+            names.add(''.join(rng.choice(syllables) for _ in range(rng.randint(min_syllables, max_syllables))))
+        names = sorted(names)
+        rng.shuffle(names)
+        return names
+
+    def zipf_weights(size: int, exponent: float = 0.7) -> List[float]:
+        total, weights = 0.0, []
+        for rank in range(1, size + 1):
+            total += rank ** -exponent
+            weights.append(total)
+        return weights
+
+    first_names, last_names = name_pool(3000, 2, 3), name_pool(60000, 2, 4)
+    firsts = rng.choices(first_names, cum_weights=zipf_weights(len(first_names)), k=count)
+    lasts = rng.choices(last_names, cum_weights=zipf_weights(len(last_names)), k=count)
+
+    service = LocalAuthService(os.path.join(tempfile.mkdtemp(), 'dedupe_bench.db'))
+    user_id = service.register_user('bench@example.com', 'benchmark', 'Bench').id
+
+    contacts = []
+    for i in range(count):
+        if contacts and rng.random() < 0.05:
+            # Re-import of an earlier contact with small variations
+            original = contacts[rng.randrange(len(contacts))]
+            contacts.append({
+                'name': original['name'].upper() if rng.random() < 0.5 else original['name'] + 'e',
+                'phone_number': '+1 ' + original['phone_number'],
+                'email': original['email'],
+                'company': original['company'],
+            })
+            continue
+        first, last = firsts[i], lasts[i]
+        contacts.append({
+            'name': f"{first.title()} {last.title()}",
+            'phone_number': f"{rng.randrange(200, 999)}{rng.randrange(10**6, 10**7)}",
+            'email': f"{first}.{last}{i}@example.com" if rng.random() < 0.7 else None,
+            'company': f"Company {rng.randrange(5000)}",
+        })
+
+    service.import_contacts(user_id, contacts)
+    result = ContactDeduplicator(service).rebuild(user_id)
+    print(f"Imported {count} contacts")
+    print(f"Full run over {result['contacts']} contacts: {result['comparisons']} comparisons, "
+          f"{result['suggestions']} suggestions in {result['seconds']}s "
+          f"({result['skipped_blocks']} blocks over {MAX_BLOCK_SIZE} contacts skipped)")
+
+    started = time.perf_counter()
+    batch = service.import_contacts(user_id, contacts[:1000])
+    found = ContactDeduplicator(service).process_contacts(user_id, batch.ids)
+    print(f"Incremental import of 1000 contacts: {found} suggestions in {time.perf_counter() - started:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+In-process pub/sub for pushing data changes to connected clients.
+Write paths publish per-user change events from whatever thread they run in; each
+subscriber (one WebSocket or SSE connection) owns a small bounded asyncio queue on the
+server's event loop. A subscriber that falls behind and fills its queue is dropped
+rather than buffered, and reconnects and refetches instead.
+"""
+
+import asyncio
+import threading
+from typing import Optional, Dict, Any, Set
+
+# Events buffered per subscriber before it is considered too slow and dropped
+SUBSCRIBER_QUEUE_SIZE = 64
+
+
+class Subscription:
+    """One client's stream of change events."""
+
+    __slots__ = ('user_id', 'queue', 'loop', 'dropped')
+
+    def __init__(self, user_id: str, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def _offer(self, event: Dict[str, Any]) -> bool:
+        """Queue an event on the subscriber's loop; returns False if it overflowed."""
+        if self.dropped:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            # Wake the reader so it notices and closes the connection
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next event; None once dropped. Raises asyncio.TimeoutError after timeout seconds."""
+        if self.dropped and self.queue.empty():
+            return None
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class ChangeBroker:
+    """Fans out per-user events to that user's subscriptions."""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self, user_id: str) -> Subscription:
+        """Subscribe from a coroutine running on the server's event loop."""
+        subscription = Subscription(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, user_id: str, event: Dict[str, Any]):
+        """Send an event to every subscription of a user. Safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        if not subscribers:
+            return
+
+        self.published += 1
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(self._deliver, subscription, event)
+
+    def _deliver(self, subscription: Subscription, event: Dict[str, Any]):
+        if subscription.dropped:
+            return
+        if not subscription._offer(event):
+            self.dropped_subscribers += 1
+            self.unsubscribe(subscription)
+
+    def on_change(self, user_id: str, table: str, op: str, row: tuple):
+        """Change listener: push call and calendar event writes to the user's clients."""
+        if table not in ('calls', 'calendar_events'):
+            return
+        self.publish(user_id, {'type': f'{table}.{op}', 'table': table, 'op': op, 'row': row._asdict()})
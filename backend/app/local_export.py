@@ -0,0 +1,112 @@
+"""
+Streaming export of a user's data from the local database.
+Rows are read in fetchmany batches and encoded as they go, so memory use stays flat
+regardless of how many contacts, calls or calendar events a user has.
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Iterator, List, Optional
+
+# Tables a user can export, in the order they are written
+EXPORT_TABLES = ['contacts', 'calls', 'calendar_events', 'calls_archive', 'calendar_events_archive']
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+# Rows pulled from the cursor per fetchmany call
+EXPORT_BATCH_SIZE = 500
+
+
+def _iter_batches(conn, table: str, user_id: str, batch_size: int):
+    """Yield (column_names, rows) batches for one table, straight from the cursor."""
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT * FROM {table} WHERE user_id = ? ORDER BY rowid', (user_id,))
+    columns = [col[0] for col in cursor.description]
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield columns, rows
+
+
+def _encode_ndjson(conn, tables: List[str], user_id: str, batch_size: int) -> Iterator[bytes]:
+    """Encode rows as one JSON object per line, tagged with their table."""
+    for table in tables:
+        for columns, rows in _iter_batches(conn, table, user_id, batch_size):
+            keep = [i for i, name in enumerate(columns) if name != 'user_id']
+            lines = []
+            for row in rows:
+                record = {'table': table}
+                for i in keep:
+                    record[columns[i]] = row[i]
+                lines.append(json.dumps(record, separators=(',', ':')))
+            yield ('\n'.join(lines) + '\n').encode()
+
+
+def _encode_csv(conn, table: str, user_id: str, batch_size: int) -> Iterator[bytes]:
+    """Encode rows of a single table as CSV with a header line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+
+    for columns, rows in _iter_batches(conn, table, user_id, batch_size):
+        keep = [i for i, name in enumerate(columns) if name != 'user_id']
+        if not header_written:
+            writer.writerow([columns[i] for i in keep])
+            header_written = True
+        for row in rows:
+            writer.writerow([row[i] for i in keep])
+
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if not header_written:
+        # Empty table: still emit the header so the file is well formed
+        cursor = conn.execute(f'SELECT * FROM {table} LIMIT 0')
+        writer.writerow([col[0] for col in cursor.description if col[0] != 'user_id'])
+        yield buffer.getvalue().encode()
+
+
+def _gzip_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Compress a byte stream on the fly into gzip format."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(service, user_id: str, fmt: str = 'ndjson', table: Optional[str] = None,
+                  compress: bool = False, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Stream a user's data as NDJSON or CSV bytes, optionally gzip compressed.
+
+    CSV covers a single table, NDJSON covers one table or all of them.
+    The database connection is opened on the first chunk and closed when the
+    stream is exhausted or abandoned.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if table is not None and table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table: {table}")
+    if fmt == 'csv' and table is None:
+        raise ValueError("CSV export needs a single table")
+
+    tables = [table] if table else EXPORT_TABLES
+
+    def generate():
+        conn = service.open_reader(user_id)
+        try:
+            if fmt == 'csv':
+                chunks = _encode_csv(conn, table, user_id, batch_size)
+            else:
+                chunks = _encode_ndjson(conn, tables, user_id, batch_size)
+            yield from (_gzip_stream(chunks) if compress else chunks)
+        finally:
+            conn.close()
+
+    return generate()
@@ -0,0 +1,232 @@
+"""
+Benchmarks of the hot data-plane queries against a synthetic dataset.
+Each query in QUERIES mirrors SQL the service issues on a request path (session checks,
+per-user lists, time-range reads, caller lookups). The suite times it with realistic
+parameters drawn from the dataset and records its EXPLAIN QUERY PLAN, flagging full
+table scans and sorts done in a temporary b-tree.
+"""
+
+import random
+import re
+import sqlite3
+import statistics
+import time
+from datetime import timedelta
+from typing import NamedTuple, Callable, Dict, Any, List, Tuple
+
+from .local_records import User, Contact, Call, CalendarEvent
+from .local_datasets import ANCHOR, Dataset
+
+CONTACT_LIST = ', '.join(Contact._fields)
+CALL_LIST = ', '.join(Call._fields)
+EVENT_LIST = ', '.join(CalendarEvent._fields)
+
+# "SCAN calls" or "SCAN calls USING COVERING INDEX ...": every row of the table is visited
+_FULL_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+class BenchQuery(NamedTuple):
+    name: str
+    # 'directory' (users and sessions) or 'data' (the user's contacts, calls and events)
+    database: str
+    sql: str
+    # (dataset, rng) -> (user_id, params)
+    params: Callable[[Dataset, random.Random], Tuple[str, tuple]]
+
+
+def _user(dataset: Dataset, rng: random.Random) -> str:
+    return rng.choice(dataset.user_ids)
+
+
+def _week(rng: random.Random) -> Tuple[str, str]:
+    start = ANCHOR + timedelta(days=rng.randrange(-28, 14))
+    return start.isoformat(), (start + timedelta(days=7)).isoformat()
+
+
+def _user_only(dataset: Dataset, rng: random.Random) -> Tuple[str, tuple]:
+    user_id = _user(dataset, rng)
+    return user_id, (user_id,)
+
+
+def _user_upcoming(dataset: Dataset, rng: random.Random) -> Tuple[str, tuple]:
+    user_id = _user(dataset, rng)
+    return user_id, (user_id, 'scheduled', ANCHOR.isoformat())
+
+
+def _user_week(dataset: Dataset, rng: random.Random) -> Tuple[str, tuple]:
+    user_id = _user(dataset, rng)
+    return user_id, (user_id, *_week(rng))
+
+
+def _user_week_overlap(dataset: Dataset, rng: random.Random) -> Tuple[str, tuple]:
+    user_id = _user(dataset, rng)
+    lower, upper = _week(rng)
+    return user_id, (user_id, upper, lower)
+
+
+def _caller(dataset: Dataset, rng: random.Random) -> Tuple[str, tuple]:
+    user_id, phone_number = rng.choice(dataset.caller_phones)
+    return user_id, (user_id, phone_number)
+
+
+QUERIES = [
+    # LocalAuthService.get_user_by_session, on every authenticated request
+    BenchQuery('session_lookup', 'directory', f'''
+        SELECT {', '.join(f'u.{field}' for field in User._fields)}, s.expires_at
+        FROM users u JOIN user_sessions s ON u.id = s.user_id
+        WHERE s.session_token = ? AND u.is_active = 1
+    ''', lambda dataset, rng: ('', (rng.choice(dataset.session_tokens),))),
+    # LocalAuthService.login_user
+    BenchQuery('login_by_email', 'directory', f'''
+        SELECT {', '.join(User._fields)}, hashed_password, is_active FROM users WHERE email = ?
+    ''', lambda dataset, rng: ('', (f"user{rng.randrange(len(dataset.user_ids))}@bench.example",))),
+    # Incoming call: which contact is calling
+    BenchQuery('caller_lookup', 'data', f'''
+        SELECT {CONTACT_LIST} FROM contacts WHERE user_id = ? AND phone_number = ?
+    ''', _caller),
+    BenchQuery('contacts_list', 'data', f'''
+        SELECT {CONTACT_LIST} FROM contacts WHERE user_id = ? ORDER BY name
+    ''', _user_only),
+    # LocalAuthService.list_calls without and with a time range
+    BenchQuery('calls_list', 'data', f'''
+        SELECT {CALL_LIST} FROM calls WHERE user_id = ? ORDER BY scheduled_at
+    ''', _user_only),
+    BenchQuery('calls_range', 'data', f'''
+        SELECT {CALL_LIST} FROM calls WHERE user_id = ? AND scheduled_at >= ? AND scheduled_at < ?
+        ORDER BY scheduled_at
+    ''', _user_week),
+    BenchQuery('calls_upcoming', 'data', f'''
+        SELECT {CALL_LIST} FROM calls WHERE user_id = ? AND status = ? AND scheduled_at >= ?
+        ORDER BY scheduled_at
+    ''', _user_upcoming),
+    # LocalAuthService.list_calendar_events without and with a time range
+    BenchQuery('events_list', 'data', f'''
+        SELECT {EVENT_LIST} FROM calendar_events WHERE user_id = ? ORDER BY start_time
+    ''', _user_only),
+    BenchQuery('events_range', 'data', f'''
+        SELECT {EVENT_LIST} FROM calendar_events WHERE user_id = ? AND start_time >= ? AND start_time < ?
+        ORDER BY start_time
+    ''', _user_week),
+    # AgendaCache._source_streams: one-off events overlapping the window
+    BenchQuery('agenda_events', 'data', '''
+        SELECT id, title, start_time, end_time, color, is_all_day, recurrence_rule FROM calendar_events
+        WHERE user_id = ? AND recurrence_rule IS NULL AND start_time < ? AND end_time > ?
+        ORDER BY start_time
+    ''', _user_week_overlap),
+]
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params: tuple) -> List[str]:
+    """EXPLAIN QUERY PLAN details, indented by depth."""
+    depth: Dict[int, int] = {}
+    lines = []
+    for node, parent, _, detail in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params):
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return lines
+
+
+def plan_flags(plan: List[str]) -> List[str]:
+    """Problems visible in a plan: full table scans and temporary sorts."""
+    flags = []
+    for line in plan:
+        detail = line.strip()
+        match = _FULL_SCAN.match(detail)
+        if match:
+            flags.append(f'full scan of {match.group(1)}')
+        elif detail.startswith('USE TEMP B-TREE'):
+            flags.append(detail.lower().replace('use ', '', 1))
+    return flags
+
+
+class QueryPlanSuite:
+    """Times QUERIES against a service loaded with a dataset and checks their plans."""
+
+    def __init__(self, service, dataset: Dataset, queries: List[BenchQuery] = QUERIES, seed: int = 7):
+        self.service = service
+        self.dataset = dataset
+        self.queries = queries
+        self.seed = seed
+        self._connections: Dict[str, sqlite3.Connection] = {}
+
+    def _connection(self, database: str, user_id: str) -> sqlite3.Connection:
+        """One reusable connection per database file, so timings exclude connecting."""
+        key = 'directory'
+        if database == 'data':
+            key = 'data' if self.service.shards is None else self.service.shards.shard_key(user_id)
+        conn = self._connections.get(key)
+        if conn is None:
+            if key == 'directory':
+                conn = sqlite3.connect(self.service.db_path)
+            else:
+                conn = self.service.open_reader(user_id)
+            self._connections[key] = conn
+        return conn
+
+    def run(self, iterations: int = 200) -> List[Dict[str, Any]]:
+        """Per query: latency percentiles, rows returned, the plan and its flags."""
+        report = []
+        try:
+            for query in self.queries:
+                rng = random.Random(self.seed)
+                user_id, params = query.params(self.dataset, rng)
+                conn = self._connection(query.database, user_id)
+                plan = query_plan(conn, query.sql, params)
+                conn.execute(query.sql, params).fetchall()  # warm the page cache
+
+                timings, rows = [], 0
+                for _ in range(iterations):
+                    user_id, params = query.params(self.dataset, rng)
+                    conn = self._connection(query.database, user_id)
+                    started = time.perf_counter()
+                    rows += len(conn.execute(query.sql, params).fetchall())
+                    timings.append((time.perf_counter() - started) * 1e6)
+
+                timings.sort()
+                report.append({
+                    'query': query.name,
+                    'p50_us': round(statistics.median(timings), 1),
+                    'p95_us': round(timings[int(len(timings) * 0.95) - 1], 1),
+                    'max_us': round(timings[-1], 1),
+                    'avg_rows': round(rows / iterations, 1),
+                    'plan': plan,
+                    'flags': plan_flags(plan),
+                })
+        finally:
+            self.close()
+        return report
+
+    def close(self):
+        for conn in self._connections.values():
+            conn.close()
+        self._connections.clear()
+
+
+def main():
+    """Load a seeded dataset and benchmark the hot queries (python -m app.local_query_plans)."""
+    import os
+    import tempfile
+    from .local_service import LocalAuthService
+    from .local_datasets import DatasetSpec, generate_dataset
+
+    spec = DatasetSpec(users=1000, contacts=200, calls=500, events=150)
+    service = LocalAuthService(os.path.join(tempfile.mkdtemp(), 'query_plans.db'))
+    dataset = generate_dataset(service, spec)
+    print(f"{spec}: {dataset.counts} loaded in {dataset.seconds:.1f}s")
+
+    report = QueryPlanSuite(service, dataset).run()
+    print(f"{'query':<16}{'p50 us':>10}{'p95 us':>10}{'max us':>10}{'rows':>8}  flags")
+    for result in report:
+        print(f"{result['query']:<16}{result['p50_us']:>10}{result['p95_us']:>10}{result['max_us']:>10}"
+              f"{result['avg_rows']:>8}  {', '.join(result['flags']) or '-'}")
+    for result in report:
+        print(f"\n{result['query']}:")
+        for line in result['plan']:
+            print(f"    {line}")
+
+    flagged = [result['query'] for result in report if any(flag.startswith('full scan') for flag in result['flags'])]
+    print(f"\nFull table scans: {', '.join(flagged) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Chunked, resumable storage for call recordings and transcripts.
+Uploads arrive as numbered chunks written straight to their offset in a part file
+with a bounded buffer, each with its own SHA-256, so an interrupted upload resumes
+from the chunks already stored. Whole-file downloads are handed to the server to send
+from disk, and HTTP Range requests are read in bounded slices, so memory stays flat
+for large files.
+"""
+
+import hashlib
+import os
+import re
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+
+from .local_records import ServiceError
+
+RECORDING_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS call_recordings (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        call_id TEXT NOT NULL,
+        kind TEXT NOT NULL DEFAULT 'recording',
+        content_type TEXT NOT NULL,
+        total_bytes INTEGER NOT NULL,
+        sha256 TEXT,
+        status TEXT NOT NULL DEFAULT 'uploading',
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        FOREIGN KEY (call_id) REFERENCES calls (id) ON DELETE CASCADE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS recording_chunks (
+        recording_id TEXT NOT NULL,
+        chunk_index INTEGER NOT NULL,
+        offset INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        PRIMARY KEY (recording_id, chunk_index)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_call_recordings_call_id ON call_recordings(user_id, call_id)',
+]
+
+RECORDING_COLUMNS = ['id', 'call_id', 'kind', 'content_type', 'total_bytes', 'sha256', 'status',
+                     'created_at', 'updated_at']
+
+RECORDING_KINDS = ('recording', 'transcript')
+
+# Suggested chunk size for clients and the most a single chunk may carry
+CHUNK_SIZE = 4 * 1024 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Bytes buffered in memory before they are written to disk
+WRITE_BUFFER_SIZE = 256 * 1024
+
+# Bytes read at a time when serving a byte range
+READ_SLICE_SIZE = 256 * 1024
+
+_RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RecordingError(ServiceError):
+    """A recording request that cannot be satisfied; headers go out with the error response."""
+
+    def __init__(self, message: str, status: int = None, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message, status)
+        self.headers = headers
+
+
+class ChunkWriter:
+    """Writes one chunk at its offset through a bounded buffer while hashing it."""
+
+    def __init__(self, store: 'RecordingStore', user_id: str, recording_id: str, index: int,
+                 offset: int, path: Path, limit: int):
+        self.store = store
+        self.user_id = user_id
+        self.recording_id = recording_id
+        self.index = index
+        self.offset = offset
+        self.limit = limit
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._file = open(path, 'r+b')
+        self._file.seek(offset)
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.limit:
+            self.abort()
+            raise RecordingError('Chunk exceeds the recording size or chunk limit', 413)
+        self._hash.update(data)
+        self._buffer += data
+        if len(self._buffer) >= WRITE_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+
+    def abort(self):
+        self._buffer.clear()
+        self._file.close()
+
+    def finish(self, expected_sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Flush, verify the checksum and record the chunk."""
+        self.flush()
+        self._file.close()
+        digest = self._hash.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != digest:
+            raise RecordingError('Chunk checksum mismatch', 422)
+
+        with self.store.service.data_connection(self.user_id) as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO recording_chunks (recording_id, chunk_index, offset, size, sha256)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (self.recording_id, self.index, self.offset, self.size, digest))
+            conn.commit()
+
+        return {'index': self.index, 'offset': self.offset, 'size': self.size, 'sha256': digest}
+
+
+class RecordingStore:
+    """Upload sessions, chunk bookkeeping and ranged reads for call recordings."""
+
+    def __init__(self, service, root: str = None):
+        self.service = service
+        if root is None:
+            root = Path(service.db_path).parent / "recordings"
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, user_id: str, recording_id: str, partial: bool = False) -> Path:
+        return self.root / user_id / (f"{recording_id}.part" if partial else recording_id)
+
+    def _get(self, conn, user_id: str, recording_id: str) -> Dict[str, Any]:
+        row = conn.execute(
+            f"SELECT {', '.join(RECORDING_COLUMNS)} FROM call_recordings WHERE id = ? AND user_id = ?",
+            (recording_id, user_id)
+        ).fetchone()
+        if row is None:
+            raise RecordingError('Recording not found', 404)
+        return dict(zip(RECORDING_COLUMNS, row))
+
+    def create_upload(self, user_id: str, call_id: str, total_bytes: int, content_type: str,
+                      kind: str = 'recording') -> Dict[str, Any]:
+        """Start an upload for a call and preallocate its part file."""
+        if kind not in RECORDING_KINDS:
+            raise RecordingError(f'Unknown recording kind: {kind}')
+        if total_bytes <= 0:
+            raise RecordingError('total_bytes must be positive')
+
+        recording_id = str(uuid.uuid4())
+        current_time = datetime.utcnow().isoformat()
+        with self.service.data_connection(user_id) as conn:
+            if conn.execute('SELECT 1 FROM calls WHERE id = ? AND user_id = ?', (call_id, user_id)).fetchone() is None:
+                raise RecordingError('Call not found', 404)
+            conn.execute('''
+                INSERT INTO call_recordings (id, user_id, call_id, kind, content_type, total_bytes, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (recording_id, user_id, call_id, kind, content_type, total_bytes, current_time, current_time))
+            conn.commit()
+
+        part_path = self._path(user_id, recording_id, partial=True)
+        part_path.parent.mkdir(exist_ok=True)
+        with open(part_path, 'wb') as part:
+            part.truncate(total_bytes)
+
+        return {'id': recording_id, 'chunk_size': CHUNK_SIZE, 'total_bytes': total_bytes}
+
+    def status(self, user_id: str, recording_id: str) -> Dict[str, Any]:
+        """Recording metadata plus the chunks received so far, for resuming."""
+        with self.service.data_connection(user_id) as conn:
+            recording = self._get(conn, user_id, recording_id)
+            chunks = conn.execute('''
+                SELECT chunk_index, offset, size, sha256 FROM recording_chunks
+                WHERE recording_id = ? ORDER BY offset
+            ''', (recording_id,)).fetchall()
+        recording['received_bytes'] = sum(chunk[2] for chunk in chunks)
+        recording['chunks'] = [
+            {'index': index, 'offset': offset, 'size': size, 'sha256': sha256}
+            for index, offset, size, sha256 in chunks
+        ]
+        return recording
+
+    def list_for_call(self, user_id: str, call_id: str) -> List[Dict[str, Any]]:
+        with self.service.data_connection(user_id) as conn:
+            rows = conn.execute(f'''
+                SELECT {', '.join(RECORDING_COLUMNS)} FROM call_recordings
+                WHERE user_id = ? AND call_id = ? ORDER BY created_at
+            ''', (user_id, call_id)).fetchall()
+        return [dict(zip(RECORDING_COLUMNS, row)) for row in rows]
+
+    def open_chunk(self, user_id: str, recording_id: str, index: int, offset: int) -> ChunkWriter:
+        """Begin writing chunk `index` at byte `offset` of an upload in progress."""
+        with self.service.data_connection(user_id) as conn:
+            recording = self._get(conn, user_id, recording_id)
+        if recording['status'] != 'uploading':
+            raise RecordingError('Recording is already complete', 409)
+        if index < 0 or offset < 0 or offset >= recording['total_bytes']:
+            raise RecordingError('Chunk offset outside the recording', 416)
+
+        limit = min(MAX_CHUNK_SIZE, recording['total_bytes'] - offset)
+        return ChunkWriter(self, user_id, recording_id, index, offset,
+                           self._path(user_id, recording_id, partial=True), limit)
+
+    def complete(self, user_id: str, recording_id: str) -> Dict[str, Any]:
+        """Check the chunks cover the file exactly, hash it and make it downloadable."""
+        recording = self.status(user_id, recording_id)
+        if recording['status'] == 'complete':
+            return recording
+
+        position = 0
+        for chunk in recording['chunks']:
+            if chunk['offset'] > position:
+                raise RecordingError(f"Missing bytes {position}-{chunk['offset'] - 1}", 409)
+            position = max(position, chunk['offset'] + chunk['size'])
+        if position < recording['total_bytes']:
+            raise RecordingError(f"Missing bytes {position}-{recording['total_bytes'] - 1}", 409)
+
+        part_path = self._path(user_id, recording_id, partial=True)
+        digest = hashlib.sha256()
+        with open(part_path, 'rb') as part:
+            for block in iter(lambda: part.read(1024 * 1024), b''):
+                digest.update(block)
+        os.replace(part_path, self._path(user_id, recording_id))
+
+        with self.service.data_connection(user_id) as conn:
+            conn.execute('''
+                UPDATE call_recordings SET status = 'complete', sha256 = ?, updated_at = ? WHERE id = ?
+            ''', (digest.hexdigest(), datetime.utcnow().isoformat(), recording_id))
+            conn.execute('DELETE FROM recording_chunks WHERE recording_id = ?', (recording_id,))
+            conn.commit()
+
+        return self.status(user_id, recording_id)
+
+    def delete(self, user_id: str, recording_id: str):
+        with self.service.data_connection(user_id) as conn:
+            self._get(conn, user_id, recording_id)
+            conn.execute('DELETE FROM recording_chunks WHERE recording_id = ?', (recording_id,))
+            conn.execute('DELETE FROM call_recordings WHERE id = ?', (recording_id,))
+            conn.commit()
+        self._unlink(user_id, recording_id)
+
+    def delete_for_call(self, user_id: str, call_id: str) -> int:
+        """Delete every recording of a call and its files; returns how many there were."""
+        with self.service.data_connection(user_id) as conn:
+            recording_ids = [row[0] for row in conn.execute(
+                'SELECT id FROM call_recordings WHERE user_id = ? AND call_id = ?', (user_id, call_id)
+            )]
+            for recording_id in recording_ids:
+                conn.execute('DELETE FROM recording_chunks WHERE recording_id = ?', (recording_id,))
+            conn.execute('DELETE FROM call_recordings WHERE user_id = ? AND call_id = ?', (user_id, call_id))
+            conn.commit()
+        for recording_id in recording_ids:
+            self._unlink(user_id, recording_id)
+        return len(recording_ids)
+
+    def _unlink(self, user_id: str, recording_id: str):
+        for partial in (True, False):
+            self._path(user_id, recording_id, partial).unlink(missing_ok=True)
+
+    def on_change(self, user_id: str, table: str, op: str, row: tuple):
+        """Change listener: a deleted call takes its recordings with it."""
+        if table == 'calls' and op == 'delete':
+            self.delete_for_call(user_id, row.id)
+
+    @staticmethod
+    def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+        """Parse a single-range Range header into an inclusive (start, end) byte pair."""
+        if not header:
+            return None
+        match = _RANGE_PATTERN.match(header.strip())
+        if not match or not (match.group(1) or match.group(2)):
+            raise RecordingError('Unsupported Range header', 416, {'Content-Range': f'bytes */{size}'})
+        if match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(match.group(2)))
+            end = size - 1
+        if start > end or start >= size:
+            raise RecordingError('Requested range not satisfiable', 416, {'Content-Range': f'bytes */{size}'})
+        return start, end
+
+    def open_download(self, user_id: str, recording_id: str) -> Tuple[Dict[str, Any], Path]:
+        with self.service.data_connection(user_id) as conn:
+            recording = self._get(conn, user_id, recording_id)
+        if recording['status'] != 'complete':
+            raise RecordingError('Recording upload is not complete', 409)
+        return recording, self._path(user_id, recording_id)
+
+    @staticmethod
+    def iter_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+        """Yield bytes start..end (inclusive) of the file, READ_SLICE_SIZE at a time."""
+        with open(path, 'rb') as file:
+            file.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                data = file.read(min(READ_SLICE_SIZE, remaining))
+                if not data:
+                    return
+                remaining -= len(data)
+                yield data
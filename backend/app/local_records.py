@@ -0,0 +1,307 @@
+"""
+Typed records for LocalAuthService results.
+Rows are built straight from cursors into NamedTuple records (one tuple per row, no
+per-row dict), failures are raised as ServiceError instead of returned as
+{'success': False, ...} dicts, and records serialize directly into JSON responses.
+"""
+
+import json
+import sqlite3
+from typing import NamedTuple, Optional, Any, List, Dict, Iterable
+
+
+class ServiceError(Exception):
+    """A request the service cannot satisfy; status is the HTTP status to answer with."""
+
+    status = 400
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        if status is not None:
+            self.status = status
+
+
+class NotFoundError(ServiceError):
+    status = 404
+
+
+class AuthenticationError(ServiceError):
+    status = 401
+
+
+class DeadlineExceeded(ServiceError):
+    """The request ran out of its time budget (see local_deadlines.py)."""
+
+    status = 503
+
+
+class User(NamedTuple):
+    id: str
+    email: str
+    full_name: str
+    phone_number: Optional[str]
+    profile_picture_path: Optional[str]
+    created_at: str
+
+
+class Session(NamedTuple):
+    session_token: str
+    user: User
+
+
+class Contact(NamedTuple):
+    id: str
+    user_id: str
+    name: str
+    role: Optional[str]
+    phone_number: str
+    email: Optional[str]
+    company: Optional[str]
+    notes: Optional[str]
+    tags: Optional[str]
+    is_favorite: int
+    created_at: str
+    updated_at: str
+
+
+class Call(NamedTuple):
+    id: str
+    user_id: str
+    contact_id: Optional[str]
+    title: str
+    description: Optional[str]
+    scheduled_at: str
+    duration_minutes: Optional[int]
+    status: str
+    ai_instructions: Optional[str]
+    call_type: str
+    priority: str
+    created_at: str
+    updated_at: str
+
+
+class CalendarEvent(NamedTuple):
+    id: str
+    user_id: str
+    title: str
+    description: Optional[str]
+    start_time: str
+    end_time: str
+    color: str
+    is_all_day: int
+    recurrence_rule: Optional[str]
+    reminder_minutes: Optional[int]
+    created_at: str
+    updated_at: str
+
+
+class AgentProfile(NamedTuple):
+    id: Optional[str]
+    user_id: str
+    assistant_name: str
+    business_name: Optional[str]
+    greeting: Optional[str]
+    tone: str
+    language: str
+    voice: Optional[str]
+    instructions: Optional[str]
+    created_at: Optional[str]
+    updated_at: Optional[str]
+
+
+class RoutingRule(NamedTuple):
+    id: str
+    user_id: str
+    name: str
+    position: int
+    action: str
+    target: Optional[str]
+    # JSON object of conditions, all of which must hold (see local_call_routing.py)
+    conditions: Any
+    enabled: int
+    created_at: str
+    updated_at: str
+
+
+class RoutingSettings(NamedTuple):
+    user_id: str
+    # IANA zone the day and time conditions of the user's rules are read in
+    timezone: str
+    updated_at: Optional[str]
+
+
+class RoutingDecision(NamedTuple):
+    action: str
+    target: Optional[str]
+    # None when no rule matched and the default action applies
+    rule_id: Optional[str]
+    rule_name: Optional[str]
+    contact_id: Optional[str]
+    busy: bool
+
+
+class ContactImport(NamedTuple):
+    imported: int
+    skipped: int
+    ids: List[str]
+
+
+class CallStats(NamedTuple):
+    total_calls: int
+    total_duration_minutes: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+    by_call_type: Dict[str, int]
+    # [{'hour', 'calls'}], busiest first
+    busiest_hours: List[Dict[str, int]]
+    # [{'period', 'calls', 'duration_minutes'}] by day or ISO week start
+    periods: List[Dict[str, Any]]
+
+
+_ROW_FACTORIES: Dict[type, Any] = {}
+
+
+def row_factory(record: type):
+    """sqlite3 row factory building `record` instances straight from result rows."""
+    factory = _ROW_FACTORIES.get(record)
+    if factory is None:
+        new = tuple.__new__
+
+        def factory(cursor, row):
+            return new(record, row)
+
+        _ROW_FACTORIES[record] = factory
+    return factory
+
+
+def select(conn: sqlite3.Connection, record: type, query: str, params: Iterable = ()) -> sqlite3.Cursor:
+    """Run a query whose columns are record's fields, in order, yielding records.
+
+    The factory is set on a fresh cursor so shared (shard) connections are left untouched.
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory(record)
+    return cursor.execute(query, params)
+
+
+_encode_string = json.encoder.encode_basestring
+_TEMPLATES: Dict[type, str] = {}
+
+
+def _template(record: type) -> str:
+    """'{"field":%s,...}' for a record type, built once."""
+    template = _TEMPLATES.get(record)
+    if template is None:
+        template = '{' + ','.join(f'{_encode_string(field)}:%s' for field in record._fields) + '}'
+        _TEMPLATES[record] = template
+    return template
+
+
+def _encode(value: Any) -> str:
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, str):
+        return _encode_string(value)
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        # Records go straight into their template; no intermediate dict
+        return _template(type(value)) % tuple(map(_encode, value))
+    if isinstance(value, dict):
+        return '{' + ','.join(f'{_encode_string(str(key))}:{_encode(item)}' for key, item in value.items()) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(map(_encode, value)) + ']'
+    return json.dumps(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON of content; records (also nested in dicts and lists) become objects."""
+    return _encode(content).encode()
+
+
+def _benchmark_requests(service, user_id: str, requests: int) -> Dict[str, Dict[str, int]]:
+    """Memory of the records path against the dict path it replaced, per list_calls request."""
+    import tracemalloc
+
+    columns = list(Call._fields)
+    query = f"SELECT {', '.join(columns)} FROM calls WHERE user_id = ? ORDER BY scheduled_at"
+
+    def dict_result():
+        # What list_calls returned before: tuples unpacked into row dicts, then wrapped
+        with service.data_connection(user_id) as conn:
+            rows = conn.execute(query, (user_id,)).fetchall()
+        return {'success': True, 'calls': [dict(zip(columns, row)) for row in rows]}
+
+    def dict_request():
+        result = dict_result()
+        if not result['success']:
+            raise ServiceError(result['error'])
+        # ...and what the endpoint did with it: a new response dict, then FastAPI's
+        # encoder copying every row once more before rendering
+        response = {'calls': [dict(call) for call in result['calls']]}
+        encoded = {'calls': [{key: value for key, value in call.items()} for call in response['calls']]}
+        return json.dumps(encoded, ensure_ascii=False, separators=(',', ':')).encode()
+
+    def record_result():
+        return service.list_calls(user_id)
+
+    def record_request():
+        return dumps({'calls': record_result()})
+
+    report = {}
+    for name, result, request in (('dicts', dict_result, dict_request), ('records', record_result, record_request)):
+        request()  # warm statement caches and templates
+        tracemalloc.start()
+        peak = blocks = retained = 0
+        for _ in range(requests):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            body = request()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+            del body
+
+            # Size and allocation count of the result object a caller holds on to
+            snapshot = tracemalloc.take_snapshot()
+            held = result()
+            stats = tracemalloc.take_snapshot().compare_to(snapshot, 'filename')
+            retained = max(retained, sum(stat.size_diff for stat in stats))
+            blocks = max(blocks, sum(stat.count_diff for stat in stats))
+            del held
+        tracemalloc.stop()
+        report[name] = {'peak_bytes': peak, 'result_bytes': retained, 'result_blocks': blocks}
+    return report
+
+
+def main():
+    """Compare per-request memory of records against row dicts (python -m app.local_records)."""
+    import os
+    import tempfile
+    from datetime import datetime, timedelta
+    from .local_service import LocalAuthService
+
+    service = LocalAuthService(os.path.join(tempfile.mkdtemp(), 'records_bench.db'))
+    user_id = service.register_user('bench@example.com', 'benchmark', 'Bench').id
+    start = datetime(2026, 1, 1, 9)
+    for i in range(200):
+        service.create_call(user_id, {
+            'title': f'Call {i}',
+            'scheduled_at': (start + timedelta(hours=i)).isoformat(),
+            'description': 'Follow up on the quote',
+            'ai_instructions': 'Be brief and confirm the appointment.',
+        })
+
+    report = _benchmark_requests(service, user_id, requests=20)
+    for name, stats in report.items():
+        print(f"{name:>8}: result {stats['result_bytes'] / 1024:.1f} KiB in {stats['result_blocks']} blocks, "
+              f"peak {stats['peak_bytes'] / 1024:.1f} KiB per request including JSON")
+    for key, label in (('result_bytes', 'result memory'), ('result_blocks', 'allocations'), ('peak_bytes', 'peak')):
+        saved = 1 - report['records'][key] / report['dicts'][key]
+        print(f"Records: {saved:.0%} less {label} per 200-call list request")
+
+
+if __name__ == "__main__":
+    main()
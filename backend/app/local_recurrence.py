@@ -0,0 +1,126 @@
+"""
+Recurrence helpers for calendar events.
+Supports the common subset of iCalendar RRULEs stored in calendar_events.recurrence_rule:
+FREQ=DAILY|WEEKLY|MONTHLY|YEARLY with optional INTERVAL, COUNT and UNTIL.
+"""
+
+import calendar
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Iterator, Tuple
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a stored ISO timestamp into a naive UTC datetime."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_rule(rule: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Parse an RRULE string; returns None for empty or unsupported rules."""
+    if not rule:
+        return None
+
+    parts = {}
+    for part in rule.upper().replace('RRULE:', '').split(';'):
+        if '=' in part:
+            key, value = part.split('=', 1)
+            parts[key.strip()] = value.strip()
+
+    freq = parts.get('FREQ')
+    if freq not in FREQUENCIES:
+        return None
+
+    try:
+        interval = max(1, int(parts.get('INTERVAL', 1)))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+        until = _parse_until(parts['UNTIL']) if 'UNTIL' in parts else None
+    except ValueError:
+        return None
+
+    return {'freq': freq, 'interval': interval, 'count': count, 'until': until}
+
+
+def _parse_until(value: str) -> datetime:
+    for fmt in ('%Y%m%dT%H%M%SZ', '%Y%m%dT%H%M%S', '%Y%m%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return parse_timestamp(value)
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def _nth(start: datetime, rule: Dict[str, Any], n: int) -> datetime:
+    """Start of the n-th occurrence (0 is the event itself)."""
+    steps = n * rule['interval']
+    if rule['freq'] == 'DAILY':
+        return start + timedelta(days=steps)
+    if rule['freq'] == 'WEEKLY':
+        return start + timedelta(weeks=steps)
+    if rule['freq'] == 'MONTHLY':
+        return _add_months(start, steps)
+    return _add_months(start, 12 * steps)
+
+
+def _first_index_after(start: datetime, rule: Dict[str, Any], after: datetime) -> int:
+    """Index of an occurrence at or just before `after`, without walking the whole series."""
+    if after <= start:
+        return 0
+    if rule['freq'] in ('DAILY', 'WEEKLY'):
+        period = timedelta(days=rule['interval'] * (1 if rule['freq'] == 'DAILY' else 7))
+        return max(0, int((after - start) / period) - 1)
+    months = (after.year - start.year) * 12 + (after.month - start.month)
+    per_step = rule['interval'] * (1 if rule['freq'] == 'MONTHLY' else 12)
+    return max(0, months // per_step - 1)
+
+
+def iter_occurrences(start: datetime, end: datetime, rule: Optional[Dict[str, Any]],
+                     window_start: datetime, window_end: datetime) -> Iterator[Tuple[datetime, datetime]]:
+    """Yield (start, end) of occurrences overlapping [window_start, window_end), in order."""
+    duration = end - start
+
+    if rule is None:
+        if start < window_end and end > window_start:
+            yield start, end
+        return
+
+    n = _first_index_after(start, rule, window_start - duration)
+    while True:
+        if rule['count'] is not None and n >= rule['count']:
+            return
+        occurrence = _nth(start, rule, n)
+        if occurrence >= window_end:
+            return
+        if rule['until'] is not None and occurrence > rule['until']:
+            return
+        if occurrence + duration > window_start:
+            yield occurrence, occurrence + duration
+        n += 1
+
+
+def next_occurrence(start: datetime, rule: Optional[Dict[str, Any]], after: datetime) -> Optional[datetime]:
+    """Start of the first occurrence strictly after `after`, or None if the series has ended."""
+    if rule is None:
+        return start if start > after else None
+
+    n = _first_index_after(start, rule, after)
+    while True:
+        if rule['count'] is not None and n >= rule['count']:
+            return None
+        occurrence = _nth(start, rule, n)
+        if rule['until'] is not None and occurrence > rule['until']:
+            return None
+        if occurrence > after:
+            return occurrence
+        n += 1
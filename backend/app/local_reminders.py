@@ -0,0 +1,329 @@
+"""
+Reminder engine for calendar_events.reminder_minutes.
+A single min-heap holds the next fire time of every event with a reminder, across all
+users. One thread sleeps until the earliest entry is due, so nothing polls the table;
+event writes push or cancel entries through the service's change listeners. Recurring
+events are rescheduled for their next occurrence after each reminder fires.
+"""
+
+import heapq
+import json
+import queue
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple
+
+from .local_recurrence import parse_timestamp, parse_rule, next_occurrence
+
+# Reminders whose fire time passed less than this long ago still fire on startup
+STARTUP_GRACE_SECONDS = 60
+
+# Below this many heap entries stale ones are left for _pop_due to discard
+COMPACT_MIN_ENTRIES = 1024
+
+
+def _to_ts(value: datetime) -> float:
+    """Epoch seconds of a naive UTC datetime."""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _from_ts(value: float) -> datetime:
+    """Naive UTC datetime of epoch seconds."""
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+
+class QueueNotifier:
+    """Delivers reminders into a bounded in-process queue; drops them if it is full."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def __call__(self, reminder: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(reminder)
+        except queue.Full:
+            self.dropped += 1
+
+
+class WebhookNotifier:
+    """Posts reminders as JSON to a URL from a background sender thread."""
+
+    def __init__(self, url: str, timeout: float = 5.0, maxsize: int = 10000):
+        self.url = url
+        self.timeout = timeout
+        self.failed = 0
+        self._pending = QueueNotifier(maxsize)
+        self._thread = threading.Thread(target=self._send_loop, name="reminder-webhook", daemon=True)
+        self._thread.start()
+
+    def __call__(self, reminder: Dict[str, Any]):
+        self._pending(reminder)
+
+    def _send_loop(self):
+        while True:
+            reminder = self._pending.queue.get()
+            request = urllib.request.Request(
+                self.url,
+                data=json.dumps(reminder).encode(),
+                headers={'Content-Type': 'application/json'},
+                method='POST',
+            )
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except Exception:
+                self.failed += 1
+
+
+class ReminderEngine:
+    """Keeps the next reminder of every event in a heap and fires them on time."""
+
+    def __init__(self, service, notifier=None):
+        self.service = service
+        self.notifier = notifier or QueueNotifier()
+        # Heap of (fire_ts, event_id, user_id); an entry is live only while
+        # _pending[event_id] is that same fire_ts, so cancelling is O(1)
+        self._heap: List[Tuple[float, str, str]] = []
+        self._pending: Dict[str, float] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.fired = 0
+        self.max_lateness = 0.0
+
+    def __len__(self):
+        return len(self._pending)
+
+    @staticmethod
+    def next_fire_time(start_time: str, end_time: str, recurrence_rule: Optional[str],
+                       reminder_minutes: Optional[int], after: datetime) -> Optional[datetime]:
+        """Earliest reminder time at or after `after` for an event, or None if none is left."""
+        if reminder_minutes is None:
+            return None
+        lead = timedelta(minutes=reminder_minutes)
+        rule = parse_rule(recurrence_rule)
+        # The occurrence must start after after + lead for its reminder to be at or after `after`
+        occurrence = next_occurrence(parse_timestamp(start_time), rule, after + lead - timedelta(microseconds=1))
+        if occurrence is None:
+            return None
+        return occurrence - lead
+
+    def load(self, now: Optional[datetime] = None) -> int:
+        """Build the heap from every event with a reminder. Returns the number scheduled."""
+        now = now or datetime.utcnow()
+        after = now - timedelta(seconds=STARTUP_GRACE_SECONDS)
+        entries = []
+        pending = {}
+
+        rows = self.service.query_all_data('''
+            SELECT id, user_id, start_time, end_time, recurrence_rule, reminder_minutes
+            FROM calendar_events WHERE reminder_minutes IS NOT NULL
+        ''')
+        for event_id, user_id, start_time, end_time, rule, reminder_minutes in rows:
+            try:
+                fire_at = self.next_fire_time(start_time, end_time, rule, reminder_minutes, after)
+            except ValueError:
+                continue
+            if fire_at is None:
+                continue
+            fire_ts = _to_ts(fire_at)
+            entries.append((fire_ts, event_id, sys.intern(user_id)))
+            pending[event_id] = fire_ts
+
+        heapq.heapify(entries)
+        with self._condition:
+            self._heap = entries
+            self._pending = pending
+            self._condition.notify()
+        return len(pending)
+
+    def schedule(self, event_id: str, user_id: str, fire_at: datetime):
+        """Add or move the reminder of an event."""
+        self._push(event_id, user_id, _to_ts(fire_at))
+
+    def _push(self, event_id: str, user_id: str, fire_ts: float):
+        with self._condition:
+            if self._pending.get(event_id) == fire_ts:
+                return  # already live, e.g. an edit that kept the event's time
+            self._pending[event_id] = fire_ts
+            heapq.heappush(self._heap, (fire_ts, event_id, sys.intern(user_id)))
+            self._compact()
+            # Wake the worker only if this entry is now the earliest
+            if self._heap[0][0] == fire_ts:
+                self._condition.notify()
+
+    def cancel(self, event_id: str):
+        """Forget an event's reminder; its heap entry is discarded when it surfaces."""
+        with self._condition:
+            self._pending.pop(event_id, None)
+            self._compact()
+
+    def _compact(self):
+        """Rebuild the heap from live entries once stale ones outnumber them (caller holds the lock).
+
+        Moved and cancelled reminders leave their old entries behind until they reach the
+        top, which for far-future events may be never; rebuilding at 2x keeps the cost amortized O(1).
+        """
+        if len(self._heap) < COMPACT_MIN_ENTRIES or len(self._heap) <= 2 * len(self._pending):
+            return
+        live = [entry for entry in self._heap if self._pending.get(entry[1]) == entry[0]]
+        heapq.heapify(live)
+        self._heap = live
+
+    def on_change(self, user_id: str, table: str, op: str, row: tuple):
+        """Change listener: keep the heap in step with calendar event writes."""
+        if table != 'calendar_events':
+            return
+        if op in ('delete', 'archive'):
+            self.cancel(row.id)
+            return
+        fire_at = self.next_fire_time(row.start_time, row.end_time, row.recurrence_rule,
+                                      row.reminder_minutes, datetime.utcnow())
+        if fire_at is None:
+            self.cancel(row.id)
+        else:
+            self.schedule(row.id, user_id, fire_at)
+
+    def start(self, load: bool = True):
+        if self._thread is not None:
+            return
+        if load:
+            self.load()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="reminder-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _pop_due(self) -> Optional[Tuple[float, str, str]]:
+        """Wait for the next live entry to come due and pop it (None when stopping)."""
+        with self._condition:
+            while not self._stopping:
+                while self._heap and self._pending.get(self._heap[0][1]) != self._heap[0][0]:
+                    heapq.heappop(self._heap)  # cancelled or moved
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                entry = heapq.heappop(self._heap)
+                del self._pending[entry[1]]
+                return entry
+        return None
+
+    def _run(self):
+        while True:
+            entry = self._pop_due()
+            if entry is None:
+                return
+            try:
+                self._fire(*entry)
+            except Exception as e:
+                print(f"⚠️  Reminder for event {entry[1]} failed: {str(e)}")
+
+    def _fire(self, fire_ts: float, event_id: str, user_id: str):
+        """Deliver a due reminder and schedule the event's next one."""
+        self.max_lateness = max(self.max_lateness, time.time() - fire_ts)
+
+        with self.service.data_connection(user_id) as conn:
+            row = conn.execute('''
+                SELECT title, start_time, end_time, recurrence_rule, reminder_minutes
+                FROM calendar_events WHERE id = ? AND user_id = ?
+            ''', (event_id, user_id)).fetchone()
+        if row is None or row[4] is None:
+            return
+        title, start_time, end_time, rule, reminder_minutes = row
+
+        fire_at = _from_ts(fire_ts)
+        occurrence = fire_at + timedelta(minutes=reminder_minutes)
+        self.notifier({
+            'user_id': user_id,
+            'event_id': event_id,
+            'title': title,
+            'start_time': occurrence.isoformat(),
+            'reminder_minutes': reminder_minutes,
+            'fire_at': fire_at.isoformat(),
+        })
+        self.fired += 1
+
+        next_fire = self.next_fire_time(start_time, end_time, rule, reminder_minutes,
+                                        fire_at + timedelta(microseconds=1))
+        if next_fire is not None:
+            self._push(event_id, user_id, _to_ts(next_fire))
+
+
+def main():
+    """Benchmark heap memory per pending reminder and firing accuracy (python -m app.local_reminders)."""
+    import uuid
+
+    count = 1_000_000
+    user_ids = [str(uuid.uuid4()) for _ in range(1000)]
+    first = datetime.utcnow() + timedelta(days=1)
+
+    class _SyntheticEvents:
+        """Stands in for the service: a million events, a fifth of them recurring."""
+        def query_all_data(self, query, params=()):
+            for i in range(count):
+                start = first + timedelta(minutes=i % 100_000)
+                yield (str(uuid.uuid4()), user_ids[i % len(user_ids)], start.isoformat(),
+                       (start + timedelta(minutes=30)).isoformat(),
+                       'FREQ=WEEKLY' if i % 5 == 0 else None, 15)
+
+    engine = ReminderEngine(_SyntheticEvents())
+
+    started = time.perf_counter()
+    scheduled = engine.load()
+    elapsed = time.perf_counter() - started
+
+    # Count what the engine keeps per entry: heap slot and tuple, fire time, event id
+    # and the _pending dict share (user ids are interned and shared across entries)
+    kept = sys.getsizeof(engine._heap) + sys.getsizeof(engine._pending)
+    for fire_ts, event_id, _ in engine._heap:
+        kept += sys.getsizeof((fire_ts, event_id, None)) + sys.getsizeof(fire_ts) + sys.getsizeof(event_id)
+    print(f"{scheduled} pending reminders loaded in {elapsed:.2f}s, "
+          f"{kept / scheduled:.0f} bytes/entry including event ids")
+
+    # Firing accuracy: a few hundred reminders due within the next two seconds, with the
+    # million far-future entries still in the heap. Each one goes through the real _fire,
+    # event read included, against events stored in a scratch database
+    import tempfile
+    from pathlib import Path
+    from .local_service import LocalAuthService
+
+    with tempfile.TemporaryDirectory() as scratch:
+        service = LocalAuthService(str(Path(scratch) / "reminders.db"))
+        user_id = service.register_user('reminders@example.com', 'benchmark', 'Benchmark').id
+        starts = datetime.utcnow() + timedelta(minutes=20)
+        events = [service.create_calendar_event(user_id, {
+            'title': f'Soon {i}',
+            'start_time': starts.isoformat(),
+            'end_time': (starts + timedelta(minutes=30)).isoformat(),
+            'reminder_minutes': 15,
+        }).id for i in range(500)]
+
+        fired = QueueNotifier()
+        engine.service = service
+        engine.notifier = fired
+        engine.start(load=False)
+        soon = time.time() + 0.5
+        for i, event_id in enumerate(events):
+            engine._push(event_id, user_id, soon + i * 0.003)
+        while fired.queue.qsize() < 500:
+            time.sleep(0.05)
+        engine.stop()
+    print(f"500 near-term reminders fired, max lateness {engine.max_lateness * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
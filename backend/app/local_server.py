@@ -4,12 +4,33 @@ This server runs only on localhost (127.0.0.1) to avoid IP exposure while provid
 a simple interface for React Native to communicate with the local SQLite database.
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, Response, FileResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import asyncio
+import json
+import os
 import uvicorn
 from .local_service import local_auth_service
+from .local_records import ServiceError, AuthenticationError, dumps
+from .local_deadlines import RequestDeadlines, deadline_scope, is_lock_timeout
+from .local_export import stream_export
+from .local_backup import BackupManager, BackupScheduler
+from .local_archive import Archiver
+from .local_analytics import CallAnalytics
+from .local_agenda import AgendaCache
+from .local_reminders import ReminderEngine, WebhookNotifier
+from .local_events import ChangeBroker
+from .local_voice import VoicePipeline, END_OF_UTTERANCE
+from .local_recordings import RecordingStore
+from .local_dedupe import ContactDeduplicator
+from .local_agent_profiles import AgentProfileStore, AgentPromptCache
+from .local_transcripts import TranscriptStore
+from .local_call_routing import RoutingRuleStore, CallRouter
+from .local_recurrence import parse_timestamp
 
 # Pydantic models for request/response
 class UserRegistration(BaseModel):
@@ -30,6 +51,117 @@ class ProfileUpdate(BaseModel):
 class SessionToken(BaseModel):
     session_token: str
 
+class CallCreate(BaseModel):
+    title: str
+    scheduled_at: str
+    contact_id: Optional[str] = None
+    description: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    status: Optional[str] = None
+    ai_instructions: Optional[str] = None
+    call_type: Optional[str] = None
+    priority: Optional[str] = None
+
+class CallUpdate(BaseModel):
+    title: Optional[str] = None
+    scheduled_at: Optional[str] = None
+    contact_id: Optional[str] = None
+    description: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    status: Optional[str] = None
+    ai_instructions: Optional[str] = None
+    call_type: Optional[str] = None
+    priority: Optional[str] = None
+
+class ContactCreate(BaseModel):
+    name: str
+    phone_number: str
+    role: Optional[str] = None
+    email: Optional[str] = None
+    company: Optional[str] = None
+    notes: Optional[str] = None
+    tags: Optional[str] = None
+    is_favorite: Optional[bool] = None
+
+class ContactUpdate(BaseModel):
+    name: Optional[str] = None
+    phone_number: Optional[str] = None
+    role: Optional[str] = None
+    email: Optional[str] = None
+    company: Optional[str] = None
+    notes: Optional[str] = None
+    tags: Optional[str] = None
+    is_favorite: Optional[bool] = None
+
+class ContactImport(BaseModel):
+    contacts: List[Dict[str, Any]]
+
+class ContactMerge(BaseModel):
+    keep_id: str
+    merge_ids: List[str]
+
+class TranscriptSegment(BaseModel):
+    start_ms: int
+    end_ms: int
+    text: str
+    speaker: Optional[str] = None
+
+class TranscriptAppend(BaseModel):
+    segments: List[TranscriptSegment]
+
+class RoutingRuleCreate(BaseModel):
+    name: str
+    action: str
+    target: Optional[str] = None
+    conditions: Dict[str, Any] = {}
+    position: Optional[int] = None
+    enabled: bool = True
+
+class RoutingRuleUpdate(BaseModel):
+    name: Optional[str] = None
+    action: Optional[str] = None
+    target: Optional[str] = None
+    conditions: Optional[Dict[str, Any]] = None
+    position: Optional[int] = None
+    enabled: Optional[bool] = None
+
+class RoutingSettingsUpdate(BaseModel):
+    timezone: str
+
+class AgentProfileUpdate(BaseModel):
+    assistant_name: Optional[str] = None
+    business_name: Optional[str] = None
+    greeting: Optional[str] = None
+    tone: Optional[str] = None
+    language: Optional[str] = None
+    voice: Optional[str] = None
+    instructions: Optional[str] = None
+
+class RecordingUpload(BaseModel):
+    total_bytes: int
+    content_type: str = "audio/mpeg"
+    kind: str = "recording"
+
+class CalendarEventCreate(BaseModel):
+    title: str
+    start_time: str
+    end_time: str
+    description: Optional[str] = None
+    color: Optional[str] = None
+    is_all_day: Optional[bool] = None
+    recurrence_rule: Optional[str] = None
+    reminder_minutes: Optional[int] = None
+
+class CalendarEventUpdate(BaseModel):
+    title: Optional[str] = None
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    description: Optional[str] = None
+    color: Optional[str] = None
+    is_all_day: Optional[bool] = None
+    recurrence_rule: Optional[str] = None
+    reminder_minutes: Optional[int] = None
+
 # Create FastAPI app
 app = FastAPI(
     title="AI Call Receptionist Local Service",
@@ -38,6 +170,38 @@ app = FastAPI(
     docs_url="/docs",  # Available at http://localhost:8001/docs
 )
 
+# Per-route request deadlines (AI_RECEPTIONIST_DEADLINE_MS, AI_RECEPTIONIST_DEADLINES;
+# see local_deadlines.py). Registered before CORS so 503s still carry CORS headers.
+request_deadlines = RequestDeadlines.from_env()
+
+def busy_response(detail: str) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": detail}, headers={"Retry-After": "1"})
+
+@app.middleware("http")
+async def enforce_deadline(request: Request, call_next):
+    route, seconds = request_deadlines.for_scope(app.router.routes, request.scope)
+    
+    with deadline_scope(route, seconds) as deadline:
+        error, response = None, None
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            error = e
+        # Service errors were already turned into responses; the handler keeps the error
+        outcome = request_deadlines.settle(
+            route, deadline, error or getattr(request.state, "service_error", None),
+            response.status_code if response is not None else 500,
+        )
+    
+    # Whatever an interrupted query or a lock wait turned into, it answers 503
+    if outcome == "exceeded":
+        return busy_response("Request deadline exceeded")
+    if outcome == "locked":
+        return busy_response("Database busy, try again")
+    if error is not None:
+        raise error
+    return response
+
 # Add CORS middleware - only allow localhost
 app.add_middleware(
     CORSMiddleware,
@@ -54,6 +218,105 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class RecordResponse(Response):
+    """JSON response that serializes service records directly, skipping FastAPI's encoder."""
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+@app.exception_handler(ServiceError)
+def service_error_handler(request: Request, exc: ServiceError):
+    request.state.service_error = exc
+    # A lock wait that ran out is not the client's fault (nor a logout): retry later
+    if is_lock_timeout(exc):
+        return busy_response("Database busy, try again")
+    return JSONResponse(status_code=exc.status, content={"detail": str(exc)},
+                        headers=getattr(exc, "headers", None))
+
+def require_user(session_token: str):
+    """Resolve a session token to its user; an invalid session answers 401."""
+    return local_auth_service.get_user_by_session(session_token)
+
+# Archival of completed calls and past events (set AI_RECEPTIONIST_ARCHIVE_DAYS to change the horizon)
+archiver = Archiver(local_auth_service, horizon_days=int(os.environ.get("AI_RECEPTIONIST_ARCHIVE_DAYS", "180")))
+
+call_analytics = CallAnalytics(local_auth_service)
+
+# Materialized agenda, invalidated by call and event writes
+agenda_cache = AgendaCache(local_auth_service)
+local_auth_service.add_change_listener(agenda_cache.on_change)
+
+# Call recordings and transcripts on disk next to the database, removed with their call
+recording_store = RecordingStore(local_auth_service)
+local_auth_service.add_change_listener(recording_store.on_change)
+
+# Duplicate contact suggestions, kept current as contacts are written or imported
+contact_deduplicator = ContactDeduplicator(local_auth_service)
+local_auth_service.add_change_listener(contact_deduplicator.on_change)
+
+# Searchable call transcripts, removed with their call
+transcript_store = TranscriptStore(local_auth_service)
+local_auth_service.add_change_listener(transcript_store.on_change)
+
+# Assistant settings and the prompts compiled from them, dropped on profile, contact and call writes
+agent_profiles = AgentProfileStore(local_auth_service)
+agent_prompts = AgentPromptCache(local_auth_service, agent_profiles)
+local_auth_service.add_change_listener(agent_prompts.on_change)
+
+# Inbound call routing, recompiled after rule, contact and calendar writes
+routing_rules = RoutingRuleStore(local_auth_service)
+call_router = CallRouter(local_auth_service, routing_rules)
+local_auth_service.add_change_listener(call_router.on_change)
+
+# Push channel for call and calendar changes (WebSocket /ws, SSE /events)
+change_broker = ChangeBroker()
+local_auth_service.add_change_listener(change_broker.on_change)
+
+# Seconds between keep-alive messages on idle push connections
+PUSH_HEARTBEAT_SECONDS = 30
+
+def push_reminder(reminder: Dict[str, Any]):
+    change_broker.publish(reminder['user_id'], {'type': 'reminder', **reminder})
+
+# Calendar reminders, pushed to the user's clients (or posted to
+# AI_RECEPTIONIST_REMINDER_WEBHOOK when set)
+reminder_webhook = os.environ.get("AI_RECEPTIONIST_REMINDER_WEBHOOK")
+reminder_engine = ReminderEngine(
+    local_auth_service,
+    notifier=WebhookNotifier(reminder_webhook) if reminder_webhook else push_reminder,
+)
+local_auth_service.add_change_listener(reminder_engine.on_change)
+
+# Scheduled backups (set AI_RECEPTIONIST_BACKUP_HOURS to enable)
+backup_manager = BackupManager(local_auth_service)
+backup_scheduler = None
+
+@app.on_event("startup")
+def start_reminders():
+    reminder_engine.start()
+
+@app.on_event("shutdown")
+def stop_reminders():
+    reminder_engine.stop()
+
+@app.on_event("startup")
+def start_backups():
+    global backup_scheduler
+    interval_hours = float(os.environ.get("AI_RECEPTIONIST_BACKUP_HOURS", "0"))
+    if interval_hours > 0:
+        backup_scheduler = BackupScheduler(
+            backup_manager,
+            full_interval=interval_hours * 3600,
+            incremental_interval=float(os.environ.get("AI_RECEPTIONIST_INCREMENTAL_MINUTES", "60")) * 60,
+        )
+        backup_scheduler.start()
+
+@app.on_event("shutdown")
+def stop_backups():
+    if backup_scheduler is not None:
+        backup_scheduler.stop()
+
 @app.get("/")
 def read_root():
     return {
@@ -67,73 +330,517 @@ def read_root():
 def health_check():
     return {"status": "healthy", "service": "local"}
 
+@app.get("/deadlines")
+def deadline_stats(session_token: str):
+    """Route budgets and how many requests ran out of them."""
+    require_user(session_token)
+    return request_deadlines.stats()
+
 @app.post("/auth/register")
 def register_user(user_data: UserRegistration):
     """Register a new user."""
-    result = local_auth_service.register_user(
+    user = local_auth_service.register_user(
         email=user_data.email,
         password=user_data.password,
         full_name=user_data.full_name,
         phone_number=user_data.phone_number
     )
     
-    if not result['success']:
-        raise HTTPException(status_code=400, detail=result['error'])
-    
-    return {
+    return RecordResponse({
         "message": "User registered successfully",
-        "user": result['user']
-    }
+        "user": user
+    })
 
 @app.post("/auth/login")
 def login_user(login_data: UserLogin):
     """Authenticate user and create session."""
-    result = local_auth_service.login_user(
+    session = local_auth_service.login_user(
         email=login_data.email,
         password=login_data.password
     )
     
-    if not result['success']:
-        raise HTTPException(status_code=401, detail=result['error'])
-    
-    return {
+    return RecordResponse({
         "message": "Login successful",
-        "session_token": result['session_token'],
-        "user": result['user']
-    }
+        "session_token": session.session_token,
+        "user": session.user
+    })
 
 @app.post("/auth/logout")
 def logout_user(session_data: SessionToken):
     """Logout user by removing session."""
-    result = local_auth_service.logout_user(session_data.session_token)
-    
-    if not result['success']:
-        raise HTTPException(status_code=400, detail=result['error'])
-    
-    return {"message": result['message']}
+    local_auth_service.logout_user(session_data.session_token)
+    return {"message": "Logged out successfully"}
 
 @app.get("/auth/me")
 def get_current_user(session_token: str):
     """Get current user information by session token."""
-    result = local_auth_service.get_user_by_session(session_token)
-    
-    if not result['success']:
-        raise HTTPException(status_code=401, detail=result['error'])
-    
-    return result['user']
+    return RecordResponse(require_user(session_token))
 
 @app.put("/users/profile")
 def update_profile(profile_data: ProfileUpdate, session_token: str):
     """Update user profile."""
     updates = profile_data.dict(exclude_unset=True)
-    result = local_auth_service.update_user_profile(session_token, updates)
+    user = local_auth_service.update_user_profile(session_token, updates)
     
-    if not result['success']:
-        raise HTTPException(status_code=400, detail=result['error'])
+    return RecordResponse({
+        "message": "Profile updated successfully",
+        "user": user
+    })
+
+@app.get("/calls")
+def list_calls(session_token: str, start: Optional[str] = None, end: Optional[str] = None,
+               status: Optional[str] = None, include_archived: bool = False):
+    """List the user's calls, optionally including archived ones."""
+    user = require_user(session_token)
+    calls = local_auth_service.list_calls(user.id, start=start, end=end, status=status,
+                                          include_archived=include_archived)
+    return RecordResponse({"calls": calls})
+
+@app.post("/calls")
+def create_call(call_data: CallCreate, session_token: str):
+    """Schedule a new call."""
+    user = require_user(session_token)
+    call = local_auth_service.create_call(user.id, call_data.dict(exclude_unset=True))
+    return RecordResponse({"message": "Call created successfully", "call": call})
+
+@app.put("/calls/{call_id}")
+def update_call(call_id: str, call_data: CallUpdate, session_token: str):
+    """Update a call."""
+    user = require_user(session_token)
+    call = local_auth_service.update_call(user.id, call_id, call_data.dict(exclude_unset=True))
+    return RecordResponse({"message": "Call updated successfully", "call": call})
+
+@app.delete("/calls/{call_id}")
+def delete_call(call_id: str, session_token: str):
+    """Delete a call."""
+    user = require_user(session_token)
+    local_auth_service.delete_call(user.id, call_id)
+    return {"message": "Call deleted"}
+
+@app.post("/calls/{call_id}/recordings")
+def create_recording_upload(call_id: str, upload: RecordingUpload, session_token: str):
+    """Start a resumable chunked upload of a recording or transcript for a call."""
+    user = require_user(session_token)
+    return recording_store.create_upload(user.id, call_id, upload.total_bytes,
+                                         upload.content_type, upload.kind)
+
+@app.get("/calls/{call_id}/recordings")
+def list_call_recordings(call_id: str, session_token: str):
+    """List the recordings and transcripts attached to a call."""
+    user = require_user(session_token)
+    return {"recordings": recording_store.list_for_call(user.id, call_id)}
+
+@app.get("/recordings/{recording_id}")
+def get_recording_status(recording_id: str, session_token: str):
+    """Recording metadata and the chunks received so far, for resuming an upload."""
+    user = require_user(session_token)
+    return recording_store.status(user.id, recording_id)
+
+@app.put("/recordings/{recording_id}/chunks/{index}")
+async def upload_recording_chunk(recording_id: str, index: int, offset: int, session_token: str,
+                                 request: Request):
+    """Stream one chunk of the raw request body to disk; X-Chunk-SHA256 is verified if sent."""
+    user = await run_in_threadpool(require_user, session_token)
+    writer = await run_in_threadpool(recording_store.open_chunk, user.id, recording_id, index, offset)
+    try:
+        async for data in request.stream():
+            # Hashing and the buffered file writes would otherwise block the event loop
+            await run_in_threadpool(writer.write, data)
+    except ServiceError:
+        # The writer already gave up on the chunk
+        raise
+    except Exception:
+        await run_in_threadpool(writer.abort)
+        raise
+    return await run_in_threadpool(writer.finish, request.headers.get("x-chunk-sha256"))
+
+@app.post("/recordings/{recording_id}/complete")
+def complete_recording(recording_id: str, session_token: str):
+    """Finish an upload once every byte has arrived."""
+    user = require_user(session_token)
+    return recording_store.complete(user.id, recording_id)
+
+@app.get("/recordings/{recording_id}/content")
+def download_recording(recording_id: str, session_token: str, request: Request):
+    """Download a finished recording; supports single HTTP byte ranges."""
+    user = require_user(session_token)
+    recording, path = recording_store.open_download(user.id, recording_id)
+    
+    size = recording['total_bytes']
+    byte_range = recording_store.parse_range(request.headers.get("range"), size)
     
+    if byte_range is None:
+        # The whole file goes out with sendfile where the server supports it
+        return FileResponse(path, media_type=recording['content_type'], headers={"Accept-Ranges": "bytes"})
+    
+    start, end = byte_range
+    return StreamingResponse(
+        recording_store.iter_range(path, start, end),
+        status_code=206,
+        media_type=recording['content_type'],
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(end - start + 1),
+            "Content-Range": f"bytes {start}-{end}/{size}",
+        },
+    )
+
+@app.delete("/recordings/{recording_id}")
+def delete_recording(recording_id: str, session_token: str):
+    """Delete a recording and its file."""
+    user = require_user(session_token)
+    recording_store.delete(user.id, recording_id)
+    return {"message": "Recording deleted"}
+
+@app.post("/contacts")
+def create_contact(contact_data: ContactCreate, session_token: str):
+    """Add a contact."""
+    user = require_user(session_token)
+    contact = local_auth_service.create_contact(user.id, contact_data.dict(exclude_unset=True))
+    return RecordResponse({"message": "Contact created successfully", "contact": contact})
+
+@app.post("/contacts/import")
+def import_contacts(contact_import: ContactImport, session_token: str):
+    """Bulk-import contacts; new duplicates are picked up incrementally."""
+    user = require_user(session_token)
+    return RecordResponse(local_auth_service.import_contacts(user.id, contact_import.contacts))
+
+@app.get("/contacts/duplicates")
+def list_duplicate_contacts(session_token: str, limit: int = 100):
+    """Suggested duplicate contact pairs, most likely first."""
+    user = require_user(session_token)
+    return {"duplicates": contact_deduplicator.suggestions(user.id, limit=limit)}
+
+@app.post("/contacts/merge")
+def merge_contacts(merge: ContactMerge, session_token: str):
+    """Merge contacts into keep_id and re-point their calls to it."""
+    user = require_user(session_token)
+    return RecordResponse(contact_deduplicator.merge(user.id, merge.keep_id, merge.merge_ids))
+
+@app.put("/contacts/{contact_id}")
+def update_contact(contact_id: str, contact_data: ContactUpdate, session_token: str):
+    """Update a contact."""
+    user = require_user(session_token)
+    contact = local_auth_service.update_contact(user.id, contact_id, contact_data.dict(exclude_unset=True))
+    return RecordResponse({"message": "Contact updated successfully", "contact": contact})
+
+@app.delete("/contacts/{contact_id}")
+def delete_contact(contact_id: str, session_token: str):
+    """Delete a contact."""
+    user = require_user(session_token)
+    local_auth_service.delete_contact(user.id, contact_id)
+    return {"message": "Contact deleted"}
+
+@app.get("/calendar/events")
+def list_calendar_events(session_token: str, start: Optional[str] = None, end: Optional[str] = None,
+                         include_archived: bool = False):
+    """List the user's calendar events, optionally including archived ones."""
+    user = require_user(session_token)
+    events = local_auth_service.list_calendar_events(user.id, start=start, end=end,
+                                                     include_archived=include_archived)
+    return RecordResponse({"events": events})
+
+@app.post("/calendar/events")
+def create_calendar_event(event_data: CalendarEventCreate, session_token: str):
+    """Create a calendar event."""
+    user = require_user(session_token)
+    event = local_auth_service.create_calendar_event(user.id, event_data.dict(exclude_unset=True))
+    return RecordResponse({"message": "Event created successfully", "event": event})
+
+@app.put("/calendar/events/{event_id}")
+def update_calendar_event(event_id: str, event_data: CalendarEventUpdate, session_token: str):
+    """Update a calendar event."""
+    user = require_user(session_token)
+    event = local_auth_service.update_calendar_event(user.id, event_id, event_data.dict(exclude_unset=True))
+    return RecordResponse({"message": "Event updated successfully", "event": event})
+
+@app.delete("/calendar/events/{event_id}")
+def delete_calendar_event(event_id: str, session_token: str):
+    """Delete a calendar event."""
+    user = require_user(session_token)
+    local_auth_service.delete_calendar_event(user.id, event_id)
+    return {"message": "Event deleted"}
+
+@app.get("/agent/profile")
+def get_agent_profile(session_token: str):
+    """The user's assistant settings (defaults until first saved)."""
+    user = require_user(session_token)
+    return RecordResponse(agent_profiles.get(user.id))
+
+@app.put("/agent/profile")
+def update_agent_profile(profile_data: AgentProfileUpdate, session_token: str):
+    """Save assistant settings; prompts compiled from the old settings are dropped."""
+    user = require_user(session_token)
+    profile = agent_profiles.update(user.id, profile_data.dict(exclude_unset=True))
+    return RecordResponse({"message": "Agent profile updated successfully", "profile": profile})
+
+@app.delete("/agent/profile")
+def delete_agent_profile(session_token: str):
+    """Reset assistant settings to the defaults; prompts compiled from the old settings are dropped."""
+    user = require_user(session_token)
+    profile = agent_profiles.delete(user.id)
+    return RecordResponse({"message": "Agent profile deleted", "profile": profile})
+
+@app.post("/calls/{call_id}/transcript")
+def append_transcript(call_id: str, transcript: TranscriptAppend, session_token: str):
+    """Append transcript segments to a call and index them for search."""
+    user = require_user(session_token)
+    return transcript_store.add_segments(user.id, call_id, [segment.dict() for segment in transcript.segments])
+
+@app.get("/calls/{call_id}/transcript")
+def get_transcript(call_id: str, session_token: str):
+    """A call's transcript segments in order."""
+    user = require_user(session_token)
+    return {"call_id": call_id, "segments": transcript_store.transcript(user.id, call_id)}
+
+@app.get("/transcripts/search")
+def search_transcripts(q: str, session_token: str, limit: int = 20):
+    """Calls whose transcripts contain every word and "quoted phrase" of q, with timestamped hits."""
+    user = require_user(session_token)
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    return transcript_store.search(user.id, q, limit=limit)
+
+@app.get("/calls/{call_id}/prompt")
+def get_call_prompt(call_id: str, session_token: str):
+    """The compiled agent prompt a call will use."""
+    user = require_user(session_token)
+    return RecordResponse(agent_prompts.prompt(user.id, call_id))
+
+@app.get("/agent/cache")
+def agent_cache_stats(session_token: str):
+    """Hit rate and size of the compiled prompt cache."""
+    require_user(session_token)
+    return agent_prompts.stats()
+
+@app.get("/routing/rules")
+def list_routing_rules(session_token: str):
+    """The user's call routing rules in evaluation order."""
+    user = require_user(session_token)
+    return RecordResponse({"rules": routing_rules.list(user.id)})
+
+@app.post("/routing/rules")
+def create_routing_rule(rule_data: RoutingRuleCreate, session_token: str):
+    """Add a routing rule (after the existing ones unless a position is given)."""
+    user = require_user(session_token)
+    rule = routing_rules.create(user.id, rule_data.dict())
+    return RecordResponse({"message": "Routing rule created successfully", "rule": rule})
+
+@app.put("/routing/rules/{rule_id}")
+def update_routing_rule(rule_id: str, rule_data: RoutingRuleUpdate, session_token: str):
+    """Update a routing rule."""
+    user = require_user(session_token)
+    rule = routing_rules.update(user.id, rule_id, rule_data.dict(exclude_unset=True))
+    return RecordResponse({"message": "Routing rule updated successfully", "rule": rule})
+
+@app.delete("/routing/rules/{rule_id}")
+def delete_routing_rule(rule_id: str, session_token: str):
+    """Delete a routing rule."""
+    user = require_user(session_token)
+    routing_rules.delete(user.id, rule_id)
+    return {"message": "Routing rule deleted"}
+
+@app.get("/routing/settings")
+def get_routing_settings(session_token: str):
+    """The timezone the user's routing rules read days and times in."""
+    user = require_user(session_token)
+    return RecordResponse(routing_rules.settings(user.id))
+
+@app.put("/routing/settings")
+def update_routing_settings(settings_data: RoutingSettingsUpdate, session_token: str):
+    """Set the IANA timezone (e.g. America/New_York) of the user's day and time conditions."""
+    user = require_user(session_token)
+    settings = routing_rules.set_timezone(user.id, settings_data.timezone)
+    return RecordResponse({"message": "Routing settings updated successfully", "settings": settings})
+
+@app.get("/routing/decision")
+def route_call(session_token: str, caller_number: Optional[str] = None, at: Optional[str] = None):
+    """What the assistant does with a ring from caller_number, now or at the given time (UTC unless it has an offset)."""
+    user = require_user(session_token)
+    
+    try:
+        ring_time = parse_timestamp(at) if at else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="at must be an ISO timestamp")
+    
+    return RecordResponse(call_router.decide(user.id, caller_number, ring_time))
+
+@app.get("/routing/cache")
+def routing_cache_stats(session_token: str):
+    """Hit rate and compile times of the compiled routing rules."""
+    require_user(session_token)
+    return call_router.stats()
+
+@app.get("/agenda")
+def get_agenda(session_token: str, days: int = 1):
+    """Time-sorted calls and calendar events from the start of today, streamed as JSON."""
+    user = require_user(session_token)
+    
+    if days < 1 or days > 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+    
+    def body():
+        yield f'{{"days":{days},"items":['.encode()
+        for index, item in enumerate(agenda_cache.agenda(user.id, days=days)):
+            yield (("," if index else "") + json.dumps(item, separators=(",", ":"))).encode()
+        yield b"]}"
+    
+    return StreamingResponse(body(), media_type="application/json")
+
+@app.websocket("/ws")
+async def push_websocket(websocket: WebSocket, session_token: str):
+    """Push the user's call, calendar and reminder events over a WebSocket."""
+    try:
+        user = await run_in_threadpool(require_user, session_token)
+    except AuthenticationError:
+        await websocket.close(code=4401)
+        return
+    
+    await websocket.accept()
+    subscription = change_broker.subscribe(user.id)
+    
+    async def until_disconnect():
+        # Clients only listen, but reading is what notices a closed socket right away
+        # instead of at the next send
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    
+    receiver = asyncio.create_task(until_disconnect())
+    try:
+        while True:
+            getter = asyncio.ensure_future(subscription.get(timeout=PUSH_HEARTBEAT_SECONDS))
+            await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                getter.cancel()
+                return
+            try:
+                event = getter.result()
+            except asyncio.TimeoutError:
+                await websocket.send_json({"type": "ping"})
+                continue
+            if event is None:
+                # Too slow to keep up: the client should reconnect and refetch
+                await websocket.close(code=4408)
+                return
+            await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        change_broker.unsubscribe(subscription)
+
+@app.websocket("/voice/{call_id}")
+async def voice_session(websocket: WebSocket, call_id: str, session_token: str):
+    """Talk to the agent: binary audio in, binary audio out.
+
+    An empty binary message or any text message ends the caller's utterance.
+    """
+    try:
+        user = await run_in_threadpool(require_user, session_token)
+    except AuthenticationError:
+        await websocket.close(code=4401)
+        return
+    
+    await websocket.accept()
+    try:
+        pipeline = await run_in_threadpool(VoicePipeline.for_call, local_auth_service, user.id, call_id,
+                                           agent_prompts)
+    except ServiceError:
+        await websocket.close(code=4404)
+        return
+    
+    async def caller_audio():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            chunk = message.get("bytes")
+            yield chunk if chunk else END_OF_UTTERANCE
+    
+    try:
+        async for frame in pipeline.run(caller_audio()):
+            await websocket.send_bytes(frame.data)
+            if frame.final:
+                await websocket.send_json({"type": "turn", **pipeline.turn_report(frame.turn)})
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/events")
+async def push_events(session_token: str):
+    """Server-sent events fallback for clients that cannot use the WebSocket."""
+    user = await run_in_threadpool(require_user, session_token)
+    subscription = change_broker.subscribe(user.id)
+    
+    async def stream():
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    event = await subscription.get(timeout=PUSH_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if event is None:
+                    yield b"event: dropped\ndata: {}\n\n"
+                    return
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+        finally:
+            change_broker.unsubscribe(subscription)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.get("/analytics/calls")
+def get_call_analytics(session_token: str, start: Optional[str] = None, end: Optional[str] = None,
+                       granularity: str = "day"):
+    """Call counts, durations and busiest hours, served from the rollup buckets."""
+    user = require_user(session_token)
+    return RecordResponse(call_analytics.call_stats(user.id, start=start, end=end, granularity=granularity))
+
+@app.post("/archive/run")
+def run_archive(session_token: str):
+    """Move the user's completed calls and past events older than the horizon into the archive tables."""
+    user = require_user(session_token)
+    return {"archived": archiver.archive_user(user.id)}
+
+@app.post("/archive/{table}/{row_id}/restore")
+def restore_archived(table: str, row_id: str, session_token: str):
+    """Move one archived call or calendar event back into the user's live data."""
+    user = require_user(session_token)
+    return RecordResponse(archiver.restore(table, user.id, row_id))
+
+@app.get("/export")
+def export_data(session_token: str, format: str = "ndjson", table: Optional[str] = None, gzip: bool = False):
+    """Stream the user's contacts, calls and calendar events as NDJSON or CSV."""
+    user = require_user(session_token)
+    
+    try:
+        body = stream_export(local_auth_service, user.id, fmt=format, table=table, compress=gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    extension = "csv" if format == "csv" else "ndjson"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"{table or 'export'}.{extension}"
+    if gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/backup/status")
+def backup_status(session_token: str):
+    """Report the last backup run and the snapshots on disk."""
+    require_user(session_token)
     return {
-        "message": "Profile updated successfully",
-        "user": result['user']
+        "enabled": backup_scheduler is not None,
+        "last_error": backup_scheduler.last_error if backup_scheduler else None,
+        "last_report": backup_manager.last_report,
+        "snapshots": backup_manager.list_snapshots(),
     }
 
 def run_local_server():
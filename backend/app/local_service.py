@@ -8,14 +8,184 @@ import hashlib
 import secrets
 import json
 import os
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
 from pathlib import Path
 import uuid
 
+from .local_shards import ShardRouter
+from .local_deadlines import connect_within_deadline
+from .local_records import (
+    ServiceError, NotFoundError, AuthenticationError,
+    User, Session, Contact, Call, CalendarEvent, ContactImport, select,
+)
+from .local_analytics import ROLLUP_SCHEMA
+from .local_agenda import AGENDA_SCHEMA
+from .local_recordings import RECORDING_SCHEMA
+from .local_dedupe import DEDUPE_SCHEMA
+from .local_agent_profiles import AGENT_PROFILE_SCHEMA
+from .local_transcripts import TRANSCRIPT_SCHEMA
+from .local_call_routing import CALL_ROUTING_SCHEMA
+
+# Tables kept in the main database: accounts and sessions
+DIRECTORY_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id TEXT PRIMARY KEY,
+        email TEXT UNIQUE NOT NULL,
+        hashed_password TEXT NOT NULL,
+        full_name TEXT NOT NULL,
+        phone_number TEXT,
+        profile_picture_path TEXT,
+        is_active INTEGER DEFAULT 1,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    ''',
+    # Sessions table for local session management
+    '''
+    CREATE TABLE IF NOT EXISTS user_sessions (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        session_token TEXT UNIQUE NOT NULL,
+        expires_at TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)',
+    'CREATE INDEX IF NOT EXISTS idx_sessions_token ON user_sessions(session_token)',
+]
+
+# Per-user data tables; these go to the main database or to a shard
+DATA_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS contacts (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        role TEXT,
+        phone_number TEXT NOT NULL,
+        email TEXT,
+        company TEXT,
+        notes TEXT,
+        tags TEXT,
+        is_favorite INTEGER DEFAULT 0,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS calls (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        contact_id TEXT,
+        title TEXT NOT NULL,
+        description TEXT,
+        scheduled_at TEXT NOT NULL,
+        duration_minutes INTEGER DEFAULT 30,
+        status TEXT DEFAULT 'scheduled',
+        ai_instructions TEXT,
+        call_type TEXT DEFAULT 'outbound',
+        priority TEXT DEFAULT 'medium',
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY (contact_id) REFERENCES contacts (id) ON DELETE SET NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS calendar_events (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        title TEXT NOT NULL,
+        description TEXT,
+        start_time TEXT NOT NULL,
+        end_time TEXT NOT NULL,
+        color TEXT DEFAULT '#3B82F6',
+        is_all_day INTEGER DEFAULT 0,
+        recurrence_rule TEXT,
+        reminder_minutes INTEGER,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_contacts_user_id ON contacts(user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_calls_user_id ON calls(user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_calendar_events_user_id ON calendar_events(user_id)',
+    # Cold storage for completed calls and past events (see local_archive.py);
+    # same columns as the hot tables plus the time the row was archived
+    '''
+    CREATE TABLE IF NOT EXISTS calls_archive (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        contact_id TEXT,
+        title TEXT NOT NULL,
+        description TEXT,
+        scheduled_at TEXT NOT NULL,
+        duration_minutes INTEGER DEFAULT 30,
+        status TEXT DEFAULT 'scheduled',
+        ai_instructions TEXT,
+        call_type TEXT DEFAULT 'outbound',
+        priority TEXT DEFAULT 'medium',
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        archived_at TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS calendar_events_archive (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        title TEXT NOT NULL,
+        description TEXT,
+        start_time TEXT NOT NULL,
+        end_time TEXT NOT NULL,
+        color TEXT DEFAULT '#3B82F6',
+        is_all_day INTEGER DEFAULT 0,
+        recurrence_rule TEXT,
+        reminder_minutes INTEGER,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        archived_at TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_calls_archive_user_id ON calls_archive(user_id, scheduled_at)',
+    'CREATE INDEX IF NOT EXISTS idx_calendar_events_archive_user_id ON calendar_events_archive(user_id, start_time)',
+    # Call analytics buckets and the triggers maintaining them
+    *ROLLUP_SCHEMA,
+    # Materialized agenda (see local_agenda.py)
+    *AGENDA_SCHEMA,
+    # Call recording and transcript uploads (see local_recordings.py)
+    *RECORDING_SCHEMA,
+    # Contact de-duplication keys and suggestions (see local_dedupe.py)
+    *DEDUPE_SCHEMA,
+    # Assistant settings per user (see local_agent_profiles.py)
+    *AGENT_PROFILE_SCHEMA,
+    # Compressed transcripts and their search index (see local_transcripts.py)
+    *TRANSCRIPT_SCHEMA,
+    # Inbound call routing rules (see local_call_routing.py)
+    *CALL_ROUTING_SCHEMA,
+]
+
+# Column lists of the hot data tables, in table order
+CONTACT_COLUMNS = list(Contact._fields)
+CALL_COLUMNS = list(Call._fields)
+CALENDAR_EVENT_COLUMNS = list(CalendarEvent._fields)
+
+USER_COLUMNS = ', '.join(User._fields)
+
 class LocalAuthService:
-    def __init__(self, db_path: str = None):
-        """Initialize the local authentication service with SQLite database."""
+    def __init__(self, db_path: str = None, shard_mode: str = None,
+                 shard_buckets: int = 16, shard_idle_seconds: float = 300.0):
+        """Initialize the local authentication service with SQLite database.
+        
+        With shard_mode set to 'user' or 'hash', db_path only holds users and sessions
+        and each user's data is stored in a shard under a 'shards' directory next to it.
+        """
         if db_path is None:
             # Create database in user's app data directory
             app_data_dir = Path.home() / ".ai_call_receptionist"
@@ -23,6 +193,16 @@ class LocalAuthService:
             db_path = app_data_dir / "app_data.db"
         
         self.db_path = str(db_path)
+        self.change_listeners = []
+        self.shards = None
+        if shard_mode:
+            self.shards = ShardRouter(
+                Path(self.db_path).parent / "shards",
+                mode=shard_mode,
+                buckets=shard_buckets,
+                idle_seconds=shard_idle_seconds,
+                schema=DATA_SCHEMA,
+            )
         self.init_database()
     
     def init_database(self):
@@ -30,102 +210,89 @@ class LocalAuthService:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id TEXT PRIMARY KEY,
-                email TEXT UNIQUE NOT NULL,
-                hashed_password TEXT NOT NULL,
-                full_name TEXT NOT NULL,
-                phone_number TEXT,
-                profile_picture_path TEXT,
-                is_active INTEGER DEFAULT 1,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-        ''')
-        
-        # Create sessions table for local session management
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_sessions (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                session_token TEXT UNIQUE NOT NULL,
-                expires_at TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create contacts table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS contacts (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                role TEXT,
-                phone_number TEXT NOT NULL,
-                email TEXT,
-                company TEXT,
-                notes TEXT,
-                tags TEXT,
-                is_favorite INTEGER DEFAULT 0,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create calls table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS calls (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                contact_id TEXT,
-                title TEXT NOT NULL,
-                description TEXT,
-                scheduled_at TEXT NOT NULL,
-                duration_minutes INTEGER DEFAULT 30,
-                status TEXT DEFAULT 'scheduled',
-                ai_instructions TEXT,
-                call_type TEXT DEFAULT 'outbound',
-                priority TEXT DEFAULT 'medium',
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-                FOREIGN KEY (contact_id) REFERENCES contacts (id) ON DELETE SET NULL
-            )
-        ''')
-        
-        # Create calendar events table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS calendar_events (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                title TEXT NOT NULL,
-                description TEXT,
-                start_time TEXT NOT NULL,
-                end_time TEXT NOT NULL,
-                color TEXT DEFAULT '#3B82F6',
-                is_all_day INTEGER DEFAULT 0,
-                recurrence_rule TEXT,
-                reminder_minutes INTEGER,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-            )
-        ''')
+        # Users and sessions always live in the main (directory) database
+        for statement in DIRECTORY_SCHEMA:
+            cursor.execute(statement)
         
-        # Create indexes for better performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_token ON user_sessions(session_token)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_contacts_user_id ON contacts(user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_calls_user_id ON calls(user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_calendar_events_user_id ON calendar_events(user_id)')
+        # In sharded mode user data tables are created lazily in each shard
+        if self.shards is None:
+            for statement in DATA_SCHEMA:
+                cursor.execute(statement)
         
         conn.commit()
         conn.close()
     
+    @contextmanager
+    def data_connection(self, user_id: str) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the database holding a user's contacts, calls and events."""
+        if self.shards is not None:
+            with self.shards.connect(user_id) as conn:
+                yield conn
+            return
+        
+        conn = connect_within_deadline(self.db_path)
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def open_reader(self, user_id: str) -> sqlite3.Connection:
+        """Open a private connection to a user's data database for long reads.
+
+        Unlike data_connection() this never borrows a shared shard connection, so a
+        long-running read does not hold up writers of other users in the same shard.
+        The caller is responsible for closing it.
+        """
+        if self.shards is not None:
+            key = self.shards.shard_key(user_id)
+            # Make sure the shard file and its schema exist before reading
+            with self.shards.connect_key(key):
+                pass
+            return connect_within_deadline(str(self.shards.shard_path(key)), check_same_thread=False)
+        return connect_within_deadline(self.db_path, check_same_thread=False)
+
+    def each_data_connection(self) -> Iterator:
+        """Yield a connection context for every database holding user data (one per shard)."""
+        if self.shards is None:
+            yield self.data_connection('')
+            return
+        
+        for key in self.shards.existing_shards():
+            yield self.shards.connect_key(key)
+    
+    def query_all_data(self, query: str, params: tuple = ()) -> Iterator[tuple]:
+        """Run an admin read query over the data tables of every user, across all shards."""
+        if self.shards is not None:
+            for _, row in self.shards.query_all(query, params):
+                yield row
+            return
+        
+        conn = connect_within_deadline(self.db_path)
+        try:
+            yield from conn.execute(query, params)
+        finally:
+            conn.close()
+    
+    def add_change_listener(self, listener):
+        """Register listener(user_id, table, op, row), called after every committed data write.
+        
+        op is 'insert', 'update' or 'delete' and row the written record (for deletes,
+        the deleted one). Bulk contact imports send a single 'import' with a ContactImport,
+        and rows moved to or from the archive tables send 'archive' or 'restore'.
+        """
+        self.change_listeners.append(listener)
+    
+    def _notify_change(self, user_id: str, table: str, op: str, row: tuple):
+        """Tell every change listener about a committed write; listener errors never fail the write."""
+        for listener in self.change_listeners:
+            try:
+                listener(user_id, table, op, row)
+            except Exception as e:
+                print(f"⚠️  Change listener failed for {table} {op}: {str(e)}")
+    
     def _hash_password(self, password: str) -> str:
         """Hash a password using SHA-256 with salt."""
         salt = secrets.token_hex(32)
@@ -148,19 +315,16 @@ class LocalAuthService:
         """Get current timestamp as ISO string."""
         return datetime.utcnow().isoformat()
     
-    def register_user(self, email: str, password: str, full_name: str, phone_number: str = None) -> Dict[str, Any]:
+    def register_user(self, email: str, password: str, full_name: str, phone_number: str = None) -> User:
         """Register a new user."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_within_deadline(self.db_path)
         cursor = conn.cursor()
         
         try:
             # Check if user already exists
             cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
             if cursor.fetchone():
-                return {
-                    'success': False,
-                    'error': 'User with this email already exists'
-                }
+                raise ServiceError('User with this email already exists')
             
             # Create new user
             user_id = str(uuid.uuid4())
@@ -174,60 +338,39 @@ class LocalAuthService:
             
             conn.commit()
             
-            return {
-                'success': True,
-                'user': {
-                    'id': user_id,
-                    'email': email,
-                    'full_name': full_name,
-                    'phone_number': phone_number,
-                    'created_at': current_time
-                }
-            }
-        
-        except Exception as e:
+            return User(user_id, email, full_name, phone_number, None, current_time)
+        
+        except sqlite3.Error as e:
             conn.rollback()
-            return {
-                'success': False,
-                'error': f'Registration failed: {str(e)}'
-            }
+            raise ServiceError(f'Registration failed: {str(e)}') from e
         finally:
             conn.close()
     
-    def login_user(self, email: str, password: str) -> Dict[str, Any]:
+    def login_user(self, email: str, password: str) -> Session:
         """Authenticate user and create session."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_within_deadline(self.db_path)
         cursor = conn.cursor()
         
         try:
             # Get user by email
-            cursor.execute('''
-                SELECT id, email, hashed_password, full_name, phone_number, profile_picture_path, is_active
-                FROM users WHERE email = ?
+            cursor.execute(f'''
+                SELECT {USER_COLUMNS}, hashed_password, is_active FROM users WHERE email = ?
             ''', (email,))
             
             user_row = cursor.fetchone()
             if not user_row:
-                return {
-                    'success': False,
-                    'error': 'Invalid email or password'
-                }
+                raise AuthenticationError('Invalid email or password')
             
-            user_id, user_email, hashed_password, full_name, phone_number, profile_picture_path, is_active = user_row
+            user = User._make(user_row[:-2])
+            hashed_password, is_active = user_row[-2:]
             
             # Check if user is active
             if not is_active:
-                return {
-                    'success': False,
-                    'error': 'Account is deactivated'
-                }
+                raise AuthenticationError('Account is deactivated')
             
             # Verify password
             if not self._verify_password(password, hashed_password):
-                return {
-                    'success': False,
-                    'error': 'Invalid email or password'
-                }
+                raise AuthenticationError('Invalid email or password')
             
             # Create session
             session_id = str(uuid.uuid4())
@@ -236,46 +379,33 @@ class LocalAuthService:
             current_time = self._get_current_timestamp()
             
             # Clean up old sessions for this user
-            cursor.execute('DELETE FROM user_sessions WHERE user_id = ?', (user_id,))
+            cursor.execute('DELETE FROM user_sessions WHERE user_id = ?', (user.id,))
             
             # Create new session
             cursor.execute('''
                 INSERT INTO user_sessions (id, user_id, session_token, expires_at, created_at)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (session_id, user_id, session_token, expires_at, current_time))
+            ''', (session_id, user.id, session_token, expires_at, current_time))
             
             conn.commit()
             
-            return {
-                'success': True,
-                'session_token': session_token,
-                'user': {
-                    'id': user_id,
-                    'email': user_email,
-                    'full_name': full_name,
-                    'phone_number': phone_number,
-                    'profile_picture_path': profile_picture_path
-                }
-            }
-        
-        except Exception as e:
+            return Session(session_token, user)
+        
+        except sqlite3.Error as e:
             conn.rollback()
-            return {
-                'success': False,
-                'error': f'Login failed: {str(e)}'
-            }
+            raise ServiceError(f'Login failed: {str(e)}', status=401) from e
         finally:
             conn.close()
     
-    def get_user_by_session(self, session_token: str) -> Dict[str, Any]:
+    def get_user_by_session(self, session_token: str) -> User:
         """Get user information by session token."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_within_deadline(self.db_path)
         cursor = conn.cursor()
         
         try:
             # Get session and user info
-            cursor.execute('''
-                SELECT u.id, u.email, u.full_name, u.phone_number, u.profile_picture_path, s.expires_at
+            cursor.execute(f'''
+                SELECT {', '.join(f'u.{field}' for field in User._fields)}, s.expires_at
                 FROM users u
                 JOIN user_sessions s ON u.id = s.user_id
                 WHERE s.session_token = ? AND u.is_active = 1
@@ -283,117 +413,272 @@ class LocalAuthService:
             
             result = cursor.fetchone()
             if not result:
-                return {
-                    'success': False,
-                    'error': 'Invalid session'
-                }
-            
-            user_id, email, full_name, phone_number, profile_picture_path, expires_at = result
+                raise AuthenticationError('Invalid session')
             
             # Check if session is expired
-            if datetime.fromisoformat(expires_at) < datetime.utcnow():
+            if datetime.fromisoformat(result[-1]) < datetime.utcnow():
                 # Clean up expired session
                 cursor.execute('DELETE FROM user_sessions WHERE session_token = ?', (session_token,))
                 conn.commit()
-                return {
-                    'success': False,
-                    'error': 'Session expired'
-                }
+                raise AuthenticationError('Session expired')
             
-            return {
-                'success': True,
-                'user': {
-                    'id': user_id,
-                    'email': email,
-                    'full_name': full_name,
-                    'phone_number': phone_number,
-                    'profile_picture_path': profile_picture_path
-                }
-            }
-        
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f'Session validation failed: {str(e)}'
-            }
+            return User._make(result[:-1])
+        
+        except sqlite3.Error as e:
+            raise AuthenticationError(f'Session validation failed: {str(e)}') from e
         finally:
             conn.close()
     
-    def logout_user(self, session_token: str) -> Dict[str, Any]:
+    def logout_user(self, session_token: str):
         """Logout user by removing session."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_within_deadline(self.db_path)
         cursor = conn.cursor()
         
         try:
             cursor.execute('DELETE FROM user_sessions WHERE session_token = ?', (session_token,))
             conn.commit()
-            
-            return {
-                'success': True,
-                'message': 'Logged out successfully'
-            }
-        
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f'Logout failed: {str(e)}'
-            }
+        
+        except sqlite3.Error as e:
+            raise ServiceError(f'Logout failed: {str(e)}') from e
         finally:
             conn.close()
     
-    def update_user_profile(self, session_token: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+    def update_user_profile(self, session_token: str, updates: Dict[str, Any]) -> User:
         """Update user profile information."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Get user ID from session
+        user_id = self.get_user_by_session(session_token).id
+        
+        # Build update query
+        allowed_fields = ['full_name', 'phone_number', 'profile_picture_path']
+        update_fields = []
+        update_values = []
+        
+        for field, value in updates.items():
+            if field in allowed_fields:
+                update_fields.append(f"{field} = ?")
+                update_values.append(value)
+        
+        if not update_fields:
+            raise ServiceError('No valid fields to update')
+        
+        # Add updated_at timestamp
+        update_fields.append("updated_at = ?")
+        update_values.append(self._get_current_timestamp())
+        update_values.append(user_id)
         
+        conn = connect_within_deadline(self.db_path)
         try:
-            # Get user ID from session
-            user_result = self.get_user_by_session(session_token)
-            if not user_result['success']:
-                return user_result
-            
-            user_id = user_result['user']['id']
-            
-            # Build update query
-            allowed_fields = ['full_name', 'phone_number', 'profile_picture_path']
-            update_fields = []
-            update_values = []
-            
-            for field, value in updates.items():
-                if field in allowed_fields:
-                    update_fields.append(f"{field} = ?")
-                    update_values.append(value)
-            
-            if not update_fields:
-                return {
-                    'success': False,
-                    'error': 'No valid fields to update'
-                }
-            
-            # Add updated_at timestamp
-            update_fields.append("updated_at = ?")
-            update_values.append(self._get_current_timestamp())
-            update_values.append(user_id)
-            
-            query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?"
-            cursor.execute(query, update_values)
+            conn.execute(f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?", update_values)
             conn.commit()
             
             # Return updated user info
-            return self.get_user_by_session(session_token)
+            return select(conn, User, f'SELECT {USER_COLUMNS} FROM users WHERE id = ?', (user_id,)).fetchone()
         
-        except Exception as e:
+        except sqlite3.Error as e:
             conn.rollback()
-            return {
-                'success': False,
-                'error': f'Profile update failed: {str(e)}'
-            }
+            raise ServiceError(f'Profile update failed: {str(e)}') from e
         finally:
             conn.close()
 
+    
+    def _select_with_archive(self, table: str, record: type, time_column: str, user_id: str,
+                             start: str = None, end: str = None, extra_where: str = '',
+                             extra_params: tuple = (), include_archived: bool = False) -> list:
+        """Read a user's rows from a hot table, optionally merged with its archive table."""
+        where = f'user_id = ?{extra_where}'
+        params = [user_id, *extra_params]
+        if start:
+            where += f' AND {time_column} >= ?'
+            params.append(start)
+        if end:
+            where += f' AND {time_column} < ?'
+            params.append(end)
+        
+        column_list = ', '.join(record._fields)
+        query = f'SELECT {column_list} FROM {table} WHERE {where}'
+        if include_archived:
+            query += f' UNION ALL SELECT {column_list} FROM {table}_archive WHERE {where}'
+            params = params * 2
+        query += f' ORDER BY {time_column}'
+        
+        with self.data_connection(user_id) as conn:
+            return select(conn, record, query, params).fetchall()
+    
+    def list_calls(self, user_id: str, start: str = None, end: str = None, status: str = None,
+                   include_archived: bool = False) -> List[Call]:
+        """List a user's calls by scheduled time, optionally including archived calls."""
+        try:
+            return self._select_with_archive(
+                'calls', Call, 'scheduled_at', user_id, start, end,
+                extra_where=' AND status = ?' if status else '',
+                extra_params=(status,) if status else (),
+                include_archived=include_archived,
+            )
+        
+        except sqlite3.Error as e:
+            raise ServiceError(f'Listing calls failed: {str(e)}') from e
+    
+    def list_calendar_events(self, user_id: str, start: str = None, end: str = None,
+                             include_archived: bool = False) -> List[CalendarEvent]:
+        """List a user's calendar events by start time, optionally including archived events."""
+        try:
+            return self._select_with_archive(
+                'calendar_events', CalendarEvent, 'start_time', user_id, start, end,
+                include_archived=include_archived,
+            )
+        
+        except sqlite3.Error as e:
+            raise ServiceError(f'Listing events failed: {str(e)}') from e
+
+    
+    def _fetch_row(self, conn: sqlite3.Connection, table: str, record: type, user_id: str, row_id: str):
+        """Read one of a user's rows as a record, or None."""
+        return select(
+            conn, record, f"SELECT {', '.join(record._fields)} FROM {table} WHERE id = ? AND user_id = ?",
+            (row_id, user_id)
+        ).fetchone()
+    
+    def _create_row(self, table: str, record: type, user_id: str, data: Dict[str, Any], action: str):
+        """Insert a row owned by user_id from the allowed fields in data and return it."""
+        current_time = self._get_current_timestamp()
+        values = {field: value for field, value in data.items() if field in record._fields and value is not None}
+        for field in ('id', 'user_id', 'created_at', 'updated_at'):
+            values.pop(field, None)
+        values.update(id=str(uuid.uuid4()), user_id=user_id, created_at=current_time, updated_at=current_time)
+        
+        fields = list(values)
+        try:
+            with self.data_connection(user_id) as conn:
+                conn.execute(
+                    f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join('?' for _ in fields)})",
+                    [values[field] for field in fields]
+                )
+                row = self._fetch_row(conn, table, record, user_id, values['id'])
+                conn.commit()
+        except sqlite3.Error as e:
+            raise ServiceError(f'{action} failed: {str(e)}') from e
+        
+        self._notify_change(user_id, table, 'insert', row)
+        return row
+    
+    def _update_row(self, table: str, record: type, user_id: str, row_id: str, updates: Dict[str, Any],
+                    action: str, missing: str):
+        """Update allowed fields of a user's row and return the new row."""
+        values = {field: value for field, value in updates.items()
+                  if field in record._fields and field not in ('id', 'user_id', 'created_at', 'updated_at')}
+        if not values:
+            raise ServiceError('No valid fields to update')
+        values['updated_at'] = self._get_current_timestamp()
+        
+        fields = list(values)
+        try:
+            with self.data_connection(user_id) as conn:
+                cursor = conn.execute(
+                    f"UPDATE {table} SET {', '.join(f'{field} = ?' for field in fields)} WHERE id = ? AND user_id = ?",
+                    [values[field] for field in fields] + [row_id, user_id]
+                )
+                if cursor.rowcount == 0:
+                    raise NotFoundError(missing)
+                row = self._fetch_row(conn, table, record, user_id, row_id)
+                conn.commit()
+        except sqlite3.Error as e:
+            raise ServiceError(f'{action} failed: {str(e)}') from e
+        
+        self._notify_change(user_id, table, 'update', row)
+        return row
+    
+    def _delete_row(self, table: str, record: type, user_id: str, row_id: str, action: str, missing: str):
+        """Delete a user's row and return it."""
+        try:
+            with self.data_connection(user_id) as conn:
+                row = self._fetch_row(conn, table, record, user_id, row_id)
+                if row is None:
+                    raise NotFoundError(missing)
+                conn.execute(f"DELETE FROM {table} WHERE id = ? AND user_id = ?", (row_id, user_id))
+                conn.commit()
+        except sqlite3.Error as e:
+            raise ServiceError(f'{action} failed: {str(e)}') from e
+        
+        self._notify_change(user_id, table, 'delete', row)
+        return row
+    
+    def create_contact(self, user_id: str, data: Dict[str, Any]) -> Contact:
+        """Add a contact."""
+        return self._create_row('contacts', Contact, user_id, data, 'Creating contact')
+    
+    def update_contact(self, user_id: str, contact_id: str, updates: Dict[str, Any]) -> Contact:
+        """Update a contact."""
+        return self._update_row('contacts', Contact, user_id, contact_id, updates,
+                                'Updating contact', 'Contact not found')
+    
+    def delete_contact(self, user_id: str, contact_id: str) -> Contact:
+        """Delete a contact; returns the deleted contact."""
+        return self._delete_row('contacts', Contact, user_id, contact_id, 'Deleting contact', 'Contact not found')
+    
+    def import_contacts(self, user_id: str, contacts: List[Dict[str, Any]]) -> ContactImport:
+        """Bulk-insert contacts in one transaction; rows without a name or phone number are skipped."""
+        current_time = self._get_current_timestamp()
+        fields = [field for field in CONTACT_COLUMNS if field not in ('id', 'user_id', 'created_at', 'updated_at')]
+        rows = []
+        ids = []
+        
+        for contact in contacts:
+            if not contact.get('name') or not contact.get('phone_number'):
+                continue
+            contact_id = str(uuid.uuid4())
+            ids.append(contact_id)
+            values = [contact.get(field) for field in fields]
+            # Explicit NULLs would bypass the column default
+            values[fields.index('is_favorite')] = int(bool(contact.get('is_favorite')))
+            rows.append((contact_id, user_id, *values, current_time, current_time))
+        
+        try:
+            with self.data_connection(user_id) as conn:
+                conn.executemany(f"""
+                    INSERT INTO contacts (id, user_id, {', '.join(fields)}, created_at, updated_at)
+                    VALUES ({', '.join('?' for _ in range(len(fields) + 4))})
+                """, rows)
+                conn.commit()
+        
+        except sqlite3.Error as e:
+            raise ServiceError(f'Importing contacts failed: {str(e)}') from e
+        
+        result = ContactImport(len(ids), len(contacts) - len(ids), ids)
+        self._notify_change(user_id, 'contacts', 'import', result)
+        return result
+    
+    def create_call(self, user_id: str, data: Dict[str, Any]) -> Call:
+        """Schedule a new call."""
+        return self._create_row('calls', Call, user_id, data, 'Creating call')
+    
+    def update_call(self, user_id: str, call_id: str, updates: Dict[str, Any]) -> Call:
+        """Update a call's details or status."""
+        return self._update_row('calls', Call, user_id, call_id, updates, 'Updating call', 'Call not found')
+    
+    def delete_call(self, user_id: str, call_id: str) -> Call:
+        """Delete a call; returns the deleted call."""
+        return self._delete_row('calls', Call, user_id, call_id, 'Deleting call', 'Call not found')
+    
+    def create_calendar_event(self, user_id: str, data: Dict[str, Any]) -> CalendarEvent:
+        """Create a calendar event."""
+        return self._create_row('calendar_events', CalendarEvent, user_id, data, 'Creating event')
+    
+    def update_calendar_event(self, user_id: str, event_id: str, updates: Dict[str, Any]) -> CalendarEvent:
+        """Update a calendar event."""
+        return self._update_row('calendar_events', CalendarEvent, user_id, event_id, updates,
+                                'Updating event', 'Event not found')
+    
+    def delete_calendar_event(self, user_id: str, event_id: str) -> CalendarEvent:
+        """Delete a calendar event; returns the deleted event."""
+        return self._delete_row('calendar_events', CalendarEvent, user_id, event_id,
+                                'Deleting event', 'Event not found')
+
 
-# Create a global instance
-local_auth_service = LocalAuthService()
+# Create a global instance (set AI_RECEPTIONIST_SHARD_MODE=user|hash to enable sharding)
+local_auth_service = LocalAuthService(
+    shard_mode=os.environ.get("AI_RECEPTIONIST_SHARD_MODE") or None,
+    shard_buckets=int(os.environ.get("AI_RECEPTIONIST_SHARD_BUCKETS", "16")),
+)
 
 
 def main():
@@ -402,39 +687,43 @@ def main():
     
     # Test registration
     print("Testing registration...")
-    result = service.register_user(
-        email="test@example.com",
-        password="testpassword123",
-        full_name="Test User",
-        phone_number="+1234567890"
-    )
-    print(f"Registration result: {result}")
+    try:
+        user = service.register_user(
+            email="test@example.com",
+            password="testpassword123",
+            full_name="Test User",
+            phone_number="+1234567890"
+        )
+        print(f"Registration result: {user}")
+    except ServiceError as e:
+        print(f"Registration failed: {e}")
     
     # Test login
     print("\nTesting login...")
-    login_result = service.login_user("test@example.com", "testpassword123")
-    print(f"Login result: {login_result}")
-    
-    if login_result['success']:
-        session_token = login_result['session_token']
-        
-        # Test session validation
-        print("\nTesting session validation...")
-        session_result = service.get_user_by_session(session_token)
-        print(f"Session validation result: {session_result}")
-        
-        # Test profile update
-        print("\nTesting profile update...")
-        update_result = service.update_user_profile(session_token, {
-            'full_name': 'Updated Test User',
-            'phone_number': '+9876543210'
-        })
-        print(f"Profile update result: {update_result}")
-        
-        # Test logout
-        print("\nTesting logout...")
-        logout_result = service.logout_user(session_token)
-        print(f"Logout result: {logout_result}")
+    try:
+        session = service.login_user("test@example.com", "testpassword123")
+    except ServiceError as e:
+        print(f"Login failed: {e}")
+        return
+    print(f"Login result: {session}")
+    session_token = session.session_token
+    
+    # Test session validation
+    print("\nTesting session validation...")
+    print(f"Session validation result: {service.get_user_by_session(session_token)}")
+    
+    # Test profile update
+    print("\nTesting profile update...")
+    updated = service.update_user_profile(session_token, {
+        'full_name': 'Updated Test User',
+        'phone_number': '+9876543210'
+    })
+    print(f"Profile update result: {updated}")
+    
+    # Test logout
+    print("\nTesting logout...")
+    service.logout_user(session_token)
+    print("Logged out")
 
 
 if __name__ == "__main__":
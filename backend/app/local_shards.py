@@ -0,0 +1,163 @@
+"""
+Sharded storage for the local data service.
+User data (contacts, calls, calendar events) is split across several SQLite files so
+that one user's heavy writes never hold the single-writer lock for everyone else.
+"""
+
+import sqlite3
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+
+from .local_deadlines import within_deadline, lock_timeout, deadline_exceeded
+
+
+class ShardRouter:
+    """Maps user ids to shard databases and manages lazily opened shard connections."""
+
+    MODES = ('user', 'hash')
+
+    def __init__(self, shard_dir: str, mode: str = 'hash', buckets: int = 16,
+                 idle_seconds: float = 300.0, schema: Optional[List[str]] = None):
+        """Create a router storing shard files in shard_dir.
+
+        mode='user' gives every user their own database file, mode='hash' spreads
+        users over a fixed number of bucket files.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown shard mode: {mode}")
+
+        self.shard_dir = Path(shard_dir)
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.buckets = max(1, int(buckets))
+        self.idle_seconds = idle_seconds
+        self.schema = schema or []
+
+        # shard key -> {'conn': Connection, 'lock': RLock, 'last_used': float}
+        self._shards: Dict[str, Dict[str, Any]] = {}
+        self._registry_lock = threading.Lock()
+        self._last_reap = time.monotonic()
+
+    def shard_key(self, user_id: str) -> str:
+        """Return the shard key a user's data lives in."""
+        if self.mode == 'user':
+            return f"user_{user_id}"
+        digest = hashlib.sha1(user_id.encode()).digest()
+        bucket = int.from_bytes(digest[:4], 'big') % self.buckets
+        return f"bucket_{bucket:03d}"
+
+    def shard_path(self, key: str) -> Path:
+        """Return the database file backing a shard key."""
+        return self.shard_dir / f"{key}.db"
+
+    def existing_shards(self) -> List[str]:
+        """List the shard keys that have a database file on disk."""
+        return sorted(path.stem for path in self.shard_dir.glob('*.db'))
+
+    def _open(self, key: str) -> sqlite3.Connection:
+        """Open a shard database and make sure its schema exists."""
+        conn = sqlite3.connect(str(self.shard_path(key)), check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        for statement in self.schema:
+            conn.execute(statement)
+        conn.commit()
+        return conn
+
+    def _entry(self, key: str) -> Dict[str, Any]:
+        """Get (creating if needed) the registry entry for a shard."""
+        with self._registry_lock:
+            entry = self._shards.get(key)
+            if entry is None:
+                entry = {'conn': None, 'lock': threading.RLock(), 'last_used': time.monotonic()}
+                self._shards[key] = entry
+            return entry
+
+    @contextmanager
+    def connect_key(self, key: str) -> Iterator[sqlite3.Connection]:
+        """Borrow the connection for a shard key, opening it on first use."""
+        self._maybe_reap()
+        entry = self._entry(key)
+
+        # Waiting for another request's turn on the shard counts against our deadline
+        if not entry['lock'].acquire(timeout=lock_timeout()):
+            raise deadline_exceeded('Request deadline exceeded waiting for the shard')
+        try:
+            if entry['conn'] is None:
+                entry['conn'] = self._open(key)
+            try:
+                with within_deadline(entry['conn']) as conn:
+                    yield conn
+            except Exception:
+                entry['conn'].rollback()
+                raise
+            finally:
+                entry['last_used'] = time.monotonic()
+        finally:
+            entry['lock'].release()
+
+    def connect(self, user_id: str):
+        """Borrow the connection of the shard holding user_id's data."""
+        return self.connect_key(self.shard_key(user_id))
+
+    def _maybe_reap(self):
+        """Close idle shards, at most once per idle period."""
+        now = time.monotonic()
+        if now - self._last_reap >= min(self.idle_seconds, 60.0):
+            self._last_reap = now
+            self.close_idle()
+
+    def close_idle(self, now: Optional[float] = None) -> int:
+        """Close connections unused for longer than idle_seconds. Returns how many were closed."""
+        now = time.monotonic() if now is None else now
+        closed = 0
+
+        with self._registry_lock:
+            entries = list(self._shards.items())
+
+        for key, entry in entries:
+            if entry['conn'] is None or now - entry['last_used'] < self.idle_seconds:
+                continue
+            # Skip shards that are busy right now; they are not idle
+            if not entry['lock'].acquire(blocking=False):
+                continue
+            try:
+                if entry['conn'] is not None:
+                    entry['conn'].close()
+                    entry['conn'] = None
+                    closed += 1
+            finally:
+                entry['lock'].release()
+
+        return closed
+
+    def close_all(self):
+        """Close every open shard connection."""
+        with self._registry_lock:
+            entries = list(self._shards.values())
+
+        for entry in entries:
+            with entry['lock']:
+                if entry['conn'] is not None:
+                    entry['conn'].close()
+                    entry['conn'] = None
+
+    def open_count(self) -> int:
+        """Number of shard connections currently open."""
+        with self._registry_lock:
+            return sum(1 for entry in self._shards.values() if entry['conn'] is not None)
+
+    def query_all(self, query: str, params: tuple = ()) -> Iterator[Tuple[str, tuple]]:
+        """Run a read query against every shard, yielding (shard_key, row) pairs.
+
+        Each shard is queried in turn and its rows are fetched before moving on,
+        so a slow consumer never holds a shard lock between rows of other shards.
+        """
+        for key in self.existing_shards():
+            with self.connect_key(key) as conn:
+                rows = conn.execute(query, params).fetchall()
+            for row in rows:
+                yield key, row
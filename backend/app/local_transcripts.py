@@ -0,0 +1,460 @@
+"""
+Compressed call transcripts with a positional inverted index.
+Transcript segments are stored zlib-compressed against a preset dictionary of common
+phone-call vocabulary, which keeps short segments small. Every word of a segment is
+posted to a per-user index with its token positions, so searches read only the
+postings of the query terms, phrases ("the invoice") are matched by position, and
+hits come back as call ids with the time inside the call where the words were said.
+"""
+
+import re
+import time
+import zlib
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple
+
+from .local_records import ServiceError, NotFoundError
+
+TRANSCRIPT_SCHEMA = [
+    # Small integer keys for users and calls; index keys repeat them on every row, so
+    # they are kept far shorter than the uuids they stand for
+    '''
+    CREATE TABLE IF NOT EXISTS transcript_owners (
+        owner INTEGER PRIMARY KEY,
+        user_id TEXT UNIQUE NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS transcript_docs (
+        doc INTEGER PRIMARY KEY,
+        owner INTEGER NOT NULL,
+        call_id TEXT UNIQUE NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS transcript_segments (
+        doc INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        start_ms INTEGER NOT NULL,
+        end_ms INTEGER NOT NULL,
+        speaker TEXT,
+        tokens INTEGER NOT NULL,
+        codec INTEGER NOT NULL,
+        body BLOB NOT NULL,
+        PRIMARY KEY (doc, seq)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS transcript_postings (
+        owner INTEGER NOT NULL,
+        term TEXT NOT NULL,
+        doc INTEGER NOT NULL,
+        postings BLOB NOT NULL,
+        PRIMARY KEY (owner, term, doc)
+    ) WITHOUT ROWID
+    ''',
+]
+
+# Preset dictionaries by codec id; stored rows keep the id they were written with,
+# so a new dictionary gets a new id and old segments still decode
+DICTIONARIES = {
+    1: (
+        b"thank you for calling how can I help you today I would like to schedule an appointment "
+        b"can you please let me know what time works for you next week on Monday Tuesday Wednesday "
+        b"Thursday Friday morning afternoon evening I'm calling about the invoice payment bill order "
+        b"delivery account number phone number email address call me back later tomorrow yes no okay "
+        b"sure great perfect that's right I don't know I think we can do that is there anything else "
+        b"I can help you with have a nice day goodbye hello hi this is speaking "
+    ),
+}
+CODEC = 1
+
+# Candidate calls up to which other phrase terms are looked up by key instead of read in full
+POINT_LOOKUP_LIMIT = 256
+
+# Characters of context on each side of a hit in snippets
+SNIPPET_CONTEXT = 60
+
+_TOKEN = re.compile(r"[\w']+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text: str) -> Iterator[Tuple[int, str, int, int]]:
+    """Yield (position, term, start char, end char) for each word of text."""
+    for position, match in enumerate(_TOKEN.finditer(text)):
+        yield position, match.group().lower(), match.start(), match.end()
+
+
+def compress(text: str, codec: int = CODEC) -> bytes:
+    compressor = zlib.compressobj(9, zdict=DICTIONARIES[codec])
+    return compressor.compress(text.encode()) + compressor.flush()
+
+
+def decompress(body: bytes, codec: int) -> str:
+    decompressor = zlib.decompressobj(zdict=DICTIONARIES[codec])
+    return (decompressor.decompress(body) + decompressor.flush()).decode()
+
+
+def _varint(value: int, out: bytearray):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_postings(segments: Iterable[Tuple[int, List[int]]]) -> bytes:
+    """(seq, ascending positions) pairs as varints: seq, count, then position deltas.
+
+    Blobs of later segments can simply be appended to those of earlier ones.
+    """
+    out = bytearray()
+    for seq, positions in segments:
+        _varint(seq, out)
+        _varint(len(positions), out)
+        previous = 0
+        for position in positions:
+            _varint(position - previous, out)
+            previous = position
+    return bytes(out)
+
+
+def decode_postings(data: bytes) -> Dict[int, List[int]]:
+    """seq -> positions of an encoded postings blob."""
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = shift = 0
+
+    segments = {}
+    index = 0
+    while index < len(values):
+        seq, count = values[index], values[index + 1]
+        index += 2
+        positions = []
+        previous = 0
+        for delta in values[index:index + count]:
+            previous += delta
+            positions.append(previous)
+        segments[seq] = positions
+        index += count
+    return segments
+
+
+def parse_query(query: str) -> List[List[str]]:
+    """Split a query into clauses: quoted phrases and single words, each a list of terms."""
+    clauses = []
+    for phrase, word in _QUERY.findall(query):
+        terms = [term for _, term, _, _ in tokenize(phrase or word)]
+        if terms:
+            clauses.append(terms)
+    return clauses
+
+
+class TranscriptStore:
+    """Stores transcript segments per call and answers word and phrase searches."""
+
+    def __init__(self, service):
+        self.service = service
+
+    @staticmethod
+    def _owner(conn, user_id: str, create: bool = False) -> Optional[int]:
+        row = conn.execute('SELECT owner FROM transcript_owners WHERE user_id = ?', (user_id,)).fetchone()
+        if row is None and create:
+            return conn.execute('INSERT INTO transcript_owners (user_id) VALUES (?)', (user_id,)).lastrowid
+        return row[0] if row else None
+
+    @staticmethod
+    def _doc(conn, owner: Optional[int], call_id: str) -> Optional[int]:
+        row = conn.execute(
+            'SELECT doc FROM transcript_docs WHERE call_id = ? AND owner = ?', (call_id, owner)
+        ).fetchone()
+        return row[0] if row else None
+
+    def add_segments(self, user_id: str, call_id: str, segments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Append segments ({start_ms, end_ms, speaker, text}) to a call's transcript and index them."""
+        segment_rows = []
+        # term -> [(seq, positions)] over the new segments
+        postings: Dict[str, List[Tuple[int, List[int]]]] = {}
+        with self.service.data_connection(user_id) as conn:
+            if conn.execute('SELECT 1 FROM calls WHERE id = ? AND user_id = ?', (call_id, user_id)).fetchone() is None:
+                raise NotFoundError('Call not found')
+            owner = self._owner(conn, user_id, create=True)
+            doc = self._doc(conn, owner, call_id)
+            if doc is None:
+                doc = conn.execute(
+                    'INSERT INTO transcript_docs (owner, call_id) VALUES (?, ?)', (owner, call_id)
+                ).lastrowid
+            seq = conn.execute(
+                'SELECT COALESCE(MAX(seq) + 1, 0) FROM transcript_segments WHERE doc = ?', (doc,)
+            ).fetchone()[0]
+
+            for segment in segments:
+                text = segment.get('text') or ''
+                start_ms, end_ms = int(segment.get('start_ms', 0)), int(segment.get('end_ms', 0))
+                if start_ms < 0 or end_ms < start_ms:
+                    raise ServiceError('Segment times must satisfy 0 <= start_ms <= end_ms')
+                positions: Dict[str, List[int]] = {}
+                tokens = 0
+                for position, term, _, _ in tokenize(text):
+                    positions.setdefault(term, []).append(position)
+                    tokens += 1
+                segment_rows.append((doc, seq, start_ms, end_ms, segment.get('speaker'),
+                                     tokens, CODEC, compress(text)))
+                for term, term_positions in positions.items():
+                    postings.setdefault(term, []).append((seq, term_positions))
+                seq += 1
+
+            conn.executemany('''
+                INSERT INTO transcript_segments (doc, seq, start_ms, end_ms, speaker, tokens, codec, body)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', segment_rows)
+            conn.executemany('''
+                INSERT INTO transcript_postings (owner, term, doc, postings) VALUES (?, ?, ?, ?)
+                ON CONFLICT(owner, term, doc) DO UPDATE SET postings = postings || excluded.postings
+            ''', [(owner, term, doc, encode_postings(term_segments))
+                  for term, term_segments in sorted(postings.items())])
+            conn.commit()
+
+        return {'call_id': call_id, 'segments': len(segment_rows), 'terms': len(postings)}
+
+    def transcript(self, user_id: str, call_id: str) -> List[Dict[str, Any]]:
+        """A call's segments in order, decompressed."""
+        with self.service.data_connection(user_id) as conn:
+            rows = conn.execute('''
+                SELECT s.seq, s.start_ms, s.end_ms, s.speaker, s.codec, s.body
+                FROM transcript_segments s
+                JOIN transcript_docs d ON d.doc = s.doc
+                JOIN transcript_owners o ON o.owner = d.owner
+                WHERE d.call_id = ? AND o.user_id = ? ORDER BY s.seq
+            ''', (call_id, user_id)).fetchall()
+        return [
+            {'seq': seq, 'start_ms': start_ms, 'end_ms': end_ms, 'speaker': speaker,
+             'text': decompress(body, codec)}
+            for seq, start_ms, end_ms, speaker, codec, body in rows
+        ]
+
+    def delete(self, user_id: str, call_id: str) -> int:
+        """Drop a call's transcript and its postings; returns the number of segments removed."""
+        with self.service.data_connection(user_id) as conn:
+            owner = self._owner(conn, user_id)
+            doc = self._doc(conn, owner, call_id)
+            if doc is None:
+                return 0
+            rows = conn.execute('SELECT codec, body FROM transcript_segments WHERE doc = ?', (doc,)).fetchall()
+            # Postings are keyed by term first, so re-tokenize to find them rather than
+            # paying for a second index on doc
+            conn.executemany(
+                'DELETE FROM transcript_postings WHERE owner = ? AND term = ? AND doc = ?',
+                [(owner, term, doc)
+                 for term in {term for codec, body in rows for _, term, _, _ in tokenize(decompress(body, codec))}]
+            )
+            conn.execute('DELETE FROM transcript_segments WHERE doc = ?', (doc,))
+            conn.execute('DELETE FROM transcript_docs WHERE doc = ?', (doc,))
+            conn.commit()
+        return len(rows)
+
+    def on_change(self, user_id: str, table: str, op: str, row: tuple):
+        """Change listener: a deleted call takes its transcript with it."""
+        if table == 'calls' and op == 'delete':
+            self.delete(user_id, row.id)
+
+    def _postings(self, conn, owner: int, term: str,
+                  docs: Optional[set] = None) -> Dict[Tuple[int, int], List[int]]:
+        """(doc, seq) -> positions of a term, in all of the owner's docs or only the given ones."""
+        if docs is not None and len(docs) <= POINT_LOOKUP_LIMIT:
+            rows = []
+            for doc in docs:
+                row = conn.execute(
+                    'SELECT postings FROM transcript_postings WHERE owner = ? AND term = ? AND doc = ?',
+                    (owner, term, doc)
+                ).fetchone()
+                if row is not None:
+                    rows.append((doc, row[0]))
+        else:
+            rows = conn.execute(
+                'SELECT doc, postings FROM transcript_postings WHERE owner = ? AND term = ?', (owner, term)
+            )
+        return {
+            (doc, seq): positions
+            for doc, blob in rows if docs is None or doc in docs
+            for seq, positions in decode_postings(blob).items()
+        }
+
+    def _match_clause(self, conn, owner: int, terms: List[str]) -> Dict[Tuple[int, int], List[int]]:
+        """(doc, seq) -> start positions of the phrase `terms` in that segment."""
+        # Start from the rarest term so the others are read for few candidate docs only
+        counts = {term: conn.execute(
+            'SELECT COUNT(*) FROM transcript_postings WHERE owner = ? AND term = ?', (owner, term)
+        ).fetchone()[0] for term in set(terms)}
+        if not all(counts.values()):
+            return {}
+
+        postings: Dict[str, Dict[Tuple[int, int], List[int]]] = {}
+        keys = None
+        for term in sorted(counts, key=counts.get):
+            postings[term] = self._postings(conn, owner, term, None if keys is None else {doc for doc, _ in keys})
+            keys = set(postings[term]) if keys is None else keys & set(postings[term])
+            if not keys:
+                return {}
+
+        matches = {}
+        for key in keys:
+            if len(terms) == 1:
+                matches[key] = postings[terms[0]][key]
+                continue
+            following = [set(postings[term][key]) for term in terms[1:]]
+            starts = [start for start in postings[terms[0]][key]
+                      if all(start + offset + 1 in positions for offset, positions in enumerate(following))]
+            if starts:
+                matches[key] = starts
+        return matches
+
+    def search(self, user_id: str, query: str, limit: int = 20) -> Dict[str, Any]:
+        """Calls containing every word and phrase of the query, with timestamped hits."""
+        clauses = parse_query(query)
+        if not clauses:
+            raise ServiceError('Empty search query')
+
+        started = time.perf_counter()
+        with self.service.data_connection(user_id) as conn:
+            owner = self._owner(conn, user_id)
+            # doc -> [(seq, token position, phrase length)]
+            docs: Dict[int, List[Tuple[int, int, int]]] = {}
+            for index, terms in enumerate(sorted(clauses, key=len, reverse=True)):
+                if owner is None:
+                    break
+                clause_docs: Dict[int, List[Tuple[int, int, int]]] = {}
+                for (doc, seq), starts in self._match_clause(conn, owner, terms).items():
+                    if index == 0 or doc in docs:
+                        clause_docs.setdefault(doc, []).extend((seq, start, len(terms)) for start in starts)
+                docs = clause_docs if index == 0 else {doc: docs[doc] + hits for doc, hits in clause_docs.items()}
+                if not docs:
+                    break
+
+            ranked = sorted(docs.items(), key=lambda item: len(item[1]), reverse=True)
+            results = [self._hits(conn, user_id, doc, hits) for doc, hits in ranked[:limit]]
+
+        return {
+            'query': query,
+            'total_calls': len(docs),
+            'results': results,
+            'took_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _hits(self, conn, user_id: str, doc: int, hits: List[Tuple[int, int, int]]) -> Dict[str, Any]:
+        """Resolve token positions to times, character offsets and snippets."""
+        call_id, title = conn.execute('''
+            SELECT d.call_id, c.title FROM transcript_docs d
+            LEFT JOIN calls c ON c.id = d.call_id AND c.user_id = ?
+            WHERE d.doc = ?
+        ''', (user_id, doc)).fetchone()
+        seqs = sorted({seq for seq, _, _ in hits})
+        segments = {row[0]: row[1:] for row in conn.execute(f'''
+            SELECT seq, start_ms, end_ms, speaker, tokens, codec, body FROM transcript_segments
+            WHERE doc = ? AND seq IN ({', '.join('?' for _ in seqs)})
+        ''', (doc, *seqs))}
+
+        resolved = []
+        texts: Dict[int, Tuple[str, List[Tuple[int, int]]]] = {}
+        for seq, position, length in sorted(hits):
+            start_ms, end_ms, speaker, tokens, codec, body = segments[seq]
+            if seq not in texts:
+                text = decompress(body, codec)
+                texts[seq] = (text, [(start, end) for _, _, start, end in tokenize(text)])
+            text, spans = texts[seq]
+            first, last = spans[position][0], spans[position + length - 1][1]
+            resolved.append({
+                'seq': seq,
+                'speaker': speaker,
+                'segment_start_ms': start_ms,
+                'segment_end_ms': end_ms,
+                # Words are assumed evenly spread over the segment
+                'offset_ms': start_ms + (end_ms - start_ms) * position // max(tokens, 1),
+                'char_offset': first,
+                'snippet': text[max(0, first - SNIPPET_CONTEXT):last + SNIPPET_CONTEXT],
+            })
+
+        return {'call_id': call_id, 'title': title, 'hits': resolved}
+
+
+def main():
+    """Benchmark storage size and search latency on a synthetic corpus (python -m app.local_transcripts)."""
+    import os
+    import random
+    import tempfile
+    from .local_service import LocalAuthService
+
+    calls_count, segments_per_call = 2000, 40
+    rng = random.Random(11)
+    # Common words plus a few thousand rarer ones, drawn with Zipf-like frequencies
+    common = (
+        "the a to and you I it is that for on can we this be have with my your at about what "
+        "appointment schedule invoice payment order delivery account tuesday friday morning "
+        "afternoon refund balance insurance manager callback confirm cancel reschedule address"
+    ).split()
+    syllables = ['ka', 'lo', 'mi', 'ren', 'to', 'sa', 'vel', 'dor', 'ni', 'pra', 'qui', 'ber']
+    rare = sorted({''.join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(5000)})
+    vocabulary = common + rare
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    service = LocalAuthService(os.path.join(tempfile.mkdtemp(), 'transcripts_bench.db'))
+    user_id = service.register_user('bench@example.com', 'benchmark', 'Bench').id
+    store = TranscriptStore(service)
+
+    raw_bytes = 0
+    raw_rows = []
+    started = time.perf_counter()
+    for index in range(calls_count):
+        call_id = service.create_call(user_id, {'title': f'Call {index}',
+                                                'scheduled_at': f'2026-{1 + index % 12:02d}-01T09:00:00'}).id
+        segments = []
+        for seq in range(segments_per_call):
+            words = rng.choices(vocabulary, weights, k=rng.randint(8, 30))
+            if rng.random() < 0.01:
+                words[2:2] = ['the', 'overdue', 'invoice']
+            text = ' '.join(words).capitalize() + '.'
+            raw_bytes += len(text.encode())
+            raw_rows.append((call_id, text))
+            segments.append({'start_ms': seq * 6000, 'end_ms': seq * 6000 + 5500,
+                             'speaker': 'caller' if seq % 2 else 'agent', 'text': text})
+        store.add_segments(user_id, call_id, segments)
+    ingest = time.perf_counter() - started
+
+    with service.data_connection(user_id) as conn:
+        stored = conn.execute('SELECT SUM(LENGTH(body)) FROM transcript_segments').fetchone()[0]
+        index_bytes = conn.execute('''
+            SELECT SUM(LENGTH(term) + LENGTH(postings) + 4) FROM transcript_postings
+        ''').fetchone()[0]
+        # Baseline: the same text in a plain TEXT column scanned with LIKE
+        conn.execute('CREATE TEMP TABLE raw_transcripts (call_id TEXT, body TEXT)')
+        conn.executemany('INSERT INTO raw_transcripts VALUES (?, ?)', raw_rows)
+        conn.commit()
+
+        like_times = {}
+        rare_word = rare[len(rare) // 2]
+        for query, pattern in (('invoice', '%invoice%'), ('"overdue invoice"', '%overdue invoice%'),
+                               (rare_word, f'%{rare_word}%')):
+            started = time.perf_counter()
+            for _ in range(5):
+                conn.execute('SELECT DISTINCT call_id FROM raw_transcripts WHERE body LIKE ?', (pattern,)).fetchall()
+            like_times[query] = (time.perf_counter() - started) / 5 * 1000
+
+    segments_total = calls_count * segments_per_call
+    print(f"{segments_total} segments ({raw_bytes / 1e6:.1f} MB of text) ingested in {ingest:.1f}s")
+    print(f"Stored text {stored / 1e6:.2f} MB ({stored / raw_bytes:.0%} of raw), "
+          f"index ~{index_bytes / 1e6:.2f} MB of keys and postings")
+    for query, like_ms in like_times.items():
+        store.search(user_id, query)
+        started = time.perf_counter()
+        for _ in range(5):
+            result = store.search(user_id, query)
+        indexed_ms = (time.perf_counter() - started) / 5 * 1000
+        print(f"{query!r}: {result['total_calls']} calls, {indexed_ms:.1f} ms indexed vs {like_ms:.1f} ms LIKE scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Streaming voice-turn pipeline for the AI receptionist.
+Audio chunks flow through speech-to-text, the agent and text-to-speech as separate
+asyncio tasks joined by bounded queues. Every stage passes partial results on as soon
+as it has them, so the agent starts on the final transcript while TTS is already
+speaking its first phrase, and the caller hears audio long before the full reply exists.
+
+Engines are pluggable; the Stub* engines are deterministic and need no models, so
+time-to-first-audio and per-stage latency can be benchmarked offline.
+"""
+
+import asyncio
+import time
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+
+# Bounded hand-off between stages, in frames
+STAGE_QUEUE_SIZE = 32
+
+# Marks the end of the caller's utterance in the audio input stream
+END_OF_UTTERANCE = None
+
+
+class Frame:
+    """A unit of data moving between stages."""
+
+    __slots__ = ('kind', 'data', 'final', 'turn', 'created')
+
+    def __init__(self, kind: str, data: Any, final: bool = False, turn: int = 0):
+        self.kind = kind          # 'transcript', 'text' or 'audio'
+        self.data = data
+        self.final = final        # last frame of this kind for the turn
+        self.turn = turn
+        self.created = time.perf_counter()
+
+
+class StubSpeechToText:
+    """Treats audio bytes as UTF-8 text and emits growing partial transcripts."""
+
+    def __init__(self, chunk_delay: float = 0.01, finalize_delay: float = 0.05):
+        self.chunk_delay = chunk_delay
+        self.finalize_delay = finalize_delay
+
+    async def transcribe(self, audio: AsyncIterator[Optional[bytes]]) -> AsyncIterator[Frame]:
+        turn = 0
+        heard = b''
+        async for chunk in audio:
+            if chunk is END_OF_UTTERANCE:
+                # Endpointing and final decoding pass
+                await asyncio.sleep(self.finalize_delay)
+                yield Frame('transcript', heard.decode(errors='ignore').strip(), final=True, turn=turn)
+                heard = b''
+                turn += 1
+                continue
+            await asyncio.sleep(self.chunk_delay)
+            heard += chunk
+            yield Frame('transcript', heard.decode(errors='ignore').strip(), turn=turn)
+
+
+class StubAgent:
+    """Replies deterministically to each final transcript, one word at a time.
+
+    With a prompt source (a callable returning a CompiledPrompt, see local_agent_profiles)
+    the turn's chat messages are assembled from the compiled prompt on every turn.
+    """
+
+    def __init__(self, instructions: str = '', first_token_delay: float = 0.12, token_delay: float = 0.02,
+                 prompt=None):
+        self.instructions = instructions
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.prompt = prompt
+        self.history: List[Tuple[str, str]] = []
+        self.last_messages: List[Dict[str, str]] = []
+
+    def reply_for(self, transcript: str) -> str:
+        greeting = self.instructions.split('.')[0].strip() or 'Thanks for calling'
+        if self.prompt is not None:
+            compiled = self.prompt()
+            self.last_messages = compiled.messages(self.history, transcript)
+            greeting = compiled.greeting
+        reply = (f"{greeting}. You said: {transcript}. "
+                 f"I have noted that and will pass it on. Is there anything else I can help with?")
+        self.history += [('user', transcript), ('assistant', reply)]
+        return reply
+
+    async def respond(self, transcripts: AsyncIterator[Frame]) -> AsyncIterator[Frame]:
+        async for frame in transcripts:
+            if not frame.final:
+                continue  # a real agent could prefetch context on partials here
+            # The prompt source may read SQLite, so keep it off the event loop
+            reply = await asyncio.to_thread(self.reply_for, frame.data)
+            words = reply.split(' ')
+            await asyncio.sleep(self.first_token_delay)
+            for index, word in enumerate(words):
+                if index:
+                    await asyncio.sleep(self.token_delay)
+                yield Frame('text', word, final=index == len(words) - 1, turn=frame.turn)
+
+
+class StubTextToSpeech:
+    """Synthesizes each phrase as soon as it is complete; audio bytes are the phrase text."""
+
+    PHRASE_ENDINGS = ('.', ',', '?', '!', ':', ';')
+
+    def __init__(self, phrase_delay: float = 0.04, chunk_bytes: int = 320, max_phrase_words: int = 8):
+        self.phrase_delay = phrase_delay
+        self.chunk_bytes = chunk_bytes
+        self.max_phrase_words = max_phrase_words
+
+    async def synthesize(self, text: AsyncIterator[Frame]) -> AsyncIterator[Frame]:
+        phrase: List[str] = []
+        async for frame in text:
+            phrase.append(frame.data)
+            boundary = frame.data.endswith(self.PHRASE_ENDINGS) or len(phrase) >= self.max_phrase_words
+            if not (boundary or frame.final):
+                continue
+            await asyncio.sleep(self.phrase_delay)
+            audio = (' '.join(phrase) + ' ').encode()
+            phrase = []
+            for offset in range(0, len(audio), self.chunk_bytes):
+                last = frame.final and offset + self.chunk_bytes >= len(audio)
+                yield Frame('audio', audio[offset:offset + self.chunk_bytes], final=last, turn=frame.turn)
+
+
+class VoicePipeline:
+    """Wires STT -> agent -> TTS together with bounded queues and records turn latencies."""
+
+    def __init__(self, stt=None, agent=None, tts=None, queue_size: int = STAGE_QUEUE_SIZE):
+        self.stt = stt or StubSpeechToText()
+        self.agent = agent or StubAgent()
+        self.tts = tts or StubTextToSpeech()
+        self.queue_size = queue_size
+        # turn -> {'speech_end', 'transcript', 'first_text', 'first_audio', 'last_audio'}
+        self.timings: Dict[int, Dict[str, float]] = {}
+
+    @classmethod
+    def for_call(cls, service, user_id: str, call_id: str, prompts=None, **engines) -> 'VoicePipeline':
+        """Build a pipeline whose agent follows the call's ai_instructions.
+
+        With an AgentPromptCache the agent uses the call's compiled prompt instead.
+        """
+        if prompts is not None and 'agent' not in engines:
+            prompts.prompt(user_id, call_id)  # fail early for unknown calls and warm the cache
+            engines['agent'] = StubAgent(prompt=lambda: prompts.prompt(user_id, call_id))
+        with service.data_connection(user_id) as conn:
+            row = conn.execute(
+                'SELECT ai_instructions FROM calls WHERE id = ? AND user_id = ?', (call_id, user_id)
+            ).fetchone()
+        if 'agent' not in engines:
+            engines['agent'] = StubAgent(instructions=(row[0] if row and row[0] else ''))
+        return cls(**engines)
+
+    def _mark(self, turn: int, name: str, when: Optional[float] = None):
+        self.timings.setdefault(turn, {}).setdefault(name, when or time.perf_counter())
+
+    async def _feed(self, source: AsyncIterator, queue: asyncio.Queue, on_item=None):
+        """Copy a stage's output into the bounded queue feeding the next stage."""
+        try:
+            async for item in source:
+                if on_item is not None:
+                    on_item(item)
+                await queue.put(item)
+        except asyncio.CancelledError:
+            # The pipeline is shutting down and the next stage may be gone, so never wait for room
+            try:
+                queue.put_nowait(StopAsyncIteration)
+            except asyncio.QueueFull:
+                pass
+            raise
+        except Exception:
+            await queue.put(StopAsyncIteration)
+            raise
+        await queue.put(StopAsyncIteration)
+
+    @staticmethod
+    async def _drain(queue: asyncio.Queue) -> AsyncIterator:
+        while True:
+            item = await queue.get()
+            if item is StopAsyncIteration:
+                return
+            yield item
+
+    async def run(self, audio_in: AsyncIterator[Optional[bytes]]) -> AsyncIterator[Frame]:
+        """Stream the agent's audio frames for the caller's audio; one reply per utterance."""
+        audio_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        transcript_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        text_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        out_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        turns = [0]
+
+        def on_audio(chunk):
+            if chunk is END_OF_UTTERANCE:
+                self._mark(turns[0], 'speech_end')
+                turns[0] += 1
+
+        def on_transcript(frame):
+            if frame.final:
+                self._mark(frame.turn, 'transcript')
+
+        def on_text(frame):
+            self._mark(frame.turn, 'first_text')
+
+        tasks = [
+            asyncio.create_task(self._feed(audio_in, audio_queue, on_audio)),
+            asyncio.create_task(self._feed(self.stt.transcribe(self._drain(audio_queue)),
+                                           transcript_queue, on_transcript)),
+            asyncio.create_task(self._feed(self.agent.respond(self._drain(transcript_queue)),
+                                           text_queue, on_text)),
+            asyncio.create_task(self._feed(self.tts.synthesize(self._drain(text_queue)), out_queue)),
+        ]
+        try:
+            async for frame in self._drain(out_queue):
+                self._mark(frame.turn, 'first_audio')
+                if frame.final:
+                    self.timings[frame.turn]['last_audio'] = time.perf_counter()
+                yield frame
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def turn_report(self, turn: int) -> Dict[str, float]:
+        """Latencies of a turn in milliseconds, measured from the end of the caller's speech."""
+        marks = self.timings.get(turn, {})
+        start = marks.get('speech_end')
+        if start is None:
+            return {}
+        report = {}
+        for name, key in (('stt_ms', 'transcript'), ('agent_first_token_ms', 'first_text'),
+                          ('time_to_first_audio_ms', 'first_audio'), ('turn_total_ms', 'last_audio')):
+            if key in marks:
+                report[name] = round((marks[key] - start) * 1000, 1)
+        return report
+
+
+async def _speak(utterances: List[str], replied: asyncio.Event, chunk_bytes: int = 16,
+                 chunk_interval: float = 0.02):
+    """Simulated caller: real-time audio chunks per utterance, waiting for each reply to finish."""
+    for utterance in utterances:
+        audio = utterance.encode()
+        for offset in range(0, len(audio), chunk_bytes):
+            await asyncio.sleep(chunk_interval)
+            yield audio[offset:offset + chunk_bytes]
+        replied.clear()
+        yield END_OF_UTTERANCE
+        await replied.wait()
+
+
+async def _benchmark(utterances: List[str], chunk_bytes: int = 16) -> Dict[str, Any]:
+    pipeline = VoicePipeline(agent=StubAgent(instructions='Hello, this is the front desk.'))
+    replied = asyncio.Event()
+    async for frame in pipeline.run(_speak(utterances, replied, chunk_bytes)):
+        if frame.final:
+            replied.set()
+    reports = [pipeline.turn_report(turn) for turn in range(len(utterances))]
+
+    # The same engines run one after another on whole inputs: STT decodes the full
+    # recording, the agent writes its full reply, then TTS synthesizes all of it
+    stt, agent, tts = pipeline.stt, pipeline.agent, pipeline.tts
+    sequential = []
+    for utterance in utterances:
+        chunks = -(-len(utterance.encode()) // chunk_bytes)
+        reply_words = agent.reply_for(utterance).split(' ')
+        phrases = max(1, sum(1 for word in reply_words if word.endswith(tts.PHRASE_ENDINGS)))
+        sequential.append(round(1000 * (
+            stt.chunk_delay * chunks + stt.finalize_delay
+            + agent.first_token_delay + agent.token_delay * (len(reply_words) - 1)
+            + tts.phrase_delay * phrases
+        ), 1))
+    return {'turns': reports, 'sequential_ttfa_ms': sequential}
+
+
+def main():
+    """Benchmark the pipeline with the stub engines (python -m app.local_voice)."""
+    utterances = [
+        "Hi, I'd like to book an appointment for Tuesday afternoon",
+        "It's about the invoice you sent last week",
+        "Can you ask them to call me back after five",
+    ]
+    result = asyncio.run(_benchmark(utterances))
+    for index, report in enumerate(result['turns']):
+        print(f"Turn {index}: {report} (no-overlap time to first audio: {result['sequential_ttfa_ms'][index]} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The backend is run from its own directory (run.py, python -m app.*); make `app` importable the same way
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
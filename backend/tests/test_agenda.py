@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from app.local_agenda import AgendaCache
+from app.local_service import LocalAuthService
+
+
+def make_agenda(tmp_path):
+    service = LocalAuthService(str(tmp_path / 'app.db'))
+    agenda = AgendaCache(service)
+    service.add_change_listener(agenda.on_change)
+    user_id = service.register_user('agenda@example.com', 'password1', 'Agenda').id
+    return service, agenda, user_id
+
+
+def test_warm_agenda_matches_cold_for_overlapping_event(tmp_path):
+    service, agenda, user_id = make_agenda(tmp_path)
+    # Started the night before the viewed day and still running into it
+    overnight = service.create_calendar_event(user_id, {
+        'title': 'Overnight shift', 'start_time': '2026-03-01T22:00:00', 'end_time': '2026-03-02T02:00:00',
+    })
+    service.create_call(user_id, {'title': 'Follow-up', 'scheduled_at': '2026-03-02T09:00:00'})
+    now = datetime(2026, 3, 2, 10, 0)
+
+    cold = list(agenda.agenda(user_id, now=now))
+    warm = list(agenda.agenda(user_id, now=now))
+
+    assert warm == cold
+    assert [item['id'] for item in cold][0] == overnight.id
+
+
+def test_warm_agenda_includes_event_running_into_a_later_day(tmp_path):
+    service, agenda, user_id = make_agenda(tmp_path)
+    overnight = service.create_calendar_event(user_id, {
+        'title': 'Overnight shift', 'start_time': '2026-03-03T22:00:00', 'end_time': '2026-03-04T02:00:00',
+    })
+    # The first read materializes the whole horizon, so the next day is served warm
+    list(agenda.agenda(user_id, now=datetime(2026, 3, 2, 10, 0)))
+    warm = list(agenda.agenda(user_id, now=datetime(2026, 3, 4, 10, 0)))
+
+    agenda.invalidate(user_id)
+    cold = list(agenda.agenda(user_id, now=datetime(2026, 3, 4, 10, 0)))
+
+    assert warm == cold
+    assert [item['id'] for item in warm] == [overnight.id]
+
+
+def test_cold_agenda_includes_call_running_into_the_day(tmp_path):
+    service, agenda, user_id = make_agenda(tmp_path)
+    late = service.create_call(user_id, {'title': 'Late call', 'scheduled_at': '2026-03-01T23:30:00',
+                                         'duration_minutes': 45})
+    service.create_call(user_id, {'title': 'Ended earlier', 'scheduled_at': '2026-03-01T22:00:00',
+                                  'duration_minutes': 30})
+    now = datetime(2026, 3, 2, 10, 0)
+
+    cold = list(agenda.agenda(user_id, now=now))
+    warm = list(agenda.agenda(user_id, now=now))
+
+    assert warm == cold
+    assert [item['id'] for item in cold] == [late.id]
+    assert cold[0]['end_time'] == '2026-03-02T00:15:00'
+
+
+def test_rebuild_racing_a_write_is_not_stored(tmp_path):
+    service, agenda, user_id = make_agenda(tmp_path)
+    service.create_call(user_id, {'title': 'First', 'scheduled_at': '2026-03-02T09:00:00'})
+    now = datetime(2026, 3, 2, 10, 0)
+
+    reading = agenda.agenda(user_id, now=now)
+    next(reading)
+    added = service.create_call(user_id, {'title': 'Second', 'scheduled_at': '2026-03-02T11:00:00'})
+    list(reading)
+
+    # The stale rebuild was dropped, so the next read sees the new call
+    assert added.id in [item['id'] for item in agenda.agenda(user_id, now=now)]
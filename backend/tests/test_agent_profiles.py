@@ -0,0 +1,59 @@
+import pytest
+
+from app.local_agent_profiles import AgentProfileStore, AgentPromptCache
+from app.local_records import NotFoundError
+from app.local_service import LocalAuthService
+
+
+@pytest.fixture
+def prompts(tmp_path):
+    service = LocalAuthService(str(tmp_path / 'app.db'))
+    profiles = AgentProfileStore(service)
+    cache = AgentPromptCache(service, profiles)
+    service.add_change_listener(cache.on_change)
+    user_id = service.register_user('prompts@example.com', 'password1', 'Prompts').id
+    call = service.create_call(user_id, {'title': 'Intake', 'scheduled_at': '2026-03-02T09:00:00'})
+    return service, profiles, cache, user_id, call.id
+
+
+def test_repeat_turns_hit_the_cache(prompts):
+    service, profiles, cache, user_id, call_id = prompts
+    first = cache.prompt(user_id, call_id)
+    assert cache.prompt(user_id, call_id) is first
+    assert (cache.stats()['hits'], cache.stats()['misses'], cache.stats()['compiles']) == (1, 1, 1)
+
+
+def test_profile_update_recompiles_the_prompt(prompts):
+    service, profiles, cache, user_id, call_id = prompts
+    before = cache.prompt(user_id, call_id)
+    assert 'You are Receptionist' in before.system_prompt
+
+    profiles.update(user_id, {'assistant_name': 'Ava', 'business_name': 'Harbor Dental'})
+    after = cache.prompt(user_id, call_id)
+    assert after.key != before.key
+    assert 'You are Ava, the phone receptionist for Harbor Dental.' in after.system_prompt
+    assert cache.stats()['compiles'] == 2
+
+
+def test_profile_delete_returns_to_the_default_prompt(prompts):
+    service, profiles, cache, user_id, call_id = prompts
+    default = cache.prompt(user_id, call_id)
+    profiles.update(user_id, {'tone': 'formal'})
+    assert 'formal' in cache.prompt(user_id, call_id).system_prompt
+
+    profiles.delete(user_id)
+    assert cache.prompt(user_id, call_id) is default
+    with pytest.raises(NotFoundError):
+        profiles.delete(user_id)
+
+
+def test_call_and_contact_writes_rebind(prompts):
+    service, profiles, cache, user_id, call_id = prompts
+    contact = service.create_contact(user_id, {'name': 'Dana', 'phone_number': '5550100'})
+    service.update_call(user_id, call_id, {'contact_id': contact.id, 'ai_instructions': 'Confirm the address.'})
+    bound = cache.prompt(user_id, call_id)
+    assert 'Name: Dana' in bound.system_prompt
+    assert 'Confirm the address.' in bound.system_prompt
+
+    service.update_contact(user_id, contact.id, {'company': 'Acme'})
+    assert 'Company: Acme' in cache.prompt(user_id, call_id).system_prompt
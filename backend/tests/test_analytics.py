@@ -0,0 +1,131 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from app.local_analytics import CallAnalytics
+from app.local_archive import Archiver
+from app.local_backup import BackupManager
+from app.local_service import LocalAuthService
+
+
+@pytest.fixture
+def analytics(tmp_path):
+    service = LocalAuthService(str(tmp_path / 'app.db'))
+    user_id = service.register_user('analytics@example.com', 'password1', 'Analytics').id
+    return service, CallAnalytics(service), user_id
+
+
+def rollups(db_path):
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return conn.execute('SELECT * FROM call_rollups ORDER BY user_id, day, hour, status, priority, call_type').fetchall()
+    finally:
+        conn.close()
+
+
+def assert_rollups_match_rebuild(service, analytics):
+    """The trigger-maintained buckets equal a from-scratch rebuild."""
+    maintained = rollups(service.db_path)
+    analytics.rebuild()
+    assert maintained == rollups(service.db_path)
+
+
+def schedule(service, user_id, when='2026-03-02T09:15:00', **extra):
+    return service.create_call(user_id, {'title': 'Check-in', 'scheduled_at': when, 'duration_minutes': 20, **extra})
+
+
+def test_insert_update_delete_keep_buckets_exact(analytics):
+    service, stats, user_id = analytics
+    first = schedule(service, user_id)
+    second = schedule(service, user_id)
+    schedule(service, user_id, when='2026-03-03T14:00:00')
+    assert stats.call_stats(user_id).total_calls == 3
+
+    service.update_call(user_id, first.id, {'status': 'completed', 'duration_minutes': 45})
+    service.delete_call(user_id, second.id)
+    result = stats.call_stats(user_id)
+
+    assert result.total_calls == 2
+    assert result.total_duration_minutes == 65
+    assert result.by_status == {'completed': 1, 'scheduled': 1}
+    assert_rollups_match_rebuild(service, stats)
+
+
+def test_emptied_bucket_is_removed_without_touching_others(analytics, tmp_path):
+    service, stats, user_id = analytics
+    other = service.register_user('other@example.com', 'password1', 'Other').id
+    call = schedule(service, user_id)
+    schedule(service, other)
+
+    service.delete_call(user_id, call.id)
+
+    assert [row[0] for row in rollups(service.db_path)] == [other]
+    conn = sqlite3.connect(service.db_path)
+    trigger = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'rollup_calls_delete_v2'").fetchone()[0]
+    assert 'DELETE FROM call_rollups\n        WHERE (user_id, day, hour, status, priority, call_type) = (OLD.user_id' in trigger
+    plan = ' '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN DELETE FROM call_rollups '
+                                                    "WHERE (user_id, day, hour, status, priority, call_type) = "
+                                                    "('u', 'd', 1, 's', 'p', 't') AND call_count <= 0"))
+    conn.close()
+    assert 'SCAN' not in plan
+
+
+def test_archive_over_a_stale_archive_copy_counts_once(analytics):
+    service, stats, user_id = analytics
+    call = schedule(service, user_id, when='2025-01-06T09:00:00', status='completed')
+    # A copy left in the archive from an earlier run, with an older status
+    conn = sqlite3.connect(service.db_path)
+    conn.execute('''
+        INSERT INTO calls_archive (id, user_id, title, scheduled_at, duration_minutes, status, call_type,
+                                   priority, created_at, updated_at, archived_at)
+        SELECT id, user_id, title, scheduled_at, duration_minutes, 'scheduled', call_type, priority,
+               created_at, updated_at, '2025-06-01T00:00:00' FROM calls WHERE id = ?
+    ''', (call.id,))
+    conn.commit()
+    conn.close()
+
+    Archiver(service, horizon_days=30).archive_user(user_id, now=datetime(2026, 3, 1))
+
+    assert stats.call_stats(user_id).by_status == {'completed': 1}
+    assert_rollups_match_rebuild(service, stats)
+
+
+def test_restore_from_archive_keeps_counts(analytics):
+    service, stats, user_id = analytics
+    call = schedule(service, user_id, when='2025-01-06T09:00:00', status='completed')
+    archiver = Archiver(service, horizon_days=30)
+    archiver.archive_user(user_id, now=datetime(2026, 3, 1))
+
+    assert archiver.restore('calls', user_id, call.id)
+    assert stats.call_stats(user_id).total_calls == 1
+    assert_rollups_match_rebuild(service, stats)
+
+
+def test_replaying_an_incremental_backup_updates_in_place(analytics, tmp_path):
+    service, stats, user_id = analytics
+    call = schedule(service, user_id)
+    manager = BackupManager(service, backup_dir=str(tmp_path / 'backups'))
+    manager.full_backup()
+    service.update_call(user_id, call.id, {'status': 'completed'})
+    report = manager.incremental_backup()
+
+    restored = manager.restore(report['snapshot'], str(tmp_path / 'restored'))
+    restored_service = LocalAuthService(str(restored['app']))
+
+    assert CallAnalytics(restored_service).call_stats(user_id).by_status == {'completed': 1}
+    assert rollups(restored['app']) == rollups(service.db_path)
+
+
+def test_rebuild_recovers_from_lost_buckets(analytics):
+    service, stats, user_id = analytics
+    for hour in range(9, 12):
+        schedule(service, user_id, when=f'2026-03-02T{hour:02d}:00:00')
+    expected = rollups(service.db_path)
+    conn = sqlite3.connect(service.db_path)
+    conn.execute('DELETE FROM call_rollups')
+    conn.commit()
+    conn.close()
+
+    assert stats.rebuild(user_id) == 3
+    assert rollups(service.db_path) == expected
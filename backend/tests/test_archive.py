@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import pytest
+
+from app.local_archive import Archiver
+from app.local_records import NotFoundError, ServiceError
+from app.local_service import LocalAuthService
+
+NOW = datetime(2026, 6, 1)
+
+
+@pytest.fixture
+def service(tmp_path):
+    return LocalAuthService(str(tmp_path / 'app.db'))
+
+
+def seed(service, user_id, old_calls=7):
+    for day in range(1, old_calls + 1):
+        service.create_call(user_id, {'title': f'Old {day}', 'scheduled_at': f'2026-01-{day:02d}T10:00:00',
+                                      'status': 'completed'})
+    service.create_call(user_id, {'title': 'Recent', 'scheduled_at': '2026-05-30T10:00:00', 'status': 'completed'})
+    service.create_call(user_id, {'title': 'Missed', 'scheduled_at': '2026-01-15T10:00:00', 'status': 'missed'})
+    service.create_calendar_event(user_id, {'title': 'Past', 'start_time': '2026-01-10T09:00:00',
+                                            'end_time': '2026-01-10T10:00:00'})
+    service.create_calendar_event(user_id, {'title': 'Weekly', 'start_time': '2026-01-10T09:00:00',
+                                            'end_time': '2026-01-10T10:00:00', 'recurrence_rule': 'FREQ=WEEKLY'})
+
+
+def test_batches_move_every_old_row(service):
+    user_id = service.register_user('archive@example.com', 'password1', 'Archive').id
+    other_id = service.register_user('other@example.com', 'password1', 'Other').id
+    seed(service, user_id)
+    seed(service, other_id, old_calls=2)
+
+    # 7 old calls in batches of 3: two full batches and a short one end the loop
+    archiver = Archiver(service, horizon_days=30, batch_size=3)
+    assert archiver.archive_user(user_id, now=NOW) == {'calls': 7, 'calendar_events': 1}
+    assert archiver.archive_user(user_id, now=NOW) == {'calls': 0, 'calendar_events': 0}
+
+    assert [call.title for call in service.list_calls(user_id)] == ['Missed', 'Recent']
+    assert [event.title for event in service.list_calendar_events(user_id)] == ['Weekly']
+    # The other user's rows are untouched until they are archived themselves
+    assert len(service.list_calls(other_id)) == 4
+
+    assert archiver.archive_all(now=NOW) == {'users': 2, 'archived': {'calls': 2, 'calendar_events': 1}}
+
+
+def test_include_archived_reads_merge_both_tables(service):
+    user_id = service.register_user('archive@example.com', 'password1', 'Archive').id
+    seed(service, user_id, old_calls=3)
+    Archiver(service, horizon_days=30, batch_size=2).archive_user(user_id, now=NOW)
+
+    calls = service.list_calls(user_id, include_archived=True)
+    assert [call.scheduled_at for call in calls] == sorted(call.scheduled_at for call in calls)
+    assert [call.title for call in calls] == ['Old 1', 'Old 2', 'Old 3', 'Missed', 'Recent']
+    assert [call.title for call in service.list_calls(user_id, status='completed', end='2026-02-01T00:00:00',
+                                                      include_archived=True)] == ['Old 1', 'Old 2', 'Old 3']
+    assert {event.title for event in service.list_calendar_events(user_id, include_archived=True)} == {'Past', 'Weekly'}
+
+
+def test_moves_are_reported_to_change_listeners(service):
+    user_id = service.register_user('archive@example.com', 'password1', 'Archive').id
+    seed(service, user_id, old_calls=2)
+    changes = []
+    service.add_change_listener(lambda user, table, op, row: changes.append((user, table, op, row.title)))
+
+    archiver = Archiver(service, horizon_days=30, batch_size=1)
+    archiver.archive_user(user_id, now=NOW)
+    assert sorted(changes) == [
+        (user_id, 'calendar_events', 'archive', 'Past'),
+        (user_id, 'calls', 'archive', 'Old 1'),
+        (user_id, 'calls', 'archive', 'Old 2'),
+    ]
+
+    changes.clear()
+    archived = service.list_calls(user_id, include_archived=True)[0]
+    restored = archiver.restore('calls', user_id, archived.id)
+    assert restored == archived
+    assert changes == [(user_id, 'calls', 'restore', 'Old 1')]
+    assert 'Old 1' in [call.title for call in service.list_calls(user_id)]
+
+
+def test_restore_rejects_unknown_rows(service):
+    user_id = service.register_user('archive@example.com', 'password1', 'Archive').id
+    other_id = service.register_user('other@example.com', 'password1', 'Other').id
+    seed(service, user_id, old_calls=1)
+    archiver = Archiver(service, horizon_days=30)
+    archiver.archive_user(user_id, now=NOW)
+    archived = service.list_calls(user_id, include_archived=True)[0]
+
+    with pytest.raises(NotFoundError):
+        archiver.restore('calls', other_id, archived.id)
+    with pytest.raises(ServiceError):
+        archiver.restore('contacts', user_id, archived.id)
+    archiver.restore('calls', user_id, archived.id)
+    with pytest.raises(NotFoundError):
+        archiver.restore('calls', user_id, archived.id)
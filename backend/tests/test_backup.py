@@ -0,0 +1,50 @@
+from app.local_backup import BackupManager
+from app.local_service import LocalAuthService
+from app.local_transcripts import TranscriptStore
+
+SEGMENTS = [
+    {'start_ms': 0, 'end_ms': 1800, 'speaker': 'caller', 'text': 'Hi, I need to move my dental cleaning'},
+    {'start_ms': 1800, 'end_ms': 4200, 'speaker': 'agent', 'text': 'Sure, Thursday at three works'},
+]
+
+
+def make_service(tmp_path, name='app.db'):
+    service = LocalAuthService(str(tmp_path / name))
+    transcripts = TranscriptStore(service)
+    service.add_change_listener(transcripts.on_change)
+    return service, transcripts
+
+
+def test_incremental_backup_restores_transcript(tmp_path):
+    service, transcripts = make_service(tmp_path)
+    user_id = service.register_user('backup@example.com', 'password1', 'Backup').id
+    call = service.create_call(user_id, {'title': 'Reschedule', 'scheduled_at': '2026-03-02T09:00:00'})
+    manager = BackupManager(service, backup_dir=str(tmp_path / 'backups'))
+    manager.full_backup()
+
+    # Written after the full snapshot, so only the incremental carries it
+    transcripts.add_segments(user_id, call.id, SEGMENTS)
+    report = manager.incremental_backup()
+
+    restored = manager.restore(report['snapshot'], str(tmp_path / 'restored'))
+    restored_service, restored_transcripts = make_service(tmp_path / 'restored')
+    assert restored['app'] == tmp_path / 'restored' / 'app.db'
+    assert restored_transcripts.transcript(user_id, call.id) == transcripts.transcript(user_id, call.id)
+    assert [hit['call_id'] for hit in restored_transcripts.search(user_id, 'dental')['results']] == [call.id]
+
+
+def test_incremental_backup_restores_transcript_delete(tmp_path):
+    service, transcripts = make_service(tmp_path)
+    user_id = service.register_user('backup@example.com', 'password1', 'Backup').id
+    call = service.create_call(user_id, {'title': 'Reschedule', 'scheduled_at': '2026-03-02T09:00:00'})
+    transcripts.add_segments(user_id, call.id, SEGMENTS)
+    manager = BackupManager(service, backup_dir=str(tmp_path / 'backups'))
+    manager.full_backup()
+
+    service.delete_call(user_id, call.id)
+    report = manager.incremental_backup()
+
+    manager.restore(report['snapshot'], str(tmp_path / 'restored'))
+    _, restored_transcripts = make_service(tmp_path / 'restored')
+    assert restored_transcripts.transcript(user_id, call.id) == []
+    assert restored_transcripts.search(user_id, 'dental')['results'] == []
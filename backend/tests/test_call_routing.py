@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pytest
+
+from app.local_call_routing import CallRouter, RoutingRuleStore, DEFAULT_ACTION
+from app.local_records import ServiceError
+from app.local_service import LocalAuthService
+
+
+@pytest.fixture
+def routing(tmp_path):
+    service = LocalAuthService(str(tmp_path / 'app.db'))
+    store = RoutingRuleStore(service)
+    router = CallRouter(service, store)
+    service.add_change_listener(router.on_change)
+    user_id = service.register_user('routing@example.com', 'password1', 'Routing').id
+    return store, router, user_id
+
+
+def test_evening_window_in_local_time_crosses_midnight_utc(routing):
+    store, router, user_id = routing
+    store.set_timezone(user_id, 'America/New_York')
+    # Monday 20:00-22:00 in New York is Tuesday 01:00-03:00 UTC in November (UTC-5)
+    rule = store.create(user_id, {'name': 'Evenings', 'action': 'book',
+                                  'conditions': {'days': [0], 'start': '20:00', 'end': '22:00'}})
+
+    assert router.decide(user_id, '+15550100', datetime(2026, 11, 3, 2, 0)).rule_id == rule.id
+    assert router.decide(user_id, '+15550100', datetime(2026, 11, 3, 3, 0)).action == DEFAULT_ACTION
+    # Monday 21:00 UTC is mid-afternoon in New York
+    assert router.decide(user_id, '+15550100', datetime(2026, 11, 2, 21, 0)).action == DEFAULT_ACTION
+
+
+def test_overnight_window_follows_timezone_change(routing):
+    store, router, user_id = routing
+    # 22:00 to 06:00 local, starting Fridays
+    rule = store.create(user_id, {'name': 'Weekend nights', 'action': 'message', 'target': None,
+                                  'conditions': {'days': [4], 'start': '22:00', 'end': '06:00'}})
+    ring = datetime(2026, 11, 7, 0, 30)  # Saturday 00:30 UTC, Friday 16:30 in Los Angeles
+
+    assert router.decide(user_id, None, ring).rule_id == rule.id
+    store.set_timezone(user_id, 'America/Los_Angeles')
+    assert router.decide(user_id, None, ring).rule_id is None
+    assert router.decide(user_id, None, datetime(2026, 11, 7, 13, 30)).rule_id == rule.id
+
+
+def test_unknown_timezone_is_rejected(routing):
+    store, _, user_id = routing
+    with pytest.raises(ServiceError):
+        store.set_timezone(user_id, 'Mars/Olympus_Mons')
+    assert store.settings(user_id).timezone == 'UTC'
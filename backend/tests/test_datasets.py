@@ -0,0 +1,50 @@
+from app.local_datasets import DatasetSpec, generate_dataset
+from app.local_service import LocalAuthService
+
+SPEC = DatasetSpec(users=4, contacts=20, calls=40, events=15, seed=7)
+
+
+def dump(service):
+    """Every generated row, in a stable order."""
+    rows = {}
+    for table in ('contacts', 'calls', 'calendar_events'):
+        rows[table] = sorted(service.query_all_data(f'SELECT * FROM {table}'))
+    return rows
+
+
+def generate(path, spec=SPEC, **options):
+    path.mkdir()
+    service = LocalAuthService(str(path / 'app.db'), **options)
+    return service, generate_dataset(service, spec)
+
+
+def test_same_seed_same_rows(tmp_path):
+    first_service, first = generate(tmp_path / 'first')
+    second_service, second = generate(tmp_path / 'second')
+
+    assert first.user_ids == second.user_ids
+    assert first.session_tokens == second.session_tokens
+    assert first.caller_phones == second.caller_phones
+    assert first.counts == second.counts
+    assert first.counts['calls'] > 0
+    assert dump(first_service) == dump(second_service)
+
+
+def test_sharded_service_gets_the_same_rows(tmp_path):
+    plain_service, plain = generate(tmp_path / 'plain')
+    sharded_service, sharded = generate(tmp_path / 'sharded', shard_mode='hash', shard_buckets=2)
+    assert sharded.counts == plain.counts
+    assert dump(sharded_service) == dump(plain_service)
+    sharded_service.shards.close_all()
+
+
+def test_other_seed_other_rows_and_usable_sessions(tmp_path):
+    service, dataset = generate(tmp_path / 'first')
+    _, other = generate(tmp_path / 'other', SPEC._replace(seed=8))
+    assert other.user_ids != dataset.user_ids
+
+    assert service.get_user_by_session(dataset.session_tokens[0]).id == dataset.user_ids[0]
+    user_id, phone = dataset.caller_phones[0]
+    with service.data_connection(user_id) as conn:
+        assert conn.execute('SELECT 1 FROM contacts WHERE user_id = ? AND phone_number = ?',
+                            (user_id, phone)).fetchone()
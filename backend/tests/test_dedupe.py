@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytest
+
+from app.local_archive import Archiver
+from app.local_dedupe import ContactDeduplicator, block_keys, normalize_phone, soundex
+from app.local_records import NotFoundError, ServiceError
+from app.local_service import LocalAuthService
+
+
+def test_soundex_and_phone_normalization():
+    assert [soundex(word) for word in ('robert', 'rupert', 'ashcraft', 'tymczak', 'a')] == \
+        ['R163', 'R163', 'A261', 'T522', 'A000']
+    assert normalize_phone('+1 (555) 010-2030') == '5550102030'
+    assert normalize_phone('555-0102') == '5550102'
+    assert normalize_phone('12345') == ''
+
+
+def test_block_keys_match_look_alikes():
+    assert block_keys('John Smith', '+1 555 010 2030', ' John@Example.com ') == \
+        ['p:5550102030', 'e:john@example.com', 'n:J500-S530']
+    # Name order and spelling variants land in the same name block
+    assert block_keys('Smith, Jon', None, None) == block_keys('Jon Smyth', None, None) == ['n:J500-S530']
+    assert block_keys(None, '123', 'not-an-email') == []
+
+
+@pytest.fixture
+def contacts(tmp_path):
+    service = LocalAuthService(str(tmp_path / 'app.db'))
+    dedupe = ContactDeduplicator(service)
+    service.add_change_listener(dedupe.on_change)
+    user_id = service.register_user('dedupe@example.com', 'password1', 'Dedupe').id
+    return service, dedupe, user_id
+
+
+def test_new_contacts_are_checked_against_their_blocks(contacts):
+    service, dedupe, user_id = contacts
+    first = service.create_contact(user_id, {'name': 'John Smith', 'phone_number': '555-010-2030'})
+    service.create_contact(user_id, {'name': 'Ada Lovelace', 'phone_number': '555-999-0000'})
+    second = service.create_contact(user_id, {'name': 'Smith, John', 'phone_number': '+1 555 010 2030',
+                                              'email': 'john@example.com'})
+
+    suggestions = dedupe.suggestions(user_id)
+    assert len(suggestions) == 1
+    assert {contact['id'] for contact in suggestions[0]['contacts']} == {first.id, second.id}
+    assert suggestions[0]['reasons'] == ['phone', 'name']
+    assert dedupe.rebuild(user_id)['suggestions'] == 1
+
+
+def test_merge_repoints_live_and_archived_calls(contacts):
+    service, dedupe, user_id = contacts
+    keep = service.create_contact(user_id, {'name': 'John Smith', 'phone_number': '5550102030', 'tags': 'vip'})
+    other = service.create_contact(user_id, {'name': 'J. Smith', 'phone_number': '5550102030',
+                                             'email': 'john@example.com', 'tags': 'vip, lead'})
+    old = service.create_call(user_id, {'title': 'Old', 'scheduled_at': '2025-01-02T09:00:00',
+                                        'status': 'completed', 'contact_id': other.id})
+    new = service.create_call(user_id, {'title': 'New', 'scheduled_at': '2026-03-02T09:00:00',
+                                        'contact_id': other.id})
+    Archiver(service, horizon_days=30).archive_user(user_id, now=datetime(2026, 1, 1))
+
+    result = dedupe.merge(user_id, keep.id, [other.id, keep.id])
+    assert result['merged'] == [other.id]
+    assert result['calls_repointed'] == 2
+    assert result['contact'].email == 'john@example.com'
+    assert result['contact'].tags == 'vip,lead'
+
+    calls = {call.id: call for call in service.list_calls(user_id, include_archived=True)}
+    assert calls[old.id].contact_id == keep.id
+    assert calls[new.id].contact_id == keep.id
+    with service.data_connection(user_id) as conn:
+        assert conn.execute('SELECT id FROM contacts WHERE user_id = ?', (user_id,)).fetchall() == [(keep.id,)]
+    assert dedupe.suggestions(user_id) == []
+
+    with pytest.raises(NotFoundError):
+        dedupe.merge(user_id, keep.id, [other.id])
+    with pytest.raises(ServiceError):
+        dedupe.merge(user_id, keep.id, [keep.id])
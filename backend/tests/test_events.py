@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+from app.local_events import ChangeBroker
+from app.local_records import Call
+
+
+async def settle():
+    """Let callbacks scheduled with call_soon_threadsafe run."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_overflowing_subscriber_is_dropped_with_a_resync_signal():
+    async def scenario():
+        broker = ChangeBroker(queue_size=3)
+        slow = broker.subscribe('user-1')
+        fast = broker.subscribe('user-1')
+        received = []
+
+        for i in range(3):
+            broker.publish('user-1', {'seq': i})
+        await settle()
+        received.append(await fast.get(timeout=1))
+        broker.publish('user-1', {'seq': 3})
+        await settle()
+
+        # slow never read and overflowed on the fourth event; its backlog was discarded
+        assert slow.dropped
+        assert await slow.get(timeout=1) is None
+        assert await slow.get(timeout=1) is None
+        while not fast.queue.empty():
+            received.append(await fast.get(timeout=1))
+        assert [event['seq'] for event in received] == [0, 1, 2, 3]
+
+        assert broker.dropped_subscribers == 1
+        assert broker.connection_count() == 1
+        broker.publish('user-1', {'seq': 4})
+        await settle()
+        assert slow.queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_publish_from_another_thread_reaches_only_that_user():
+    async def scenario():
+        broker = ChangeBroker()
+        mine = broker.subscribe('user-1')
+        theirs = broker.subscribe('user-2')
+        row = Call(*(['x'] * len(Call._fields)))
+
+        writer = threading.Thread(target=broker.on_change, args=('user-1', 'calls', 'insert', row))
+        writer.start()
+        writer.join()
+        event = await mine.get(timeout=1)
+        assert event['type'] == 'calls.insert'
+        assert event['row'] == row._asdict()
+        assert theirs.queue.empty()
+
+        broker.on_change('user-1', 'contacts', 'insert', row)
+        await settle()
+        assert mine.queue.empty()
+
+        broker.unsubscribe(mine)
+        broker.unsubscribe(theirs)
+        assert broker.connection_count() == 0
+
+    asyncio.run(scenario())
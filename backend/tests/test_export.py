@@ -0,0 +1,63 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app.local_export import stream_export
+from app.local_service import LocalAuthService
+
+
+@pytest.fixture
+def exported(tmp_path):
+    service = LocalAuthService(str(tmp_path / 'app.db'))
+    user_id = service.register_user('export@example.com', 'password1', 'Export').id
+    other_id = service.register_user('other@example.com', 'password1', 'Other').id
+    for i in range(5):
+        service.create_contact(user_id, {'name': f'Contact, "{i}"', 'phone_number': f'555000{i}',
+                                         'notes': 'line one\nline two' if i == 2 else None})
+    service.create_contact(other_id, {'name': 'Not mine', 'phone_number': '5559999'})
+    service.create_call(user_id, {'title': 'Intake', 'scheduled_at': '2026-03-02T09:00:00'})
+    return service, user_id
+
+
+def test_ndjson_tags_rows_with_their_table(exported):
+    service, user_id = exported
+    chunks = list(stream_export(service, user_id, batch_size=2))
+    assert len(chunks) > 3  # streamed in batches, not built in one piece
+
+    records = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+    assert [record['table'] for record in records] == ['contacts'] * 5 + ['calls']
+    assert [record['name'] for record in records[:5]] == [f'Contact, "{i}"' for i in range(5)]
+    assert records[2]['notes'] == 'line one\nline two'
+    assert records[5]['title'] == 'Intake'
+    assert all('user_id' not in record for record in records)
+
+
+def test_csv_round_trips_quoting_and_keeps_the_header(exported):
+    service, user_id = exported
+    data = b''.join(stream_export(service, user_id, 'csv', table='contacts', batch_size=2)).decode()
+    rows = list(csv.DictReader(io.StringIO(data)))
+    assert [row['name'] for row in rows] == [f'Contact, "{i}"' for i in range(5)]
+    assert rows[2]['notes'] == 'line one\nline two'
+    assert 'user_id' not in rows[0]
+
+    empty = b''.join(stream_export(service, user_id, 'csv', table='calls_archive')).decode()
+    assert empty.splitlines()[0].startswith('id,')
+    assert len(empty.splitlines()) == 1
+
+
+def test_gzip_wraps_the_same_bytes(exported):
+    service, user_id = exported
+    plain = b''.join(stream_export(service, user_id, table='contacts'))
+    compressed = b''.join(stream_export(service, user_id, table='contacts', compress=True))
+    assert compressed[:2] == b'\x1f\x8b'
+    assert gzip.decompress(compressed) == plain
+
+
+@pytest.mark.parametrize('fmt, table', [('xml', None), ('ndjson', 'users'), ('csv', None)])
+def test_rejects_bad_requests(exported, fmt, table):
+    service, user_id = exported
+    with pytest.raises(ValueError):
+        stream_export(service, user_id, fmt, table=table)
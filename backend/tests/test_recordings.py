@@ -0,0 +1,94 @@
+import hashlib
+
+import pytest
+
+from app import local_recordings
+from app.local_recordings import RecordingStore, RecordingError
+from app.local_service import LocalAuthService
+
+CONTENT = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def store(tmp_path):
+    service = LocalAuthService(str(tmp_path / 'app.db'))
+    user_id = service.register_user('recordings@example.com', 'password1', 'Recordings').id
+    call = service.create_call(user_id, {'title': 'Intake', 'scheduled_at': '2026-03-02T09:00:00'})
+    return RecordingStore(service, tmp_path / 'recordings'), user_id, call.id
+
+
+def send_chunk(store, user_id, recording_id, index, offset, data, sha256=None):
+    writer = store.open_chunk(user_id, recording_id, index, offset)
+    for start in range(0, len(data), 1000):
+        writer.write(data[start:start + 1000])
+    return writer.finish(sha256)
+
+
+def test_interrupted_upload_resumes_from_stored_chunks(store, monkeypatch):
+    store, user_id, call_id = store
+    monkeypatch.setattr(local_recordings, 'WRITE_BUFFER_SIZE', 1500)
+    upload = store.create_upload(user_id, call_id, len(CONTENT), 'audio/wav')
+    half = len(CONTENT) // 2
+
+    send_chunk(store, user_id, upload['id'], 0, 0, CONTENT[:half])
+    # The client reconnects, asks what arrived and sends only the rest
+    status = store.status(user_id, upload['id'])
+    assert status['received_bytes'] == half
+    assert [(chunk['index'], chunk['offset']) for chunk in status['chunks']] == [(0, 0)]
+    with pytest.raises(RecordingError) as missing:
+        store.complete(user_id, upload['id'])
+    assert missing.value.status == 409
+
+    send_chunk(store, user_id, upload['id'], 1, half, CONTENT[half:])
+    recording = store.complete(user_id, upload['id'])
+    assert recording['status'] == 'complete'
+    assert recording['sha256'] == hashlib.sha256(CONTENT).hexdigest()
+
+    _, path = store.open_download(user_id, upload['id'])
+    assert path.read_bytes() == CONTENT
+    assert b''.join(store.iter_range(path, 1000, 8999)) == CONTENT[1000:9000]
+
+
+def test_checksum_mismatch_leaves_chunk_unrecorded(store):
+    store, user_id, call_id = store
+    upload = store.create_upload(user_id, call_id, len(CONTENT), 'audio/wav')
+
+    with pytest.raises(RecordingError) as mismatch:
+        send_chunk(store, user_id, upload['id'], 0, 0, CONTENT, sha256='0' * 64)
+    assert mismatch.value.status == 422
+    assert store.status(user_id, upload['id'])['chunks'] == []
+
+    send_chunk(store, user_id, upload['id'], 0, 0, CONTENT, sha256=hashlib.sha256(CONTENT).hexdigest().upper())
+    assert store.status(user_id, upload['id'])['received_bytes'] == len(CONTENT)
+
+
+def test_oversized_chunk_is_rejected(store):
+    store, user_id, call_id = store
+    upload = store.create_upload(user_id, call_id, 100, 'text/plain', kind='transcript')
+    with pytest.raises(RecordingError) as oversized:
+        send_chunk(store, user_id, upload['id'], 0, 50, b'x' * 51)
+    assert oversized.value.status == 413
+    with pytest.raises(RecordingError) as outside:
+        store.open_chunk(user_id, upload['id'], 1, 100)
+    assert outside.value.status == 416
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('bytes=0-99', (0, 99)),
+    ('bytes=100-', (100, 999)),
+    ('bytes=-100', (900, 999)),
+    ('bytes=-5000', (0, 999)),
+    ('bytes=990-5000', (990, 999)),
+    (' bytes=5-5 ', (5, 5)),
+])
+def test_parse_range(header, expected):
+    assert RecordingStore.parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize('header', ['bytes=1000-', 'bytes=500-100', 'bytes=-', 'bytes=0-1,5-9', 'items=0-1'])
+def test_unsatisfiable_range_is_416(header):
+    with pytest.raises(RecordingError) as error:
+        RecordingStore.parse_range(header, 1000)
+    assert error.value.status == 416
+    assert error.value.headers == {'Content-Range': 'bytes */1000'}
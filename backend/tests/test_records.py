@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from app.local_records import (ServiceError, NotFoundError, AuthenticationError, DeadlineExceeded,
+                               Call, CallStats, Contact, dumps)
+from app.local_recordings import RecordingError
+from app.local_service import LocalAuthService
+
+
+def plain(value):
+    """What json.dumps sees once records are turned into dicts."""
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        return {field: plain(item) for field, item in zip(value._fields, value)}
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+
+def assert_like_json(content):
+    assert dumps(content) == json.dumps(plain(content), ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def test_error_classes_carry_their_http_status():
+    assert ServiceError('bad').status == 400
+    assert ServiceError('conflict', 409).status == 409
+    assert NotFoundError('gone').status == 404
+    assert AuthenticationError('who').status == 401
+    assert DeadlineExceeded('late').status == 503
+    error = RecordingError('range', 416, {'Content-Range': 'bytes */10'})
+    assert (error.status, error.headers, str(error)) == (416, {'Content-Range': 'bytes */10'}, 'range')
+    # An explicit status on one instance never leaks into the class
+    assert ServiceError('bad').status == 400
+
+
+def test_service_raises_the_matching_error(tmp_path):
+    service = LocalAuthService(str(tmp_path / 'app.db'))
+    user = service.register_user('records@example.com', 'password1', 'Records')
+
+    with pytest.raises(ServiceError) as duplicate:
+        service.register_user('records@example.com', 'password1', 'Again')
+    assert duplicate.value.status == 400
+    with pytest.raises(AuthenticationError):
+        service.login_user('records@example.com', 'wrong')
+    with pytest.raises(AuthenticationError):
+        service.get_user_by_session('not-a-session')
+    with pytest.raises(NotFoundError):
+        service.update_call(user.id, 'missing', {'title': 'x'})
+
+
+def test_dumps_matches_json_dumps():
+    call = Call(*[f'v{i}' for i in range(len(Call._fields))])._replace(duration_minutes=30, contact_id=None)
+    contact = Contact(*['ünïcødé "quoted"\n' for _ in Contact._fields])._replace(is_favorite=True)
+    assert_like_json(call)
+    assert_like_json({'calls': [call, call], 'count': 2, 'next': None})
+    assert_like_json([contact, {'nested': (1, 2.5, False)}])
+    assert_like_json(CallStats(*[{'day': 3} if i % 2 else [1, 2] for i in range(len(CallStats._fields))]))
+    assert_like_json({'emoji': '☎️', 'ratio': 0.1, 'big': 10 ** 20, 'negative': -3})
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import local_reminders
+from app.local_reminders import ReminderEngine, QueueNotifier
+from app.local_service import LocalAuthService
+
+
+@pytest.fixture
+def engine(tmp_path):
+    service = LocalAuthService(str(tmp_path / 'app.db'))
+    engine = ReminderEngine(service, QueueNotifier())
+    service.add_change_listener(engine.on_change)
+    user_id = service.register_user('reminders@example.com', 'password1', 'Reminders').id
+    yield service, engine, user_id
+    engine.stop()
+
+
+def event(service, user_id, starts, **extra):
+    return service.create_calendar_event(user_id, {
+        'title': 'Standup', 'start_time': starts.isoformat(),
+        'end_time': (starts + timedelta(minutes=15)).isoformat(), 'reminder_minutes': 10, **extra,
+    })
+
+
+def test_next_fire_time_follows_recurrence():
+    after = datetime(2026, 3, 2, 9, 0)
+    assert ReminderEngine.next_fire_time('2026-03-02T09:30:00', '2026-03-02T10:00:00', None, 10, after) == \
+        datetime(2026, 3, 2, 9, 20)
+    assert ReminderEngine.next_fire_time('2026-03-01T09:30:00', '2026-03-01T10:00:00', None, 10, after) is None
+    assert ReminderEngine.next_fire_time('2026-03-01T09:30:00', '2026-03-01T10:00:00', 'FREQ=DAILY', 10, after) == \
+        datetime(2026, 3, 2, 9, 20)
+    assert ReminderEngine.next_fire_time('2026-03-02T09:30:00', '2026-03-02T10:00:00', None, None, after) is None
+
+
+def test_writes_schedule_move_and_cancel(engine):
+    service, engine, user_id = engine
+    created = event(service, user_id, datetime.utcnow() + timedelta(days=1))
+    assert len(engine) == 1
+
+    service.update_calendar_event(user_id, created.id, {'title': 'Renamed'})
+    service.update_calendar_event(user_id, created.id, {'start_time': (datetime.utcnow() + timedelta(days=2)).isoformat(),
+                                                        'end_time': (datetime.utcnow() + timedelta(days=3)).isoformat()})
+    assert len(engine) == 1
+    # The rename kept the fire time, so only the move left an entry behind
+    assert len(engine._heap) == 2
+
+    service.update_calendar_event(user_id, created.id, {'reminder_minutes': None})
+    assert len(engine) == 0
+    service.update_calendar_event(user_id, created.id, {'reminder_minutes': 5})
+    service.delete_calendar_event(user_id, created.id)
+    assert len(engine) == 0
+
+
+def test_stale_entries_are_compacted(engine, monkeypatch):
+    service, engine, user_id = engine
+    monkeypatch.setattr(local_reminders, 'COMPACT_MIN_ENTRIES', 8)
+    base = datetime.utcnow() + timedelta(days=1)
+    for minute in range(200):
+        engine.schedule('moving', user_id, base + timedelta(minutes=minute))
+        engine.schedule(f'kept-{minute % 3}', user_id, base)
+    assert len(engine) == 4
+    assert len(engine._heap) <= 2 * max(len(engine), 8)
+
+    for index in range(3):
+        engine.cancel(f'kept-{index}')
+    assert len(engine._heap) <= 8
+    assert engine._pending == {'moving': local_reminders._to_ts(base + timedelta(minutes=199))}
+
+
+def test_due_reminder_fires_and_recurring_event_is_rescheduled(engine):
+    service, engine, user_id = engine
+    # The reminder is due a fraction of a second from now
+    starts = datetime.utcnow() + timedelta(minutes=10, milliseconds=200)
+    weekly = event(service, user_id, starts, recurrence_rule='FREQ=WEEKLY')
+    engine.start(load=False)
+
+    reminder = engine.notifier.queue.get(timeout=5)
+    assert reminder['event_id'] == weekly.id
+    assert reminder['title'] == 'Standup'
+    assert reminder['start_time'] == starts.isoformat()
+    assert engine._pending[weekly.id] == local_reminders._to_ts(starts + timedelta(days=7, minutes=-10))
+
+
+def test_load_restores_the_heap_and_archive_cancels(engine):
+    service, engine, user_id = engine
+    upcoming = event(service, user_id, datetime.utcnow() + timedelta(hours=1))
+    event(service, user_id, datetime.utcnow() - timedelta(days=1))
+
+    fresh = ReminderEngine(service)
+    assert fresh.load() == 1
+    assert list(fresh._pending) == [upcoming.id]
+
+    engine.on_change(user_id, 'calendar_events', 'archive', upcoming)
+    assert len(engine) == 0
@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.local_service import LocalAuthService
+from app.local_shards import ShardRouter
+
+SCHEMA = ['CREATE TABLE IF NOT EXISTS notes (user_id TEXT, body TEXT)']
+
+
+def test_hash_mode_spreads_users_over_fixed_buckets(tmp_path):
+    router = ShardRouter(tmp_path, mode='hash', buckets=4)
+    keys = {router.shard_key(f'user-{i}') for i in range(200)}
+    assert keys == {'bucket_000', 'bucket_001', 'bucket_002', 'bucket_003'}
+    # Routing is a pure function of the user id
+    assert ShardRouter(tmp_path / 'other', mode='hash', buckets=4).shard_key('user-7') == router.shard_key('user-7')
+
+
+def test_user_mode_and_unknown_modes(tmp_path):
+    assert ShardRouter(tmp_path, mode='user').shard_key('abc') == 'user_abc'
+    with pytest.raises(ValueError):
+        ShardRouter(tmp_path, mode='range')
+
+
+def test_service_keeps_each_users_data_in_their_shard(tmp_path):
+    service = LocalAuthService(str(tmp_path / 'app.db'), shard_mode='user')
+    alice = service.register_user('alice@example.com', 'password1', 'Alice').id
+    bob = service.register_user('bob@example.com', 'password1', 'Bob').id
+    service.create_call(alice, {'title': 'Alice call', 'scheduled_at': '2026-03-02T09:00:00'})
+    service.create_call(bob, {'title': 'Bob call', 'scheduled_at': '2026-03-02T10:00:00'})
+
+    assert [call.title for call in service.list_calls(alice)] == ['Alice call']
+    assert service.shards.existing_shards() == sorted([f'user_{alice}', f'user_{bob}'])
+    shard = sqlite3.connect(str(service.shards.shard_path(f'user_{bob}')))
+    try:
+        assert shard.execute('SELECT title FROM calls').fetchall() == [('Bob call',)]
+    finally:
+        shard.close()
+    assert sorted(row[0] for row in service.query_all_data('SELECT title FROM calls')) == ['Alice call', 'Bob call']
+
+    # The directory database only holds users and sessions
+    directory = sqlite3.connect(service.db_path)
+    try:
+        assert directory.execute("SELECT 1 FROM sqlite_master WHERE name = 'calls'").fetchone() is None
+    finally:
+        directory.close()
+    service.shards.close_all()
+
+
+def test_idle_shards_are_closed_and_reopened(tmp_path):
+    router = ShardRouter(tmp_path, mode='user', idle_seconds=30, schema=SCHEMA)
+    for user_id in ('a', 'b'):
+        with router.connect(user_id) as conn:
+            conn.execute('INSERT INTO notes VALUES (?, ?)', (user_id, 'hello'))
+            conn.commit()
+    assert router.open_count() == 2
+    assert router.close_idle() == 0
+
+    assert router.close_idle(now=time.monotonic() + 31) == 2
+    assert router.open_count() == 0
+    with router.connect('a') as conn:
+        assert conn.execute('SELECT body FROM notes').fetchall() == [('hello',)]
+    assert router.open_count() == 1
+    router.close_all()
+
+
+def test_reaping_skips_shards_in_use(tmp_path):
+    router = ShardRouter(tmp_path, mode='user', idle_seconds=30, schema=SCHEMA)
+    with router.connect('idle'):
+        pass
+    borrowed, release = threading.Event(), threading.Event()
+
+    def hold():
+        with router.connect('busy'):
+            borrowed.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    borrowed.wait(5)
+    try:
+        assert router.close_idle(now=time.monotonic() + 31) == 1
+        assert router.open_count() == 1
+    finally:
+        release.set()
+        holder.join()
+    router.close_all()
+
+
+def test_connect_reaps_once_per_idle_period(tmp_path):
+    router = ShardRouter(tmp_path, mode='user', idle_seconds=0.05, schema=SCHEMA)
+    with router.connect('a'):
+        pass
+    time.sleep(0.1)
+    with router.connect('b'):
+        pass
+    # Borrowing b closed a, which had been idle for longer than idle_seconds
+    assert router.open_count() == 1
+    router.close_all()
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.local_voice import VoicePipeline, StubAgent, StubSpeechToText, StubTextToSpeech, END_OF_UTTERANCE
+
+
+def fast_pipeline(**engines):
+    return VoicePipeline(stt=StubSpeechToText(0, 0), tts=StubTextToSpeech(0),
+                         agent=engines.pop('agent', StubAgent(first_token_delay=0, token_delay=0)), **engines)
+
+
+async def utterance(*chunks):
+    for chunk in chunks:
+        yield chunk
+    yield END_OF_UTTERANCE
+
+
+def test_pipeline_speaks_one_reply_per_utterance():
+    async def scenario():
+        pipeline = fast_pipeline()
+        frames = [frame async for frame in pipeline.run(utterance(b'call me ', b'back'))]
+        return pipeline, frames
+
+    pipeline, frames = asyncio.run(scenario())
+    spoken = b''.join(frame.data for frame in frames).decode()
+    assert 'You said: call me back.' in spoken
+    assert [frame.final for frame in frames].count(True) == 1
+    assert set(pipeline.turn_report(0)) == {'stt_ms', 'agent_first_token_ms', 'time_to_first_audio_ms', 'turn_total_ms'}
+
+
+def test_cancelled_feed_does_not_wait_for_a_full_queue():
+    async def endless():
+        while True:
+            yield b'x'
+            await asyncio.sleep(0)
+
+    async def scenario():
+        queue = asyncio.Queue(1)
+        feed = asyncio.create_task(VoicePipeline()._feed(endless(), queue))
+        while not queue.full():
+            await asyncio.sleep(0)
+        feed.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(feed, 1)
+
+    asyncio.run(scenario())
+
+
+def test_prompt_source_runs_off_the_event_loop():
+    threads = []
+
+    class Compiled:
+        greeting = 'Front desk'
+
+        def messages(self, history, transcript):
+            return [{'role': 'user', 'content': transcript}]
+
+    def prompt():
+        threads.append(threading.current_thread())
+        return Compiled()
+
+    async def scenario():
+        pipeline = fast_pipeline(agent=StubAgent(first_token_delay=0, token_delay=0, prompt=prompt))
+        return [frame async for frame in pipeline.run(utterance(b'hello'))]
+
+    frames = asyncio.run(scenario())
+    assert b''.join(frame.data for frame in frames).startswith(b'Front desk.')
+    assert threads and threads[0] is not threading.main_thread()